@@ -82,13 +82,18 @@ celery_app.conf.update(
         "tasks.file_processing.process_project_files": {"queue": "file_processing"},
         "tasks.data_indexing.index_data_content": {"queue": "data_indexing"},
         "tasks.process_workflow.process_and_push_workflow": {"queue": "file_processing"},
-        "tasks.maintenance.clean_celery_executions_table": {"queue": "default"}
+        "tasks.maintenance.clean_celery_executions_table": {"queue": "default"},
+        "tasks.maintenance.evict_embedding_cache": {"queue": "default"}
     },
 
     beat_schedule = {
         'clean-old-task-records': {
             'task': 'tasks.maintenance.clean_celery_executions_table',
             'schedule': 10,
+        },
+        'evict-embedding-cache': {
+            'task': 'tasks.maintenance.evict_embedding_cache',
+            'schedule': 3600,
         }
     },
 
@@ -1,17 +1,29 @@
 from .BaseController import BaseController
-from models.db_schemes import Project, DataChunk
+from models.db_schemes import Project, DataChunk, SearchParams, SearchFilter
 from typing import List
 from stores.llm.LLMEnums import DocumentTypeEnum
+from utils.token_counter import count_tokens
+from utils.text_hash import get_text_hash
+from stores.llm.ProviderScheduler import get_remaining_seconds
+import asyncio
 import json
 
 class NLPController(BaseController):
 
-    def __init__(self, vectordb_client, generation_client, embedding_client, template_parser):
+    def __init__(self, vectordb_client, generation_client, embedding_client, template_parser,
+                 embedding_cache=None, embedding_batcher=None, query_embedder=None,
+                 query_embedding_cache=None, answer_cache=None, generation_hedger=None):
         super().__init__()
         self.vectordb_client = vectordb_client
         self.generation_client = generation_client
         self.embedding_client = embedding_client
         self.template_parser = template_parser
+        self.embedding_cache = embedding_cache
+        self.embedding_batcher = embedding_batcher
+        self.query_embedder = query_embedder
+        self.query_embedding_cache = query_embedding_cache
+        self.answer_cache = answer_cache
+        self.generation_hedger = generation_hedger
 
     def create_collection_name(self, project_id: str) -> str:
         return f"collection_{self.vectordb_client.default_vector_size}_{project_id}".strip()
@@ -34,11 +46,7 @@ class NLPController(BaseController):
         # get collection name
         collection_name = self.create_collection_name(project_id=project.project_id)
 
-        # manage items
-        texts = [c.chunk_text for c in chunks]
-        metadata = [c.chunk_metadata for c in chunks]
-
-        vectors = self.embedding_client.embed_text(text=texts, document_type=DocumentTypeEnum.DOCUMENT.value)
+        vectors = await self.embed_chunks(chunks=chunks)
 
         # create collection if not exists
         _ = await self.vectordb_client.create_collection(
@@ -47,32 +55,128 @@ class NLPController(BaseController):
             do_reset=do_reset
         )
 
-        _ = await self.vectordb_client.insert_many(
-            collection_name=collection_name,
-            texts=texts,
+        _ = await self.insert_vectors_into_vector_db(
+            project=project,
+            chunks=chunks,
             vectors=vectors,
-            metadata=metadata,
-            record_ids=chunks_ids
+            chunks_ids=chunks_ids
         )
         return True
 
-    async def search_vector_db_collection(self, project: Project, text: str, limit: int = 10):
-        
-        query_vector = None
-        # get collection name
+    async def embed_chunks(self, chunks: List[DataChunk]) -> list:
+        return await self.embed_texts(
+            texts=[c.chunk_text for c in chunks],
+            document_type=DocumentTypeEnum.DOCUMENT.value
+        )
+
+    async def embed_texts(self, texts: List[str], document_type: str) -> list:
+        """
+        Embeds the texts, only the ones missing from the embedding cache are sent to the provider.
+        """
+        if self.embedding_cache is None:
+            return await self.embed_texts_with_provider(
+                texts=texts,
+                document_type=document_type
+            )
+
+        model_id = self.embedding_client.embedding_model_id
+        # same hash as the chunks dedup, so a deduplicated chunk and its cached vector agree
+        texts_hashes = [get_text_hash(t) for t in texts]
+
+        cached_vectors = await self.embedding_cache.get_embeddings(
+            embedding_model_id=model_id,
+            document_type=document_type,
+            text_hashes=texts_hashes
+        )
+
+        missed = {}
+        for text, text_hash in zip(texts, texts_hashes):
+            if text_hash not in cached_vectors:
+                missed[text_hash] = text
+
+        if len(missed):
+            missed_vectors = await self.embed_texts_with_provider(
+                texts=list(missed.values()),
+                document_type=document_type
+            )
+            if not missed_vectors or len(missed_vectors) != len(missed):
+                return None
+
+            missed_vectors = dict(zip(missed.keys(), missed_vectors))
+            _ = await self.embedding_cache.insert_embeddings(
+                embedding_model_id=model_id,
+                document_type=document_type,
+                embeddings=missed_vectors
+            )
+            cached_vectors.update(missed_vectors)
+
+        return [cached_vectors[text_hash] for text_hash in texts_hashes]
+
+    async def embed_texts_with_provider(self, texts: List[str], document_type: str) -> list:
+        if self.embedding_batcher is not None:
+            return await self.embedding_batcher.embed(texts=texts, document_type=document_type)
+
+        return await self.embedding_client.embed_text_async(
+            text=texts,
+            document_type=document_type
+        )
+
+    async def insert_vectors_into_vector_db(self, project: Project, chunks: List[DataChunk],
+                                            vectors: list, chunks_ids: List[int]):
         collection_name = self.create_collection_name(project_id=project.project_id)
 
-        # get text embedding vector
-        vectors = self.embedding_client.embed_text(
+        return await self.vectordb_client.insert_many(
+            collection_name=collection_name,
+            texts=[c.chunk_text for c in chunks],
+            vectors=vectors,
+            # the token count travels with the vector so the prompt packer does not re-tokenize
+            metadata=[{**(c.chunk_metadata or {}), "chunk_token_count": c.chunk_token_count} for c in chunks],
+            record_ids=chunks_ids,
+            asset_ids=[c.chunk_asset_id for c in chunks]
+        )
+
+    async def embed_query(self, text: str) -> list:
+        model_id = self.embedding_client.embedding_model_id
+
+        if self.query_embedding_cache is not None:
+            query_vector = await self.query_embedding_cache.get(model_id=model_id, text=text)
+            if query_vector:
+                return query_vector
+
+        # concurrent queries are merged into a single provider call when a coalescer is set
+        query_embedder = self.query_embedder if self.query_embedder is not None else self.embedding_client
+
+        vectors = await query_embedder.embed_text_async(
             text=text,
             document_type=DocumentTypeEnum.QUERY.value
         )
+
+        if not vectors or len(vectors) == 0 or not vectors[0]:
+            return None
+
+        query_vector = vectors[0]
+
+        if self.query_embedding_cache is not None:
+            await self.query_embedding_cache.set(model_id=model_id, text=text, vector=query_vector)
+
+        return query_vector
+
+    def get_search_params(self, project: Project, search_params: SearchParams = None) -> SearchParams:
+        """Project default search params, overridden by the fields set in the request."""
+        project_search_params = SearchParams(**(project.project_search_params or {}))
+        if search_params is None:
+            return project_search_params
+
+        return project_search_params.copy(update=search_params.dict(exclude_none=True))
+
+    async def search_vector_db_collection(self, project: Project, text: str, limit: int = 10,
+                                          search_params: SearchParams = None, search_filter: SearchFilter = None):
         
-        if not vectors or len(vectors) == 0:
-            return False
+        # get collection name
+        collection_name = self.create_collection_name(project_id=project.project_id)
 
-        if isinstance(vectors, list) and len(vectors) > 0:
-            query_vector = vectors[0]
+        # get text embedding vector
+        query_vector = await self.embed_query(text=text)
 
         if not query_vector:
             return False
@@ -81,7 +185,9 @@ class NLPController(BaseController):
         results = await self.vectordb_client.search_by_vector(
             collection_name=collection_name,
             vector=query_vector,
-            limit=limit
+            limit=limit,
+            search_params=self.get_search_params(project=project, search_params=search_params),
+            search_filter=search_filter
         )
 
         if not results:
@@ -89,37 +195,59 @@ class NLPController(BaseController):
 
         return results
 
-    async def answer_rag_question(self, project: Project, query: str, limit: int = 10):
-        # retrieve related docs
+    def count_tokens(self, text: str) -> int:
+        return count_tokens(text, encoding_name=self.app_settings.TOKENIZER_ENCODING,
+                            cache_dir=self.app_settings.TOKENIZER_CACHE_DIR)
 
-        answer, full_prompt, chat_history = None, None, None
+    def pack_retrieved_documents(self, retrieved_documents: list, token_budget: int) -> list:
+        """
+        Greedily keeps the highest scored documents whose prompt fits in the remaining token budget.
+        Documents that do not fit are skipped, so a smaller one further down can still use the space.
+        """
+        # tokens of the document template itself, without the chunk text
+        document_overhead = self.count_tokens(self.template_parser.get("rag", "document_prompt", {
+            "doc_num": len(retrieved_documents),
+            "chunk_text": "",
+        }))
 
-        retrieved_documents = await self.search_vector_db_collection(
-            project=project,
-            text=query,
-            limit=limit
-        )
+        packed_documents = []
+        remaining_tokens = token_budget
+        for doc in sorted(retrieved_documents, key=lambda d: d.score, reverse=True):
+            doc_tokens = doc.token_count if doc.token_count is not None else self.count_tokens(doc.text)
+            if doc_tokens + document_overhead > remaining_tokens:
+                continue
+            packed_documents.append(doc)
+            remaining_tokens -= doc_tokens + document_overhead
 
-        if not retrieved_documents or len(retrieved_documents) == 0:
-            return answer, full_prompt, chat_history
+        return packed_documents
 
-        # step 2: construct LLM prompt
+    def construct_rag_prompt(self, query: str, retrieved_documents: list):
         
         system_prompt = self.template_parser.get("rag", "system_prompt")
 
+        footer_prompt = self.template_parser.get("rag", "footer_prompt", {
+            "query": query
+        })
+
+        token_budget = self.app_settings.RAG_PROMPT_MAX_TOKENS
+        if token_budget:
+            # whole chunks are packed into what the system prompt and the question leave of the budget
+            retrieved_documents = self.pack_retrieved_documents(
+                retrieved_documents=retrieved_documents,
+                token_budget=token_budget - self.count_tokens(system_prompt) - self.count_tokens(footer_prompt)
+            )
+            chunks_texts = [doc.text for doc in retrieved_documents]
+        else:
+            chunks_texts = [self.generation_client.process_text(doc.text) for doc in retrieved_documents]
     
         document_prompts = "\n".join([
             self.template_parser.get("rag", "document_prompt", {
                 "doc_num": idx + 1,
-                "chunk_text": self.generation_client.process_text(doc.text),
+                "chunk_text": chunk_text,
             })
-            for idx, doc in enumerate(retrieved_documents)
+            for idx, chunk_text in enumerate(chunks_texts)
         ])
 
-        footer_prompt = self.template_parser.get("rag", "footer_prompt", {
-            "query": query
-        })
-
         chat_history = [
             self.generation_client.construct_prompt(
                 prompt=system_prompt,
@@ -129,9 +257,163 @@ class NLPController(BaseController):
 
         full_prompt = "\n\n".join([document_prompts, footer_prompt])
 
-        answer = self.generation_client.generate_text(
+        return full_prompt, chat_history
+
+    def get_answer_cache_key(self, project: Project, query: str, retrieved_documents: list) -> str:
+        return self.answer_cache.create_key(
+            project_id=project.project_id,
+            index_version=project.project_index_version,
+            query=query,
+            chunks_ids=[doc.chunk_id for doc in retrieved_documents],
+            model_id=self.generation_client.generation_model_id,
+            temperature=self.generation_client.default_generation_temperature
+        )
+
+    async def answer_rag_question(self, project: Project, query: str, limit: int = 10, deadline: float = None,
+                                  search_params: SearchParams = None, search_filter: SearchFilter = None):
+        # retrieve related docs
+
+        answer, full_prompt, chat_history, cache_hit = None, None, None, False
+
+        # the query embedding and the search count against the deadline as well
+        retrieved_documents = await asyncio.wait_for(
+            self.search_vector_db_collection(
+                project=project,
+                text=query,
+                limit=limit,
+                search_params=search_params,
+                search_filter=search_filter
+            ),
+            timeout=get_remaining_seconds(deadline)
+        )
+
+        if not retrieved_documents or len(retrieved_documents) == 0:
+            return answer, full_prompt, chat_history, cache_hit
+
+        # same query on the same retrieved chunks: reuse the generated answer
+        cache_key = None
+        if self.answer_cache is not None:
+            cache_key = self.get_answer_cache_key(project=project, query=query, retrieved_documents=retrieved_documents)
+            cached_answer = await self.answer_cache.get(cache_key)
+            if cached_answer:
+                return cached_answer["answer"], cached_answer["full_prompt"], cached_answer["chat_history"], True
+
+        # step 2: construct LLM prompt
+        full_prompt, chat_history = self.construct_rag_prompt(
+            query=query,
+            retrieved_documents=retrieved_documents
+        )
+
+        # raises asyncio.TimeoutError when no answer arrives before the time.monotonic() deadline
+        answering_client = self.generation_client
+        if self.generation_hedger is not None:
+            answer, answering_client = await self.generation_hedger.generate(
+                prompt=full_prompt,
+                system_prompt=self.template_parser.get("rag", "system_prompt"),
+                deadline=deadline
+            )
+        else:
+            answer = await self.generation_client.generate_text_async(
+                prompt=full_prompt,
+                chat_history=chat_history,
+                deadline=deadline
+            )
+
+        # the cache key names the primary model, an answer of another hedging model is not stored under it
+        if answering_client is not None and answering_client is not self.generation_client:
+            hedger = self.generation_hedger
+            if hedger.get_model_key(answering_client) != hedger.get_model_key(self.generation_client):
+                cache_key = None
+
+        if answer and cache_key:
+            await self.answer_cache.set(cache_key, {
+                "answer": answer,
+                "full_prompt": full_prompt,
+                "chat_history": chat_history
+            })
+
+        return answer, full_prompt, chat_history, cache_hit
+
+    async def stream_rag_answer(self, project: Project, query: str, limit: int = 10, deadline: float = None,
+                                search_params: SearchParams = None, search_filter: SearchFilter = None):
+        """
+        Retrieves the documents and returns them with the prompt, a generator of the answer tokens
+        and whether the answer comes from the cache. The generator is None when no documents were retrieved.
+        The search and every token of the generator raise asyncio.TimeoutError once the deadline passed.
+        """
+        retrieved_documents = await asyncio.wait_for(
+            self.search_vector_db_collection(
+                project=project,
+                text=query,
+                limit=limit,
+                search_params=search_params,
+                search_filter=search_filter
+            ),
+            timeout=get_remaining_seconds(deadline)
+        )
+
+        if not retrieved_documents or len(retrieved_documents) == 0:
+            return None, None, None, None, False
+
+        cache_key = None
+        if self.answer_cache is not None:
+            cache_key = self.get_answer_cache_key(project=project, query=query, retrieved_documents=retrieved_documents)
+            cached_answer = await self.answer_cache.get(cache_key)
+            if cached_answer:
+                async def cached_stream():
+                    yield cached_answer["answer"]
+
+                return (retrieved_documents, cached_stream(),
+                        cached_answer["full_prompt"], cached_answer["chat_history"], True)
+
+        full_prompt, chat_history = self.construct_rag_prompt(
+            query=query,
+            retrieved_documents=retrieved_documents
+        )
+
+        answer_stream = self.generation_client.generate_text_stream(
             prompt=full_prompt,
-            chat_history=chat_history   
+            chat_history=chat_history
         )
+        if deadline is not None:
+            answer_stream = self.bound_answer_stream(answer_stream=answer_stream, deadline=deadline)
 
-        return answer, full_prompt, chat_history
+        if cache_key:
+            answer_stream = self.cache_answer_stream(
+                answer_stream=answer_stream,
+                cache_key=cache_key,
+                full_prompt=full_prompt,
+                chat_history=chat_history
+            )
+
+        return retrieved_documents, answer_stream, full_prompt, chat_history, False
+
+    async def bound_answer_stream(self, answer_stream, deadline: float):
+        """
+        Passes the tokens through until the `time.monotonic()` deadline, which bounds the wait
+        for the first token as well as the whole stream.
+        """
+        try:
+            while True:
+                try:
+                    token = await asyncio.wait_for(answer_stream.__anext__(), timeout=get_remaining_seconds(deadline))
+                except StopAsyncIteration:
+                    return
+                yield token
+        finally:
+            # releases the provider connection of an abandoned stream
+            await answer_stream.aclose()
+
+    async def cache_answer_stream(self, answer_stream, cache_key: str, full_prompt: str, chat_history: list):
+        """Passes the tokens through and caches the full answer once the stream completes."""
+        tokens = []
+        async for token in answer_stream:
+            tokens.append(token)
+            yield token
+
+        if len(tokens):
+            await self.answer_cache.set(cache_key, {
+                "answer": "".join(tokens),
+                "full_prompt": full_prompt,
+                "chat_history": chat_history
+            })
@@ -3,9 +3,16 @@ from .ProjectController import ProjectController
 import os
 from langchain_community.document_loaders import PyMuPDFLoader
 from langchain_community.document_loaders import TextLoader
-from models import ProcessingEnum
-from typing import List
+from models import ProcessingEnum, ExtractionModeEnum
+from typing import List, Iterable, Iterator
 from dataclasses import dataclass
+import billiard
+import fitz
+import hashlib
+import itertools
+import logging
+
+logger = logging.getLogger(__name__)
 
 @dataclass
 class Document:
@@ -13,6 +20,51 @@ class Document:
     metadata: dict
 
 
+def extract_pdf_pages(file_path: str, start_page: int, end_page: int) -> List[Document]:
+    """
+    Extracts the pages [start_page, end_page) of a PDF file.
+    Defined at module level so it can be pickled and sent to the process pool.
+    """
+    pages = []
+    with fitz.open(file_path) as pdf:
+        total_pages = pdf.page_count
+        for page_no in range(start_page, min(end_page, total_pages)):
+            pages.append(Document(
+                page_content=pdf[page_no].get_text(),
+                metadata={
+                    "source": file_path,
+                    "file_path": file_path,
+                    "page": page_no,
+                    "total_pages": total_pages
+                }
+            ))
+    return pages
+
+
+def extract_pdf_page_range(page_range: tuple) -> List[Document]:
+    """Single argument form of extract_pdf_pages for Pool.imap."""
+    return extract_pdf_pages(*page_range)
+
+
+def process_file_chunks(project_id: str, file_id: str, chunk_size: int, overlap_size: int) -> Iterator[Document]:
+    """
+    Lazily loads and chunks a single file. Consumed from a file processing process,
+    so the PDF extraction itself stays serial to avoid a pool per file.
+    """
+    process_controller = ProcessController(project_id=project_id)
+
+    file_content = process_controller.iter_file_content(file_id=file_id, allow_parallel=False)
+    if file_content is None:
+        return None
+
+    return process_controller.process_file_content(
+        file_content=file_content,
+        file_id=file_id,
+        chunk_size=chunk_size,
+        overlap_size=overlap_size
+    )
+
+
 class ProcessController(BaseController):
     def __init__(self, project_id: str):
         super().__init__()
@@ -39,21 +91,123 @@ class ProcessController(BaseController):
          
         return None
 
+    def get_file_fingerprint(self, file_id: str, previous_fingerprint: dict = None,
+                             uploaded_size: int = None, uploaded_hash: str = None) -> dict:
+        """
+        Returns the mtime, size and SHA-256 of the file on disk.
+        The hash is only recomputed when the mtime or size changed since `previous_fingerprint`,
+        or, for a file never fingerprinted, when its size is not the `uploaded_size` hashed at upload.
+        """
+        file_path = os.path.join(self.project_path, file_id)
+        if not os.path.exists(file_path):
+            return None
+
+        file_stat = os.stat(file_path)
+
+        if previous_fingerprint:
+            is_unchanged = (previous_fingerprint.get("mtime") == file_stat.st_mtime
+                            and previous_fingerprint.get("size") == file_stat.st_size)
+            known_hash = previous_fingerprint.get("hash")
+        else:
+            is_unchanged = uploaded_size == file_stat.st_size
+            known_hash = uploaded_hash
+
+        if is_unchanged and known_hash:
+            file_hash = known_hash
+        else:
+            sha256 = hashlib.sha256()
+            with open(file_path, "rb") as f:
+                while chunk := f.read(self.app_settings.FILE_DEFAULT_CHUNK_SIZE):
+                    sha256.update(chunk)
+            file_hash = sha256.hexdigest()
+
+        return {
+            "mtime": file_stat.st_mtime,
+            "size": file_stat.st_size,
+            "hash": file_hash
+        }
+
     def get_file_content(self, file_id: str):
         loader = self.get_file_loader(file_id=file_id)
         return loader.load() if loader else None   
-    
-    def process_file_content(self, file_content: list, file_id: str, chunk_size: int = 100, overlap_size: int = 20):
-     
-        
-        file_content_texts = [
-            rec.page_content for rec in file_content
-        ]
 
-        file_content_metadata = [
-            rec.metadata for rec in file_content
+    def iter_file_content(self, file_id: str, allow_parallel: bool = True):
+        """
+        Lazily yields the file pages one by one instead of loading the whole file.
+        """
+        if allow_parallel and self.should_extract_in_parallel(file_id=file_id):
+            return self.iter_pdf_pages_parallel(file_id=file_id)
+
+        loader = self.get_file_loader(file_id=file_id)
+        return loader.lazy_load() if loader else None
+
+    def should_extract_in_parallel(self, file_id: str) -> bool:
+        if self.app_settings.FILE_PDF_EXTRACTION_MODE != ExtractionModeEnum.PARALLEL.value:
+            return False
+
+        if self.get_file_extension(file_id=file_id) != ProcessingEnum.PDF.value:
+            return False
+
+        return os.path.exists(os.path.join(self.project_path, file_id))
+
+    def get_pdf_page_ranges(self, total_pages: int, pages_per_task: int) -> List[tuple]:
+        pages_per_task = max(1, pages_per_task)
+        return [
+            (start, min(start + pages_per_task, total_pages))
+            for start in range(0, total_pages, pages_per_task)
         ]
 
+    def iter_pdf_pages_parallel(self, file_id: str) -> Iterator[Document]:
+        """
+        Splits the PDF into page ranges, extracts them in a process pool
+        and yields the pages back in their original order.
+        """
+        file_path = os.path.join(self.project_path, file_id)
+
+        with fitz.open(file_path) as pdf:
+            total_pages = pdf.page_count
+
+        page_ranges = self.get_pdf_page_ranges(
+            total_pages=total_pages,
+            pages_per_task=self.app_settings.FILE_PDF_PAGES_PER_TASK
+        )
+
+        # small files are not worth the process pool overhead
+        if len(page_ranges) <= 1:
+            yield from extract_pdf_pages(file_path, 0, total_pages)
+            return
+
+        max_workers = min(len(page_ranges), self.app_settings.FILE_PDF_EXTRACTION_WORKERS or os.cpu_count() or 1)
+
+        # billiard, unlike multiprocessing, lets the daemonic children of the prefork Celery pool start processes
+        try:
+            pool = billiard.Pool(processes=max_workers)
+        except OSError as e:
+            logger.warning(f"Can not start the PDF extraction pool ({e}), extracting {file_id} serially.")
+            yield from extract_pdf_pages(file_path, 0, total_pages)
+            return
+
+        try:
+            # imap returns the results in submission order
+            for pages in pool.imap(extract_pdf_page_range, [(file_path, start, end) for start, end in page_ranges]):
+                yield from pages
+            pool.close()
+        finally:
+            # also stops the workers when the consumer gives up early
+            pool.terminate()
+            pool.join()
+    
+    def process_file_content(self, file_content: Iterable, file_id: str, chunk_size: int = 100, overlap_size: int = 20) -> Iterator[Document]:
+
+        # records are consumed one page at a time, so file_content can be a lazy iterator
+        texts_records, pages_records = itertools.tee(file_content)
+        file_content_texts = (
+            rec.page_content for rec in texts_records
+        )
+        file_content_pages = (
+            rec.metadata.get("page") for rec in pages_records
+        )
+
         # chunks = text_splitter.create_documents(
         #     file_content_texts,
         #     metadatas=file_content_metadata
@@ -61,36 +215,98 @@ class ProcessController(BaseController):
 
         chunks = self.process_simpler_splitter(
             texts=file_content_texts,
-            metadatas=file_content_metadata,
-            chunk_size=chunk_size
+            chunk_size=chunk_size,
+            overlap_size=overlap_size,
+            pages=file_content_pages
         )
 
         return chunks
     
-    def process_simpler_splitter(self, texts: List[str], metadatas: List[str], chunk_size: int, splitter_tag: str = "\n"):
-        
-        full_text = " ".join(texts)
+    def process_simpler_splitter(self, texts: Iterable[str], chunk_size: int, overlap_size: int = 0,
+                                 splitter_tag: str = "\n", pages: Iterable[int] = None) -> Iterator[Document]:
+        """
+        Walks the pages line by line and yields chunks of at least `chunk_size` characters.
+        The last lines of every chunk (up to `overlap_size` characters) are carried over
+        to the start of the next one. When the page numbers of the texts are given, every
+        chunk records the pages it spans.
+        """
+
+        overlap_size = max(0, min(overlap_size or 0, chunk_size - 1))
+
+        current_lines = []
+        # page of every line in current_lines
+        current_pages = []
+        current_size = 0
+        # number of leading lines in current_lines that were carried over from the previous chunk
+        carried_lines = 0
+        chunk_index = 0
+
+        for text, page in zip(texts, pages if pages is not None else itertools.repeat(None)):
+            for line in text.split(splitter_tag):
+                line = line.strip()
+                if len(line) <= 1:
+                    continue
+
+                current_lines.append(line)
+                current_pages.append(page)
+                current_size += len(line) + len(splitter_tag)
+
+                if current_size < chunk_size:
+                    continue
+
+                yield Document(
+                    page_content=splitter_tag.join(current_lines),
+                    metadata=self.get_chunk_metadata(chunk_index=chunk_index, pages=current_pages)
+                )
+                chunk_index += 1
+
+                current_lines = self.get_overlap_lines(
+                    lines=current_lines,
+                    overlap_size=overlap_size,
+                    splitter_tag=splitter_tag
+                )
+                # the overlap is always the tail of the chunk
+                current_pages = current_pages[len(current_pages) - len(current_lines):]
+                current_size = sum(len(l) + len(splitter_tag) for l in current_lines)
+                carried_lines = len(current_lines)
+
+        # flush the remaining lines, unless they are only the overlap of the last chunk
+        if len(current_lines) > carried_lines:
+            yield Document(
+                page_content=splitter_tag.join(current_lines),
+                metadata=self.get_chunk_metadata(chunk_index=chunk_index, pages=current_pages)
+            )
+
+    def get_chunk_metadata(self, chunk_index: int, pages: List[int]) -> dict:
+        metadata = {"source": "splitter", "chunk_index": chunk_index}
 
-        # split by splitter_tag 
+        pages = [page for page in pages if page is not None]
+        if pages:
+            metadata["page_start"] = min(pages)
+            metadata["page_end"] = max(pages)
 
-        lines = [doc.strip() for doc in full_text.split(splitter_tag) if len(doc.strip()) > 1 ]
+        return metadata
 
-        chunks = [] 
-        current_chunk = ""
+    def get_overlap_lines(self, lines: List[str], overlap_size: int, splitter_tag: str = "\n") -> List[str]:
+        """
+        Returns the trailing lines that fit in `overlap_size` characters.
+        If the last line alone is longer, only its tail is kept.
+        """
+        if overlap_size <= 0 or not lines:
+            return []
 
-        for line in lines:
-            current_chunk += line + splitter_tag
-            if len(current_chunk) >= chunk_size:
-                chunks.append(Document(
-                    page_content=current_chunk.strip(),
-                    metadata={"source": "splitter", "chunk_index": len(chunks)}
-                ))
-                current_chunk = ""
+        overlap_lines = []
+        overlap_length = 0
+        for line in reversed(lines):
+            line_length = len(line) + len(splitter_tag)
+            if overlap_length + line_length > overlap_size:
+                break
+            overlap_lines.append(line)
+            overlap_length += line_length
 
-        if len(current_chunk) >= chunk_size:
-                chunks.append(Document(
-                    page_content=current_chunk.strip(),
-                    metadata={"source": "splitter", "chunk_index": len(chunks)}
-                ))
+        if not overlap_lines:
+            tail = lines[-1][-overlap_size:].strip()
+            return [tail] if tail else []
 
-        return chunks
\ No newline at end of file
+        overlap_lines.reverse()
+        return overlap_lines
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import List
+from typing import List, Optional
 
 class Settings(BaseSettings):
 
@@ -10,6 +10,11 @@ class Settings(BaseSettings):
     FILE_ALLOWED_TYPES: list[str] 
     FILE_MAX_SIZE: int
     FILE_DEFAULT_CHUNK_SIZE: int
+    FILE_CHUNKS_INSERT_BATCH_SIZE: int = 1000
+    FILE_PDF_EXTRACTION_MODE: str = "SERIAL"
+    FILE_PDF_EXTRACTION_WORKERS: Optional[int] = None
+    FILE_PDF_PAGES_PER_TASK: int = 50
+    FILE_PROCESSING_CONCURRENCY: int = 1
 
     # MONGODB_URL: str
     # MONGODB_DATABASE: str
@@ -37,12 +42,83 @@ class Settings(BaseSettings):
     INPUT_DEFAULT_MAX_CHARACTERS: int = None
     GENERATION_DEFAULT_MAX_TOKENS: int = None
     GENERATION_DEFAULT_TEMPERATURE: float = None
+    GENERATION_TIMEOUT_SECONDS: float = 60
+
+    # generation hedging, the secondary backend defaults to the generation backend
+    GENERATION_HEDGING_ENABLED: bool = False
+    GENERATION_HEDGING_BACKEND: Optional[str] = None
+    GENERATION_HEDGING_MODEL_ID: Optional[str] = None
+    GENERATION_HEDGING_QUANTILE: float = 0.95
+    GENERATION_HEDGING_MIN_SAMPLES: int = 20
+    LLM_HTTP_MAX_CONNECTIONS: int = 100
+
+    # provider rate limits, unset means not paced
+    OPENAI_REQUESTS_PER_MINUTE: Optional[int] = None
+    OPENAI_TOKENS_PER_MINUTE: Optional[int] = None
+    COHERE_REQUESTS_PER_MINUTE: Optional[int] = None
+    COHERE_TOKENS_PER_MINUTE: Optional[int] = None
+    LLM_MAX_RETRIES: int = 5
+    LLM_RETRY_BASE_DELAY: float = 1.0
+    LLM_RETRY_MAX_DELAY: float = 60.0
+
+    LOCAL_EMBEDDING_THREADS: int = 4
+    LOCAL_EMBEDDING_BATCH_SIZE: int = 64
+
+    # prompt token budget, chunks are truncated by characters when 0
+    RAG_PROMPT_MAX_TOKENS: int = 3000
+    TOKENIZER_ENCODING: str = "cl100k_base"
+    TOKENIZER_CACHE_DIR: Optional[str] = None
 
     VECTOR_DB_BACKEND_LITERAL: List[str] = None
     VECTOR_DB_BACKEND: str
     VECTOR_DB_PATH: str 
     VECTOR_DB_DISTANCE_METHOD: str = None
     VECTOR_DB_PGVEC_INDEX_THRESHOLD: int = 100
+    VECTOR_DB_PGVEC_BULK_LOAD: bool = True
+    VECTOR_DB_PGVEC_COPY_BATCH_SIZE: int = 10000
+
+    # pgvector index, built after each indexing run, unset sizes are derived from the row count
+    VECTOR_DB_PGVEC_INDEX_TYPE: str = "hnsw"
+    VECTOR_DB_PGVEC_HNSW_M: Optional[int] = None
+    VECTOR_DB_PGVEC_HNSW_EF_CONSTRUCTION: Optional[int] = None
+    VECTOR_DB_PGVEC_IVFFLAT_LISTS: Optional[int] = None
+    VECTOR_DB_PGVEC_INDEX_CONCURRENTLY: bool = True
+    VECTOR_DB_PGVEC_MAINTENANCE_WORK_MEM: str = "1GB"
+    VECTOR_DB_PGVEC_MAX_PARALLEL_MAINTENANCE_WORKERS: Optional[int] = None
+    VECTOR_DB_PGVEC_ITERATIVE_SCAN: str = "relaxed_order"
+    VECTOR_DB_DEDUP_CHUNKS: bool = True
+    VECTOR_DB_COLLECTION_CACHE_TTL: float = 60
+
+    # embedding cache
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_MAX_SIZE_MB: int = 1024
+
+    # embedding batcher
+    EMBEDDING_BATCHER_MAX_CONCURRENCY: int = 8
+    EMBEDDING_BATCHER_MAX_RETRIES: int = 5
+
+    # query embedding micro-batching
+    QUERY_EMBEDDING_BATCH_WINDOW_MS: float = 5
+    QUERY_EMBEDDING_BATCH_MAX_ITEMS: int = 32
+
+    # query embedding cache
+    QUERY_EMBEDDING_CACHE_ENABLED: bool = True
+    QUERY_EMBEDDING_CACHE_TTL: int = 3600
+    QUERY_EMBEDDING_CACHE_MAX_SIZE_MB: int = 64
+    QUERY_EMBEDDING_CACHE_REDIS_URL: Optional[str] = None
+
+    # RAG answer cache
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_BACKEND: str = "MEMORY"
+    ANSWER_CACHE_MAX_ENTRIES: int = 10000
+    ANSWER_CACHE_TTL: int = 86400
+    ANSWER_CACHE_REDIS_URL: Optional[str] = None
+
+    # indexing pipeline
+    INDEXING_PAGE_SIZE: int = 100
+    INDEXING_MAX_PAGE_SIZE: int = 2000
+    INDEXING_EMBEDDING_WORKERS: int = 2
+    INDEXING_QUEUE_SIZE: int = 4
     
     PRIMARY_LANG: str = "en"
     DEFAULT_LANG: str = "en"
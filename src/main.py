@@ -6,6 +6,10 @@ from contextlib import asynccontextmanager
 from stores.llm.LLMProviderFactory import LLMProviderFactory
 from stores.vectordb.VectorDBProviderFactory import VectorDBProviderFactory
 from stores.llm.templatess.template_parser import TemplateParser
+from stores.llm.QueryEmbeddingCoalescer import QueryEmbeddingCoalescer
+from stores.llm.QueryEmbeddingCache import QueryEmbeddingCache
+from stores.llm.AnswerCache import AnswerCache
+from stores.llm.GenerationHedger import GenerationHedger
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from utils.metrics import setup_metrics
@@ -34,12 +38,54 @@ async def lifespan(app: FastAPI):
     app.generation_client = llm_provider_factory.create(provider=settings.GENERATION_BACKEND)
     app.generation_client.set_generation_model(model_id=settings.GENERATION_MODEL_ID)
 
+    # slow generations are raced against a second request once they pass the p95 latency
+    app.generation_hedger = None
+    if settings.GENERATION_HEDGING_ENABLED:
+        hedging_client = None
+        if settings.GENERATION_HEDGING_BACKEND:
+            hedging_client = llm_provider_factory.create(provider=settings.GENERATION_HEDGING_BACKEND)
+            hedging_client.set_generation_model(
+                model_id=settings.GENERATION_HEDGING_MODEL_ID or settings.GENERATION_MODEL_ID
+            )
+
+        app.generation_hedger = GenerationHedger(
+            primary_client=app.generation_client,
+            secondary_client=hedging_client,
+            quantile=settings.GENERATION_HEDGING_QUANTILE,
+            min_samples=settings.GENERATION_HEDGING_MIN_SAMPLES
+        )
+
     # embedding client setup    
     app.embedding_client = llm_provider_factory.create(provider=settings.EMBEDDING_BACKEND)
     app.embedding_client.set_embedding_model(
         model_id=settings.EMBEDDING_MODEL_ID,
         embedding_size=settings.EMBEDDING_MODEL_SIZE
     )
+
+    # query embeddings of concurrent requests are merged into one provider call
+    app.query_embedder = QueryEmbeddingCoalescer(
+        embedding_client=app.embedding_client,
+        window_ms=settings.QUERY_EMBEDDING_BATCH_WINDOW_MS,
+        max_items=settings.QUERY_EMBEDDING_BATCH_MAX_ITEMS
+    )
+
+    app.query_embedding_cache = None
+    if settings.QUERY_EMBEDDING_CACHE_ENABLED:
+        app.query_embedding_cache = QueryEmbeddingCache(
+            max_size_bytes=settings.QUERY_EMBEDDING_CACHE_MAX_SIZE_MB * 1024 * 1024,
+            ttl_seconds=settings.QUERY_EMBEDDING_CACHE_TTL,
+            redis_url=settings.QUERY_EMBEDDING_CACHE_REDIS_URL
+        )
+
+    app.answer_cache = None
+    if settings.ANSWER_CACHE_ENABLED:
+        app.answer_cache = AnswerCache(
+            backend=settings.ANSWER_CACHE_BACKEND,
+            max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.ANSWER_CACHE_TTL,
+            redis_url=settings.ANSWER_CACHE_REDIS_URL
+        )
+
     # VectorDB client setup
     app.vectordb_client = vector_db_provider_factory.create(provider=settings.VECTOR_DB_BACKEND)
     await app.vectordb_client.connect()
@@ -53,6 +99,16 @@ async def lifespan(app: FastAPI):
     # app.state.mongo_conn.close()
     await app.db_engine.dispose()
     await app.vectordb_client.disconnect()
+    if app.query_embedding_cache:
+        await app.query_embedding_cache.close()
+    if app.answer_cache:
+        await app.answer_cache.close()
+
+    llm_clients = [app.generation_client, app.embedding_client]
+    if app.generation_hedger and app.generation_hedger.secondary_client is not app.generation_client:
+        llm_clients.append(app.generation_hedger.secondary_client)
+    for llm_client in llm_clients:
+        await llm_client.close()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -3,7 +3,7 @@ from .db_schemes import Asset
 from .enums.DataBaseEnum import DataBaseEnum
 from bson.objectid import ObjectId
 from sqlalchemy.future import select
-from sqlalchemy import func, delete
+from sqlalchemy import func, delete, update
 
 class AssetModel(BaseDataModel):
     
@@ -46,4 +46,37 @@ class AssetModel(BaseDataModel):
             )
             result = await session.execute(stmt)
             record = result.scalar_one_or_none()
-        return record
\ No newline at end of file
+        return record
+
+    async def get_asset_by_hash(self, asset_project_id: str, asset_hash: str):
+
+        async with self.db_client() as session:
+            stmt = select(Asset).where(
+                Asset.asset_project_id == asset_project_id,
+                Asset.asset_hash == asset_hash
+            ).limit(1)
+            result = await session.execute(stmt)
+            record = result.scalar_one_or_none()
+        return record
+
+    async def update_asset_config(self, asset_id: int, asset_config: dict):
+
+        async with self.db_client() as session:
+            async with session.begin():
+                stmt = update(Asset).where(
+                    Asset.asset_id == asset_id
+                ).values(asset_config=asset_config)
+                await session.execute(stmt)
+            await session.commit()
+        return True
+
+    async def delete_asset(self, asset_id: int):
+
+        async with self.db_client() as session:
+            async with session.begin():
+                stmt = delete(Asset).where(
+                    Asset.asset_id == asset_id
+                )
+                result = await session.execute(stmt)
+            await session.commit()
+        return result.rowcount
@@ -4,7 +4,9 @@ from .enums.DataBaseEnum import DataBaseEnum
 from bson.objectid import ObjectId
 from pymongo import InsertOne
 from sqlalchemy.future import select
-from sqlalchemy import func, delete
+from sqlalchemy import func, delete, insert
+import uuid
+import json
 
 
 class ChunkModel(BaseDataModel):
@@ -43,6 +45,60 @@ class ChunkModel(BaseDataModel):
             await session.commit()
         return len(chunks)
 
+    async def bulk_insert_chunks(self, chunks: list[dict], return_ids: bool = False, batch_size: int = 1000):
+        """
+        Inserts plain chunk rows (dicts keyed by DataChunk column names) without the ORM unit of work.
+        Rows are streamed with COPY, or with multi-row INSERT ... RETURNING when the chunk_ids are needed.
+        """
+        if not chunks:
+            return [] if return_ids else 0
+
+        if return_ids:
+            chunks_ids = []
+            async with self.db_client() as session:
+                async with session.begin():
+                    for i in range(0, len(chunks), batch_size):
+                        batch = [
+                            {**chunk, "chunk_uuid": uuid.uuid4()}
+                            for chunk in chunks[i:i + batch_size]
+                        ]
+                        result = await session.execute(
+                            insert(DataChunk).returning(DataChunk.chunk_id),
+                            batch
+                        )
+                        chunks_ids.extend(result.scalars().all())
+            return chunks_ids
+
+        columns = [
+            "chunk_uuid", "chunk_text", "chunk_metadata", "chunk_order",
+            "chunk_text_hash", "chunk_token_count", "chunk_project_id", "chunk_asset_id"
+        ]
+
+        async with self.db_client() as session:
+            async with session.begin():
+                connection = await session.connection()
+                raw_connection = await connection.get_raw_connection()
+
+                await raw_connection.driver_connection.copy_records_to_table(
+                    DataChunk.__tablename__,
+                    records=(
+                        (
+                            uuid.uuid4(),
+                            chunk["chunk_text"],
+                            json.dumps(chunk.get("chunk_metadata"), ensure_ascii=False) if chunk.get("chunk_metadata") is not None else None,
+                            chunk["chunk_order"],
+                            chunk.get("chunk_text_hash"),
+                            chunk.get("chunk_token_count"),
+                            chunk["chunk_project_id"],
+                            chunk["chunk_asset_id"],
+                        )
+                        for chunk in chunks
+                    ),
+                    columns=columns
+                )
+
+        return len(chunks)
+
     async def delete_chunks_by_project_id(self, project_id: ObjectId):
         async with self.db_client() as session:
             async with session.begin():
@@ -51,6 +107,22 @@ class ChunkModel(BaseDataModel):
 
         return result.rowcount
 
+    async def delete_chunks_by_asset_id(self, asset_id: int):
+        async with self.db_client() as session:
+            async with session.begin():
+                result = await session.execute(delete(DataChunk).where(DataChunk.chunk_asset_id == asset_id))
+            await session.commit()
+
+        return result.rowcount
+
+    async def get_chunks_ids_by_asset_id(self, asset_id: int) -> list[int]:
+        async with self.db_client() as session:
+            stmt = select(DataChunk.chunk_id).where(DataChunk.chunk_asset_id == asset_id)
+            result = await session.execute(stmt)
+            records = result.scalars().all()
+
+        return records
+
     async def get_chunks_by_project_id(self, project_id: ObjectId, page_no= 1, page_size= 100) -> list[DataChunk]:
         async with self.db_client() as session:
             stmt = select(DataChunk).where(DataChunk.chunk_project_id == project_id).offset((page_no - 1) * page_size).limit(page_size)
@@ -59,6 +131,60 @@ class ChunkModel(BaseDataModel):
         
         return records
 
+    async def get_chunks_by_project_id_after(self, project_id: int, last_chunk_id: int = 0, page_size: int = 100) -> list[DataChunk]:
+        """
+        Keyset pagination over the project chunks, ordered by chunk_id.
+        Pass the chunk_id of the last record of the previous page to get the next one.
+        """
+        async with self.db_client() as session:
+            stmt = select(DataChunk).where(
+                DataChunk.chunk_project_id == project_id,
+                DataChunk.chunk_id > last_chunk_id
+            ).order_by(DataChunk.chunk_id).limit(page_size)
+            result = await session.execute(stmt)
+            records = result.scalars().all()
+
+        return records
+
+    async def get_first_chunks_ids_by_text_hash(self, project_id: int, text_hashes: list[str]) -> dict:
+        """
+        Maps every text hash to the smallest chunk_id carrying it in the project.
+        """
+        if not text_hashes:
+            return {}
+
+        async with self.db_client() as session:
+            stmt = select(DataChunk.chunk_text_hash, func.min(DataChunk.chunk_id)).where(
+                DataChunk.chunk_project_id == project_id,
+                DataChunk.chunk_text_hash.in_(set(text_hashes))
+            ).group_by(DataChunk.chunk_text_hash)
+            result = await session.execute(stmt)
+            records = result.all()
+
+        return {text_hash: chunk_id for text_hash, chunk_id in records}
+
+    async def get_asset_ids_by_text_hash(self, project_id: int, text_hashes: list[str]) -> dict:
+        """
+        Maps every text hash to the assets having a chunk with it in the project.
+        """
+        if not text_hashes:
+            return {}
+
+        async with self.db_client() as session:
+            stmt = select(DataChunk.chunk_text_hash, DataChunk.chunk_asset_id).where(
+                DataChunk.chunk_project_id == project_id,
+                DataChunk.chunk_text_hash.in_(set(text_hashes))
+            ).distinct()
+            result = await session.execute(stmt)
+            records = result.all()
+
+        assets_ids = {}
+        for text_hash, asset_id in records:
+            if asset_id is not None:
+                assets_ids.setdefault(text_hash, []).append(asset_id)
+
+        return assets_ids
+
     async def get_total_chunks_count(self, project_id: ObjectId) -> int:
         total_count = 0
         async with self.db_client() as session:
@@ -0,0 +1,105 @@
+from .BaseDataModel import BaseDataModel
+from .db_schemes import EmbeddingCache
+from sqlalchemy.future import select
+from sqlalchemy import func, update, delete
+from sqlalchemy.dialects.postgresql import insert
+from array import array
+
+
+class EmbeddingCacheModel(BaseDataModel):
+    def __init__(self, db_client: object):
+        super().__init__(db_client)
+        self.db_client = db_client
+
+    @classmethod
+    async def create_instance(cls, db_client: object):
+        instance = cls(db_client)
+        return instance
+
+    @staticmethod
+    def pack_embedding(vector: list) -> bytes:
+        return array("f", vector).tobytes()
+
+    @staticmethod
+    def unpack_embedding(blob: bytes) -> list:
+        vector = array("f")
+        vector.frombytes(blob)
+        return vector.tolist()
+
+    async def get_embeddings(self, embedding_model_id: str, document_type: str, text_hashes: list[str]) -> dict:
+        """
+        Returns the cached vectors of the given text hashes, and marks them as recently used.
+        """
+        if not text_hashes:
+            return {}
+
+        async with self.db_client() as session:
+            async with session.begin():
+                stmt = select(EmbeddingCache.cache_id, EmbeddingCache.text_hash, EmbeddingCache.embedding).where(
+                    EmbeddingCache.embedding_model_id == embedding_model_id,
+                    EmbeddingCache.document_type == document_type,
+                    EmbeddingCache.text_hash.in_(set(text_hashes))
+                )
+                result = await session.execute(stmt)
+                records = result.all()
+
+                if len(records):
+                    await session.execute(
+                        update(EmbeddingCache).where(
+                            EmbeddingCache.cache_id.in_([r.cache_id for r in records])
+                        ).values(last_used_at=func.now())
+                    )
+
+        return {
+            record.text_hash: self.unpack_embedding(record.embedding)
+            for record in records
+        }
+
+    async def insert_embeddings(self, embedding_model_id: str, document_type: str, embeddings: dict) -> int:
+        """
+        Stores the {text_hash: vector} pairs, entries already in the cache are left untouched.
+        """
+        if not embeddings:
+            return 0
+
+        values = [
+            {
+                "embedding_model_id": embedding_model_id,
+                "document_type": document_type,
+                "text_hash": text_hash,
+                "embedding": self.pack_embedding(vector),
+                "embedding_size": len(vector)
+            }
+            for text_hash, vector in embeddings.items()
+        ]
+
+        async with self.db_client() as session:
+            async with session.begin():
+                stmt = insert(EmbeddingCache).values(values).on_conflict_do_nothing(
+                    index_elements=["embedding_model_id", "document_type", "text_hash"]
+                )
+                await session.execute(stmt)
+
+        return len(values)
+
+    async def evict_by_size(self, max_size_bytes: int) -> int:
+        """
+        Deletes the least recently used entries until the cached vectors fit in `max_size_bytes`.
+        """
+        async with self.db_client() as session:
+            async with session.begin():
+                running_size = select(
+                    EmbeddingCache.cache_id,
+                    func.sum(func.octet_length(EmbeddingCache.embedding)).over(
+                        order_by=(EmbeddingCache.last_used_at.desc(), EmbeddingCache.cache_id.desc())
+                    ).label("running_size")
+                ).subquery()
+
+                stmt = delete(EmbeddingCache).where(
+                    EmbeddingCache.cache_id.in_(
+                        select(running_size.c.cache_id).where(running_size.c.running_size > max_size_bytes)
+                    )
+                )
+                result = await session.execute(stmt)
+
+        return result.rowcount
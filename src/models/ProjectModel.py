@@ -2,7 +2,7 @@ from .BaseDataModel import BaseDataModel
 from .db_schemes.minirag.schemes.project import Project 
 from .enums.DataBaseEnum import DataBaseEnum
 from sqlalchemy.future import select
-from sqlalchemy import func
+from sqlalchemy import func, update
 
 
 class ProjectModel(BaseDataModel):
@@ -53,3 +53,23 @@ class ProjectModel(BaseDataModel):
                 projects = await session.execute(query).scalars().all()
 
                 return projects, total_pages
+
+    async def update_project_search_params(self, project_id: int, search_params: dict):
+        async with self.db_client() as session:
+            async with session.begin():
+                stmt = update(Project).where(
+                    Project.project_id == project_id
+                ).values(project_search_params=search_params)
+                await session.execute(stmt)
+            await session.commit()
+        return True
+
+    async def bump_index_version(self, project_id: int):
+        async with self.db_client() as session:
+            async with session.begin():
+                stmt = update(Project).where(
+                    Project.project_id == project_id
+                ).values(project_index_version=Project.project_index_version + 1)
+                await session.execute(stmt)
+            await session.commit()
+        return True
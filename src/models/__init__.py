@@ -1,2 +1,2 @@
 from .enums.ResponseEnums import ResponseSignal
-from .enums.ProcessingEnums import ProcessingEnum
\ No newline at end of file
+from .enums.ProcessingEnums import ProcessingEnum, ExtractionModeEnum
\ No newline at end of file
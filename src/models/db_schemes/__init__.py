@@ -1 +1 @@
-from models.db_schemes.minirag.schemes import Project, DataChunk, RetrievedDocument, Asset
\ No newline at end of file
+from models.db_schemes.minirag.schemes import Project, DataChunk, RetrievedDocument, SearchParams, SearchFilter, Asset, EmbeddingCache
\ No newline at end of file
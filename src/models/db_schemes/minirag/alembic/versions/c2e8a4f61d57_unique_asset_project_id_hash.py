@@ -0,0 +1,74 @@
+"""unique asset project id hash
+
+Revision ID: c2e8a4f61d57
+Revises: b7d1e5f3a902
+Create Date: 2026-10-18 19:04:12.518330
+
+"""
+from typing import Sequence, Union
+import hashlib
+import os
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2e8a4f61d57'
+down_revision: Union[str, Sequence[str], None] = 'b7d1e5f3a902'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# src/assets/files, as in BaseController.files_dir
+FILES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))),
+    "assets", "files"
+)
+READ_CHUNK_SIZE = 512 * 1024
+
+
+def get_file_hash(file_path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(READ_CHUNK_SIZE):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    connection = op.get_bind()
+
+    # hash the files uploaded before the asset hash existed
+    assets = connection.execute(sa.text(
+        "SELECT asset_id, asset_project_id, asset_name FROM assets "
+        "WHERE asset_hash IS NULL AND asset_type = 'file'"
+    )).fetchall()
+
+    for asset in assets:
+        file_path = os.path.join(FILES_DIR, str(asset.asset_project_id), asset.asset_name)
+        if not os.path.isfile(file_path):
+            continue
+        connection.execute(
+            sa.text("UPDATE assets SET asset_hash = :asset_hash WHERE asset_id = :asset_id"),
+            {"asset_hash": get_file_hash(file_path), "asset_id": asset.asset_id}
+        )
+
+    # files already uploaded twice keep their chunks, only the first asset is matched by hash
+    connection.execute(sa.text(
+        "UPDATE assets SET asset_hash = NULL WHERE asset_id IN ("
+        " SELECT asset_id FROM ("
+        "  SELECT asset_id, row_number() OVER (PARTITION BY asset_project_id, asset_hash ORDER BY asset_id) AS rank"
+        "  FROM assets WHERE asset_hash IS NOT NULL"
+        " ) ranked WHERE rank > 1"
+        ")"
+    ))
+
+    op.drop_index('ix_asset_project_id_hash', table_name='assets')
+    op.create_index('ix_asset_project_id_hash', 'assets', ['asset_project_id', 'asset_hash'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_asset_project_id_hash', table_name='assets')
+    op.create_index('ix_asset_project_id_hash', 'assets', ['asset_project_id', 'asset_hash'], unique=False)
@@ -1,5 +1,6 @@
 from .minirag_base import SQLAlchemyBase
 from .asset import Asset   
 from .project import Project
-from .datachunk import DataChunk, RetrievedDocument
-from .celery_task_execution import CeleryTaskExecution
\ No newline at end of file
+from .datachunk import DataChunk, RetrievedDocument, SearchParams, SearchFilter
+from .celery_task_execution import CeleryTaskExecution
+from .embedding_cache import EmbeddingCache
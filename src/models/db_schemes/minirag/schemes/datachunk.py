@@ -4,6 +4,7 @@ from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 import uuid
 from pydantic import BaseModel
+from typing import Optional, List, Dict, Union
 
 
 
@@ -16,6 +17,8 @@ class DataChunk(SQLAlchemyBase):
     chunk_text = Column(String, nullable=False)
     chunk_metadata = Column(JSONB, nullable=True)
     chunk_order = Column(Integer, nullable=False)
+    chunk_text_hash = Column(String(64), nullable=True)  # SHA-256 of the normalized text
+    chunk_token_count = Column(Integer, nullable=True)
 
     chunk_project_id = Column(Integer, ForeignKey("projects.project_id"), nullable=False)
     chunk_asset_id = Column(Integer, ForeignKey("assets.asset_id"), nullable=False)
@@ -26,9 +29,31 @@ class DataChunk(SQLAlchemyBase):
     __table_args__ = (
         Index("ix_chunk_project_id", chunk_project_id),
         Index("ix_chunk_asset_id", chunk_asset_id),
+        Index("ix_chunk_project_id_text_hash", chunk_project_id, chunk_text_hash),
+        Index("ix_chunk_project_id_chunk_id", chunk_project_id, chunk_id),
     )  
 
 
 class RetrievedDocument(BaseModel):
     text: str
-    score: float 
\ No newline at end of file
+    score: float
+    chunk_id: Optional[int] = None
+    token_count: Optional[int] = None
+
+
+class SearchParams(BaseModel):
+    ef_search: Optional[int] = None  # HNSW candidate list size: pgvector hnsw.ef_search, Qdrant hnsw_ef
+    probes: Optional[int] = None     # IVFFlat lists scanned: pgvector ivfflat.probes
+    exact: Optional[bool] = None     # bypass the index for an exact scan
+
+
+class SearchFilter(BaseModel):
+    # with VECTOR_DB_DEDUP_CHUNKS a deduplicated chunk matches the assets of all its copies,
+    # but its metadata and pages are the first copy's; disable it for exact page filters
+    asset_ids: Optional[List[int]] = None
+    metadata: Optional[Dict[str, Union[str, int, float, bool]]] = None  # exact chunk metadata matches
+    page_from: Optional[int] = None  # chunks spanning at least one page of [page_from, page_to]
+    page_to: Optional[int] = None
+
+    def is_empty(self) -> bool:
+        return not self.asset_ids and not self.metadata and self.page_from is None and self.page_to is None 
\ No newline at end of file
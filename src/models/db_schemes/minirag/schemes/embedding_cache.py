@@ -0,0 +1,23 @@
+from .minirag_base import SQLAlchemyBase
+from sqlalchemy import Column, Integer, DateTime, func, String, LargeBinary, Index
+
+
+class EmbeddingCache(SQLAlchemyBase):
+    __tablename__ = "embedding_cache"
+
+    cache_id = Column(Integer, primary_key=True, autoincrement=True)
+
+    embedding_model_id = Column(String, nullable=False)
+    document_type = Column(String(20), nullable=False)
+    text_hash = Column(String(64), nullable=False)  # SHA-256 of the embedded text
+
+    embedding = Column(LargeBinary, nullable=False)  # packed float32 values
+    embedding_size = Column(Integer, nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_embedding_cache_key", embedding_model_id, document_type, text_hash, unique=True),
+        Index("ix_embedding_cache_last_used_at", last_used_at),
+    )
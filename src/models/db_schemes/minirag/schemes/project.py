@@ -1,6 +1,6 @@
 from .minirag_base import SQLAlchemyBase
-from sqlalchemy import Column, Integer, DateTime, func
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, Integer, DateTime, func, text
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 import uuid
 from sqlalchemy.orm import relationship
 
@@ -10,6 +10,12 @@ class Project(SQLAlchemyBase):
     project_id = Column(Integer, primary_key=True, autoincrement=True)
     project_uuid = Column(UUID(as_uuid=True), default=uuid.uuid4, unique=True, nullable=False)
 
+    # bumped whenever the project vectors change, used to invalidate the cached answers
+    project_index_version = Column(Integer, nullable=False, default=0, server_default=text("0"))
+
+    # default vector search params of the project, overridden field by field by the requests
+    project_search_params = Column(JSONB, nullable=True)
+
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), nullable=True)
     
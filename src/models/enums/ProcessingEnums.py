@@ -2,4 +2,8 @@ from enum import Enum
 
 class ProcessingEnum(Enum):
     TXT = ".txt"
-    PDF = ".pdf"
\ No newline at end of file
+    PDF = ".pdf"
+
+class ExtractionModeEnum(Enum):
+    SERIAL = "SERIAL"
+    PARALLEL = "PARALLEL"
@@ -7,6 +7,7 @@ class ResponseSignal(Enum):
     FILE_SIZE_EXCEEDED = "File_size_exceeded"
     FILE_UPLOAD_FAILED = "File_upload_failed"
     FILE_UPLOAD_SUCCESS = "File_upload_successful"
+    FILE_ALREADY_EXISTS = "File_already_exists"
     PROCESSING_FAILED = "Processing_failed"
     PROCESSING_SUCCESS = "Processing_successful"
     NO_FILES_ERROR = "not_found_files"
@@ -17,8 +18,10 @@ class ResponseSignal(Enum):
     VECTORDB_COLLECTION_RETRIEVED = "vectordb_collection_retrieved"
     VECTORDB_SEARCH_ERROR = "vectordb_search_error"
     VECTORDB_SEARCH_SUCCESS = "vectordb_search_success"
+    PROJECT_SEARCH_PARAMS_UPDATED = "project_search_params_updated"
     RAG_ANSWER_ERROR = "rag_answer_error"
     RAG_ANSWER_SUCCESS = "rag_answer_success"
+    RAG_ANSWER_TIMEOUT = "rag_answer_timeout"
     DATA_PUSH_TASK_READY = "data_push_task_ready"
     PROCESS_AND_PUSH_WORKFLOW_READY = "process_and_push_workflow_ready"
     
\ No newline at end of file
@@ -4,8 +4,10 @@ from controllers import DataController, ProjectController, ProcessController, NL
 from fastapi.responses import JSONResponse
 import os
 import aiofiles
+import hashlib
 from models import ResponseSignal
 import logging
+from sqlalchemy.exc import IntegrityError
 from .schemes.data import ProcessRequest
 from models.ProjectModel import ProjectModel
 from models.db_schemes import DataChunk, Asset
@@ -48,9 +50,15 @@ async def upload_data(request: Request, project_id: int, file: UploadFile, app_s
         project_id=project_id
     )
 
+    # hash and size are computed while the stream is written to disk
+    file_hash = hashlib.sha256()
+    file_size = 0
+
     try:
         async with aiofiles.open(file_path, 'wb') as f:
             while chunk := await file.read(app_settings.FILE_DEFAULT_CHUNK_SIZE):
+                file_hash.update(chunk)
+                file_size += len(chunk)
                 await f.write(chunk)
     except Exception as e:
         logger.error(f"Error while writing file {file.filename} to disk: {e}")
@@ -64,22 +72,51 @@ async def upload_data(request: Request, project_id: int, file: UploadFile, app_s
     asset_model = await AssetModel.create_instance(
         db_client=request.app.state.db_client
     )
+
+    # skip byte-identical files that were already uploaded to the project
+    existing_asset = await asset_model.get_asset_by_hash(
+        asset_project_id=project.project_id,
+        asset_hash=file_hash.hexdigest()
+    )
+
+    if existing_asset is not None:
+        os.remove(file_path)
+        return get_existing_asset_response(existing_asset=existing_asset)
     
     asset_resource = Asset(
         asset_project_id=project.project_id,
         asset_type=AssetTypeEnum.FILE.value,
         asset_name=file_id,
-        asset_size=os.path.getsize(file_path)
-
+        asset_size=file_size,
+        asset_hash=file_hash.hexdigest()
     )
 
-    asset_record = await asset_model.create_asset(asset=asset_resource)
+    try:
+        asset_record = await asset_model.create_asset(asset=asset_resource)
+    except IntegrityError:
+        # a concurrent upload of the same file was stored first, the unique (project, hash) index rejected this one
+        os.remove(file_path)
+        existing_asset = await asset_model.get_asset_by_hash(
+            asset_project_id=project.project_id,
+            asset_hash=file_hash.hexdigest()
+        )
+        return get_existing_asset_response(existing_asset=existing_asset)
 
     return JSONResponse(
         status_code=status.HTTP_200_OK,
         content={"signal": ResponseSignal.FILE_UPLOAD_SUCCESS.value,
                  "file_id": file_id,
-                 "file_id": str(asset_record.asset_id),
+                 "asset_id": str(asset_record.asset_id),
+                }
+    )
+
+
+def get_existing_asset_response(existing_asset: Asset) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content={"signal": ResponseSignal.FILE_ALREADY_EXISTS.value,
+                 "file_id": existing_asset.asset_name,
+                 "asset_id": str(existing_asset.asset_id),
                 }
     )
 
@@ -98,7 +135,8 @@ async def process_endpoint(request: Request, project_id: int, process_request: P
         file_id=process_request.file_id,
         chunk_size=chunk_size,
         overlap_size=overlap_size,
-        do_reset=do_reset
+        do_reset=do_reset,
+        incremental=process_request.incremental
     )
 
     return JSONResponse(
@@ -122,7 +160,8 @@ async def process_and_push_endpoint(request: Request, project_id: int, process_r
         file_id=process_request.file_id,
         chunk_size=chunk_size,
         overlap_size=overlap_size,
-        do_reset=do_reset
+        do_reset=do_reset,
+        incremental=process_request.incremental
     )
 
     return JSONResponse(
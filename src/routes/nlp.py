@@ -1,9 +1,14 @@
-from fastapi import FastAPI, APIRouter, status, Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, status, Request, Depends
+from fastapi.responses import JSONResponse, StreamingResponse
 import logging 
+import json
+import time
+import asyncio
+from helpers.config import get_settings, Settings
 from models.ProjectModel import ProjectModel
 from models.ChunkModel import ChunkModel
 from routes.schemes.nlp import PushRequest, SearchRequest
+from models.db_schemes import SearchParams
 from controllers import NLPController
 from models import ResponseSignal
 from tqdm.auto import tqdm
@@ -19,7 +24,11 @@ nlp_router = APIRouter(
 @nlp_router.post("/index/push/{project_id}")
 async def index_project(request: Request, project_id: int, push_request: PushRequest):
 
-    task = index_data_content.delay(project_id=project_id, do_reset=push_request.do_reset)
+    task = index_data_content.delay(
+        project_id=project_id,
+        do_reset=push_request.do_reset,
+        incremental=push_request.incremental
+    )
 
     return JSONResponse(
         status_code=status.HTTP_202_ACCEPTED,
@@ -40,7 +49,11 @@ async def get_project_index_info(request: Request, project_id: int):
         vectordb_client=request.app.vectordb_client,
         generation_client=request.app.generation_client,
         embedding_client=request.app.embedding_client,
-        template_parser=request.app.template_parser
+        template_parser=request.app.template_parser,
+        query_embedder=request.app.query_embedder,
+        query_embedding_cache=request.app.query_embedding_cache,
+        answer_cache=request.app.answer_cache,
+        generation_hedger=request.app.generation_hedger
     )
 
     collection_info = await nlp_controller.get_vector_db_collection_info(project=project)
@@ -53,6 +66,25 @@ async def get_project_index_info(request: Request, project_id: int):
         }
     )
 
+@nlp_router.post("/index/search-params/{project_id}")
+async def set_project_search_params(request: Request, project_id: int, search_params: SearchParams):
+    project_model = await ProjectModel.create_instance(db_client=request.app.state.db_client)
+    project = await project_model.get_project_or_create_one(project_id=project_id)
+
+    # the defaults apply to the searches that do not set the params themselves
+    _ = await project_model.update_project_search_params(
+        project_id=project.project_id,
+        search_params=search_params.dict(exclude_none=True)
+    )
+
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content={
+            "signal": ResponseSignal.PROJECT_SEARCH_PARAMS_UPDATED.value,
+            "search_params": search_params.dict(exclude_none=True)
+        }
+    )
+
 @nlp_router.post("/index/search/{project_id}")
 async def search_index(request: Request, project_id: int, search_request: SearchRequest):
     project_model = await ProjectModel.create_instance(db_client=request.app.state.db_client)
@@ -62,13 +94,19 @@ async def search_index(request: Request, project_id: int, search_request: Search
         vectordb_client=request.app.vectordb_client,
         generation_client=request.app.generation_client,
         embedding_client=request.app.embedding_client,
-        template_parser=request.app.template_parser
+        template_parser=request.app.template_parser,
+        query_embedder=request.app.query_embedder,
+        query_embedding_cache=request.app.query_embedding_cache,
+        answer_cache=request.app.answer_cache,
+        generation_hedger=request.app.generation_hedger
     )
 
     results = await nlp_controller.search_vector_db_collection(
         project=project,
         text=search_request.text,
-        limit=search_request.limit
+        limit=search_request.limit,
+        search_params=search_request.search_params,
+        search_filter=search_request.search_filter
     )
 
     if not results:
@@ -88,7 +126,7 @@ async def search_index(request: Request, project_id: int, search_request: Search
     )
 
 @nlp_router.post("/index/answer/{project_id}")
-async def answer_rag(request: Request, project_id: int, search_request: SearchRequest):
+async def answer_rag(request: Request, project_id: int, search_request: SearchRequest, app_settings: Settings = Depends(get_settings)):
     project_model = await ProjectModel.create_instance(db_client=request.app.state.db_client)
     project = await project_model.get_project_or_create_one(project_id=project_id)
 
@@ -96,14 +134,34 @@ async def answer_rag(request: Request, project_id: int, search_request: SearchRe
         vectordb_client=request.app.vectordb_client,
         generation_client=request.app.generation_client,
         embedding_client=request.app.embedding_client,
-        template_parser=request.app.template_parser
+        template_parser=request.app.template_parser,
+        query_embedder=request.app.query_embedder,
+        query_embedding_cache=request.app.query_embedding_cache,
+        answer_cache=request.app.answer_cache,
+        generation_hedger=request.app.generation_hedger
     )
 
-    answer, full_prompt, chat_history = await nlp_controller.answer_rag_question(
-        project=project,
-        query=search_request.text,
-        limit=search_request.limit
-    )
+    # the query embedding, the search and the generation all have to finish before the deadline
+    timeout_seconds = search_request.timeout_seconds or app_settings.GENERATION_TIMEOUT_SECONDS
+    deadline = time.monotonic() + timeout_seconds if timeout_seconds else None
+
+    try:
+        answer, full_prompt, chat_history, cache_hit = await nlp_controller.answer_rag_question(
+            project=project,
+            query=search_request.text,
+            limit=search_request.limit,
+            deadline=deadline,
+            search_params=search_request.search_params,
+            search_filter=search_request.search_filter
+        )
+    except asyncio.TimeoutError:
+        logger.warning(f"RAG answer for project {project_id} exceeded its {timeout_seconds}s deadline.")
+        return JSONResponse(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            content={
+                "signal": ResponseSignal.RAG_ANSWER_TIMEOUT.value
+            }
+        )
 
     if not answer:
         return JSONResponse(
@@ -113,12 +171,92 @@ async def answer_rag(request: Request, project_id: int, search_request: SearchRe
             }
         )
 
+    content = {
+        "signal": ResponseSignal.RAG_ANSWER_SUCCESS.value,
+        "answer": answer,
+        "cache_hit": cache_hit,
+    }
+    if search_request.include_prompt:
+        content["full_prompt"] = full_prompt
+        content["chat_history"] = chat_history
+
     return JSONResponse(
         status_code=status.HTTP_200_OK,
-        content={
+        content=content
+    )
+
+@nlp_router.post("/index/answer/stream/{project_id}")
+async def answer_rag_stream(request: Request, project_id: int, search_request: SearchRequest):
+    project_model = await ProjectModel.create_instance(db_client=request.app.state.db_client)
+    project = await project_model.get_project_or_create_one(project_id=project_id)
+
+    nlp_controller = NLPController(
+        vectordb_client=request.app.vectordb_client,
+        generation_client=request.app.generation_client,
+        embedding_client=request.app.embedding_client,
+        template_parser=request.app.template_parser,
+        query_embedder=request.app.query_embedder,
+        query_embedding_cache=request.app.query_embedding_cache,
+        answer_cache=request.app.answer_cache,
+        generation_hedger=request.app.generation_hedger
+    )
+
+    # the search, the first token and the whole stream have to come before the deadline
+    timeout_seconds = search_request.timeout_seconds or app_settings.GENERATION_TIMEOUT_SECONDS
+    deadline = time.monotonic() + timeout_seconds if timeout_seconds else None
+
+    try:
+        retrieved_documents, answer_stream, full_prompt, chat_history, cache_hit = await nlp_controller.stream_rag_answer(
+            project=project,
+            query=search_request.text,
+            limit=search_request.limit,
+            deadline=deadline,
+            search_params=search_request.search_params,
+            search_filter=search_request.search_filter
+        )
+    except asyncio.TimeoutError:
+        logger.warning(f"RAG answer stream for project {project_id} exceeded its {timeout_seconds}s deadline.")
+        return JSONResponse(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            content={
+                "signal": ResponseSignal.RAG_ANSWER_TIMEOUT.value
+            }
+        )
+
+    if answer_stream is None:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "signal": ResponseSignal.RAG_ANSWER_ERROR.value
+            }
+        )
+
+    async def ndjson_events():
+        # retrieval metadata goes first, then the answer tokens as they are generated
+        metadata = {
+            "type": "metadata",
             "signal": ResponseSignal.RAG_ANSWER_SUCCESS.value,
-            "answer": answer,
-            "full_prompt": full_prompt,
-            "chat_history": chat_history
+            "documents": [doc.dict() for doc in retrieved_documents],
+            "cache_hit": cache_hit,
         }
-    )
\ No newline at end of file
+        if search_request.include_prompt:
+            metadata["full_prompt"] = full_prompt
+            metadata["chat_history"] = list(chat_history)
+        yield json.dumps(metadata, ensure_ascii=False) + "\n"
+
+        try:
+            async for token in answer_stream:
+                yield json.dumps({"type": "token", "text": token}, ensure_ascii=False) + "\n"
+        except asyncio.TimeoutError:
+            # the status is already sent, the client learns about the timeout from the last event
+            logger.warning(f"RAG answer stream for project {project_id} exceeded its {timeout_seconds}s deadline.")
+            yield json.dumps({"type": "error", "signal": ResponseSignal.RAG_ANSWER_TIMEOUT.value}) + "\n"
+            return
+        except Exception as e:
+            logger.error(f"Error while streaming the answer: {e}")
+            yield json.dumps({"type": "error", "signal": ResponseSignal.RAG_ANSWER_ERROR.value}) + "\n"
+            return
+
+        yield json.dumps({"type": "done"}) + "\n"
+
+    return StreamingResponse(ndjson_events(), media_type="application/x-ndjson")
\ No newline at end of file
@@ -5,4 +5,5 @@ class ProcessRequest(BaseModel):
     file_id: str = None
     chunk_size: Optional[int] = 100
     overlap_size: Optional[int] = 20
-    do_reset: Optional[bool] = False
\ No newline at end of file
+    do_reset: Optional[bool] = False
+    incremental: Optional[bool] = False
\ No newline at end of file
@@ -1,10 +1,16 @@
 from pydantic import BaseModel
 from typing import Optional
+from models.db_schemes import SearchParams, SearchFilter
 
 
 class PushRequest(BaseModel):
     do_reset: Optional[bool] = False
+    incremental: Optional[bool] = False
 
 class SearchRequest(BaseModel):
     text: str
-    limit: Optional[int] = 5
\ No newline at end of file
+    limit: Optional[int] = 5
+    include_prompt: Optional[bool] = True
+    timeout_seconds: Optional[float] = None
+    search_params: Optional[SearchParams] = None
+    search_filter: Optional[SearchFilter] = None
\ No newline at end of file
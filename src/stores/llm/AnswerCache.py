@@ -0,0 +1,85 @@
+from collections import OrderedDict
+from .LLMEnums import CacheBackendEnums
+from utils.text_hash import normalize_text
+from utils.metrics import ANSWER_CACHE_HITS, ANSWER_CACHE_MISSES
+import hashlib
+import json
+import logging
+import time
+
+
+class AnswerCache:
+    """
+    Caches generated RAG answers keyed by the project index version, the normalized query,
+    the ordered retrieved chunk ids and the generation settings. Re-indexing a project bumps
+    its index version, so the answers cached before are never served again.
+    """
+
+    def __init__(self, backend: str = CacheBackendEnums.MEMORY.value, max_entries: int = 10000,
+                 ttl_seconds: int = 3600, redis_url: str = None):
+        self.backend = backend
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        # key -> (expires_at, answer dict)
+        self.entries = OrderedDict()
+
+        self.redis_client = None
+        if backend == CacheBackendEnums.REDIS.value:
+            import redis.asyncio as redis
+            self.redis_client = redis.from_url(redis_url)
+
+        self.logger = logging.getLogger(__name__)
+
+    def create_key(self, project_id: int, index_version: int, query: str, chunks_ids: list,
+                   model_id: str, temperature: float) -> str:
+        key_data = json.dumps({
+            "query": normalize_text(query),
+            "chunks_ids": list(chunks_ids),
+            "model_id": model_id,
+            "temperature": temperature,
+        }, sort_keys=True)
+        key_hash = hashlib.sha256(key_data.encode("utf-8")).hexdigest()
+        return f"rag_answer:{project_id}:{index_version}:{key_hash}"
+
+    async def get(self, key: str) -> dict:
+        value = None
+
+        if self.redis_client is not None:
+            try:
+                cached = await self.redis_client.get(key)
+                value = json.loads(cached) if cached is not None else None
+            except Exception as e:
+                self.logger.warning(f"Answer cache redis get failed: {e}")
+        else:
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at < time.monotonic():
+                    self.entries.pop(key, None)
+                    value = None
+                else:
+                    self.entries.move_to_end(key)
+
+        if value is None:
+            ANSWER_CACHE_MISSES.inc()
+        else:
+            ANSWER_CACHE_HITS.inc()
+        return value
+
+    async def set(self, key: str, value: dict):
+        if self.redis_client is not None:
+            try:
+                await self.redis_client.set(key, json.dumps(value, ensure_ascii=False), ex=self.ttl_seconds)
+            except Exception as e:
+                self.logger.warning(f"Answer cache redis set failed: {e}")
+            return
+
+        self.entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    async def close(self):
+        if self.redis_client is not None:
+            await self.redis_client.close()
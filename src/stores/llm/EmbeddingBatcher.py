@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import time
+from typing import List
+
+
+class EmbeddingBatcher:
+    """
+    Packs texts into provider-sized batches and keeps several embedding requests in flight.
+    The number of in-flight requests grows by one after fast successful calls and is halved
+    on rate limits (429) or latency spikes. Vectors are returned in the input order.
+    When the provider has a scheduler, the scheduler retries the throttled calls and the batcher
+    only adapts to the rate limits it reports, otherwise the batcher retries them itself.
+    """
+
+    def __init__(self, embedding_client, max_concurrency: int = 8, min_concurrency: int = 1,
+                 max_retries: int = 5, retry_base_delay: float = 1.0):
+        self.embedding_client = embedding_client
+
+        self.max_batch_size = getattr(embedding_client, "embedding_max_batch_size", 96)
+        self.max_batch_tokens = getattr(embedding_client, "embedding_max_batch_tokens", 100_000)
+
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.concurrency = self.min_concurrency
+        self.in_flight = 0
+        self.condition = asyncio.Condition()
+
+        self.scheduler = getattr(embedding_client, "scheduler", None)
+        # retrying on top of the scheduler would multiply the attempts
+        self.max_retries = max_retries if self.scheduler is None else 0
+        # scheduler rate limits already answered by halving the concurrency
+        self.handled_rate_limits = self.get_rate_limited_count()
+        self.retry_base_delay = retry_base_delay
+        self.latency_ewma = None
+
+        self.logger = logging.getLogger(__name__)
+
+    def estimate_tokens(self, text: str) -> int:
+        # about 4 characters per token, good enough to stay under the provider budget
+        return len(text) // 4 + 1
+
+    def create_batches(self, texts: List[str]) -> List[List[int]]:
+        """Groups the text indexes into batches within the size and token limits."""
+        batches = []
+        current_batch, current_tokens = [], 0
+
+        for idx, text in enumerate(texts):
+            text_tokens = self.estimate_tokens(text)
+            if current_batch and (len(current_batch) >= self.max_batch_size
+                                  or current_tokens + text_tokens > self.max_batch_tokens):
+                batches.append(current_batch)
+                current_batch, current_tokens = [], 0
+
+            current_batch.append(idx)
+            current_tokens += text_tokens
+
+        if current_batch:
+            batches.append(current_batch)
+
+        return batches
+
+    def is_rate_limit_error(self, error: Exception) -> bool:
+        return getattr(error, "status_code", None) == 429
+
+    def get_rate_limited_count(self) -> int:
+        """Rate limits seen by the provider scheduler, including the ones it retried."""
+        if self.scheduler is None:
+            return 0
+        return self.scheduler.stats["rate_limited"]
+
+    def has_new_rate_limits(self) -> bool:
+        """True once per batch of scheduler rate limits, so the concurrent calls halve it only once."""
+        rate_limited_count = self.get_rate_limited_count()
+        if rate_limited_count <= self.handled_rate_limits:
+            return False
+        self.handled_rate_limits = rate_limited_count
+        return True
+
+    async def acquire(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < self.concurrency)
+            self.in_flight += 1
+
+    async def release(self):
+        async with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def is_full_batch(self, texts: List[str]) -> bool:
+        """Only batches of comparable size are used to track the latency."""
+        return (2 * len(texts) >= self.max_batch_size
+                or 2 * sum(self.estimate_tokens(t) for t in texts) >= self.max_batch_tokens)
+
+    async def adapt(self, latency: float = None, rate_limited: bool = False):
+        async with self.condition:
+            if rate_limited:
+                self.concurrency = max(self.min_concurrency, self.concurrency // 2)
+            elif self.latency_ewma is not None and latency > 2 * self.latency_ewma:
+                self.concurrency = max(self.min_concurrency, self.concurrency // 2)
+            else:
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+
+            if latency is not None:
+                self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+
+            self.condition.notify_all()
+
+    async def embed_batch(self, texts: List[str], document_type: str) -> list:
+        for attempt in range(self.max_retries + 1):
+            await self.acquire()
+            started_at = time.monotonic()
+            try:
+                vectors = await self.embedding_client.embed_text_async(text=texts, document_type=document_type)
+            except Exception as e:
+                if not self.is_rate_limit_error(e) or attempt == self.max_retries:
+                    if self.is_rate_limit_error(e):
+                        await self.adapt(rate_limited=True)
+                    raise
+                await self.adapt(rate_limited=True)
+                self.logger.warning(f"Embedding rate limited, concurrency lowered to {self.concurrency}.")
+                await asyncio.sleep(self.retry_base_delay * (2 ** attempt))
+                continue
+            finally:
+                await self.release()
+
+            # the scheduler retried throttled calls, provider-wide, while this one was in flight
+            if self.has_new_rate_limits():
+                await self.adapt(rate_limited=True)
+                self.logger.warning(f"Embedding rate limited, concurrency lowered to {self.concurrency}.")
+            # the small tail batches are faster and would skew the latency average
+            elif self.is_full_batch(texts):
+                await self.adapt(latency=time.monotonic() - started_at)
+            return vectors
+
+    async def embed(self, texts: List[str], document_type: str = None) -> list:
+        if not texts:
+            return []
+
+        batches = self.create_batches(texts)
+        batches_vectors = await asyncio.gather(*[
+            self.embed_batch(texts=[texts[idx] for idx in batch], document_type=document_type)
+            for batch in batches
+        ])
+
+        vectors = [None] * len(texts)
+        for batch, batch_vectors in zip(batches, batches_vectors):
+            if not batch_vectors or len(batch_vectors) != len(batch):
+                return None
+            for idx, vector in zip(batch, batch_vectors):
+                vectors[idx] = vector
+
+        return vectors
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from .ProviderScheduler import get_remaining_seconds
+from utils.metrics import GENERATION_HEDGED_REQUESTS
+
+
+class GenerationHedger:
+    """
+    Sends a second generation request, to the same or a secondary backend, when the first one
+    has not answered after the recent p95 latency of the primary backend, and returns the first
+    answer. Hedging starts once `min_samples` latencies were observed.
+    """
+
+    def __init__(self, primary_client, secondary_client=None, quantile: float = 0.95,
+                 min_samples: int = 20, window_size: int = 500, min_delay: float = 0.0):
+        self.primary_client = primary_client
+        self.secondary_client = secondary_client if secondary_client is not None else primary_client
+
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.latencies = deque(maxlen=window_size)
+
+        self.logger = logging.getLogger(__name__)
+
+    def get_hedge_delay(self):
+        if len(self.latencies) < self.min_samples:
+            return None
+
+        latencies = sorted(self.latencies)
+        idx = min(len(latencies) - 1, int(self.quantile * len(latencies)))
+        return max(self.min_delay, latencies[idx])
+
+    async def generate_with(self, client, prompt: str, system_prompt: str, deadline: float = None):
+        # every attempt gets its own history, in the message format of its backend
+        chat_history = [
+            client.construct_prompt(prompt=system_prompt, role=client.enums.SYSTEM.value)
+        ]
+
+        started_at = time.monotonic()
+        answer = await client.generate_text_async(
+            prompt=prompt,
+            chat_history=chat_history,
+            deadline=deadline
+        )
+
+        if answer and client is self.primary_client:
+            self.latencies.append(time.monotonic() - started_at)
+
+        return answer
+
+    def get_model_key(self, client) -> tuple:
+        return client.generation_model_id, client.default_generation_temperature
+
+    async def generate(self, prompt: str, system_prompt: str, deadline: float = None):
+        """Returns the first answer and the client that produced it."""
+        primary = asyncio.create_task(self.generate_with(self.primary_client, prompt, system_prompt, deadline))
+        attempts = {primary}
+
+        try:
+            hedge_delay = self.get_hedge_delay()
+            if hedge_delay is not None:
+                remaining = get_remaining_seconds(deadline)
+                done, _ = await asyncio.wait(
+                    attempts,
+                    timeout=hedge_delay if remaining is None else min(hedge_delay, remaining)
+                )
+
+                if not done:
+                    attempts.add(asyncio.create_task(
+                        self.generate_with(self.secondary_client, prompt, system_prompt, deadline)
+                    ))
+
+            last_error = None
+            pending = attempts
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=get_remaining_seconds(deadline),
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    raise asyncio.TimeoutError("Deadline exceeded while waiting for the generation.")
+
+                for attempt in done:
+                    if attempt.exception() is not None:
+                        last_error = attempt.exception()
+                        continue
+
+                    if attempt.result():
+                        if len(attempts) > 1:
+                            GENERATION_HEDGED_REQUESTS.labels(winner="primary" if attempt is primary else "hedge").inc()
+                        return attempt.result(), self.primary_client if attempt is primary else self.secondary_client
+
+            if last_error is not None:
+                raise last_error
+
+            return None, None
+        finally:
+            # the losing request is not needed anymore
+            for attempt in attempts:
+                if not attempt.done():
+                    attempt.cancel()
@@ -3,6 +3,7 @@ from enum import Enum
 class LLMEnums(Enum):
     OPENAI = "OPENAI"
     COHERE = "COHERE"
+    LOCAL = "LOCAL"
 
 class OpenAIEnums(Enum):
     SYSTEM = "system"
@@ -16,7 +17,14 @@ class CoHereEnums(Enum):
     DOCUMENT = "search_document"
     QUERY = "search_query"
 
+class LocalEnums(Enum):
+    HASHING = "hashing"
+
 class DocumentTypeEnum(Enum):
     DOCUMENT = "document"
     QUERY = "query"
     
+
+class CacheBackendEnums(Enum):
+    MEMORY = "MEMORY"
+    REDIS = "REDIS"
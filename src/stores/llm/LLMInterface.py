@@ -22,6 +22,27 @@ class LLMInterface(ABC):
         """Embed the provided text and return the embeddings."""
         pass
 
+    @abstractmethod
+    async def generate_text_async(self, prompt: str, max_output_tokens: int = None, temperature: float = None , chat_history: list = [],
+                                  deadline: float = None) -> str:
+        """Generate text based on the provided prompt without blocking the event loop, within the optional `time.monotonic()` deadline."""
+        pass
+
+    @abstractmethod
+    def generate_text_stream(self, prompt: str, max_output_tokens: int = None, temperature: float = None , chat_history: list = []):
+        """Async generator yielding the generated text pieces as they arrive."""
+        pass
+
+    @abstractmethod
+    async def embed_text_async(self, text: str, document_type: str = None) -> list:
+        """Embed the provided text without blocking the event loop."""
+        pass
+
+    @abstractmethod
+    async def close(self):
+        """Release the connections of the async client."""
+        pass
+
     @abstractmethod
     def construct_prompt(self, prompt: str, role: str) -> str:
         """Construct a prompt using the query and context."""
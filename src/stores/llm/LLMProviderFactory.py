@@ -1,10 +1,23 @@
-from .LLMEnums import LLMEnums
-from .providers import OpenAIProvider, CohereProvider
+import importlib.util
+from .LLMEnums import LLMEnums, LocalEnums
+from .providers import OpenAIProvider, CohereProvider, LocalProvider
+from .ProviderScheduler import get_provider_scheduler
 
 class LLMProviderFactory:
     def __init__(self, config: dict):
         self.config = config
     
+    def create_scheduler(self, provider: str, requests_per_minute: int = None, tokens_per_minute: int = None):
+        # one scheduler per provider and process, shared by the generation and embedding clients
+        return get_provider_scheduler(
+            provider=provider,
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+            max_retries=self.config.LLM_MAX_RETRIES,
+            retry_base_delay=self.config.LLM_RETRY_BASE_DELAY,
+            retry_max_delay=self.config.LLM_RETRY_MAX_DELAY
+        )
+
     def create(self, provider:str):
         if provider == LLMEnums.OPENAI.value:
             return OpenAIProvider(
@@ -13,6 +26,12 @@ class LLMProviderFactory:
                 default_input_max_characters= self.config.INPUT_DEFAULT_MAX_CHARACTERS,
                 default_generation_temperature= self.config.GENERATION_DEFAULT_TEMPERATURE,
                 default_generation_max_output_tokens=self.config.GENERATION_DEFAULT_MAX_TOKENS,
+                http_max_connections=self.config.LLM_HTTP_MAX_CONNECTIONS,
+                scheduler=self.create_scheduler(
+                    provider=provider,
+                    requests_per_minute=self.config.OPENAI_REQUESTS_PER_MINUTE,
+                    tokens_per_minute=self.config.OPENAI_TOKENS_PER_MINUTE
+                ),
             )
 
         if provider == LLMEnums.COHERE.value:
@@ -21,6 +40,27 @@ class LLMProviderFactory:
                 default_input_max_characters= self.config.INPUT_DEFAULT_MAX_CHARACTERS,
                 default_generation_temperature= self.config.GENERATION_DEFAULT_TEMPERATURE,
                 default_generation_max_output_tokens=self.config.GENERATION_DEFAULT_MAX_TOKENS,
+                http_max_connections=self.config.LLM_HTTP_MAX_CONNECTIONS,
+                scheduler=self.create_scheduler(
+                    provider=provider,
+                    requests_per_minute=self.config.COHERE_REQUESTS_PER_MINUTE,
+                    tokens_per_minute=self.config.COHERE_TOKENS_PER_MINUTE
+                ),
+            )
+
+        if provider == LLMEnums.LOCAL.value:
+            if (self.config.EMBEDDING_MODEL_ID != LocalEnums.HASHING.value
+                    and importlib.util.find_spec("sentence_transformers") is None):
+                raise ValueError("The LOCAL provider needs sentence-transformers to load the model "
+                                 f"{self.config.EMBEDDING_MODEL_ID}, install it or use the hashing model.")
+
+            return LocalProvider(
+                default_input_max_characters= self.config.INPUT_DEFAULT_MAX_CHARACTERS,
+                default_generation_temperature= self.config.GENERATION_DEFAULT_TEMPERATURE,
+                default_generation_max_output_tokens=self.config.GENERATION_DEFAULT_MAX_TOKENS,
+                num_threads=self.config.LOCAL_EMBEDDING_THREADS,
+                batch_size=self.config.LOCAL_EMBEDDING_BATCH_SIZE,
+                worker_concurrency=self.config.CELERY_WORKER_CONCURRENCY,
             )
 
         return None
@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import random
+import time
+import httpx
+import openai
+from utils.metrics import LLM_PROVIDER_CALLS, LLM_PROVIDER_RETRIES, LLM_PROVIDER_CALL_ATTEMPTS
+
+
+def get_remaining_seconds(deadline: float = None):
+    """Seconds left before the `time.monotonic()` deadline, None without deadline."""
+    if deadline is None:
+        return None
+
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise asyncio.TimeoutError("Deadline exceeded.")
+    return remaining
+
+
+class ProviderScheduler:
+    """
+    Paces the calls of one provider with token buckets for requests and tokens per minute,
+    and retries throttled or failed calls with jittered exponential backoff honouring Retry-After.
+    A rate limit pauses every caller of the scheduler, not only the throttled one.
+    The buckets are plain counters updated between awaits, so one scheduler can be shared
+    by all the coroutines, and event loops, of a process.
+    """
+
+    def __init__(self, provider: str, requests_per_minute: int = None, tokens_per_minute: int = None,
+                 max_retries: int = 5, retry_base_delay: float = 1.0, retry_max_delay: float = 60.0):
+        self.provider = provider
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+
+        self.available_requests = float(requests_per_minute or 0)
+        self.available_tokens = float(tokens_per_minute or 0)
+        self.refilled_at = time.monotonic()
+        self.paused_until = 0.0
+
+        self.stats = {"calls": 0, "retries": 0, "rate_limited": 0, "failures": 0}
+
+        self.logger = logging.getLogger(__name__)
+
+    def estimate_tokens(self, texts) -> int:
+        # about 4 characters per token, the buckets only need the order of magnitude
+        if isinstance(texts, str):
+            texts = [texts]
+        return sum(len(t) // 4 + 1 for t in texts)
+
+    def refill(self):
+        now = time.monotonic()
+        elapsed_minutes = (now - self.refilled_at) / 60
+        self.refilled_at = now
+
+        if self.requests_per_minute:
+            self.available_requests = min(
+                self.requests_per_minute,
+                self.available_requests + elapsed_minutes * self.requests_per_minute
+            )
+        if self.tokens_per_minute:
+            self.available_tokens = min(
+                self.tokens_per_minute,
+                self.available_tokens + elapsed_minutes * self.tokens_per_minute
+            )
+
+    def reserve(self, tokens: int) -> float:
+        """Takes a request and `tokens` from the buckets, or returns the seconds to wait before retrying."""
+        self.refill()
+
+        pause = self.paused_until - time.monotonic()
+        if pause > 0:
+            return pause
+
+        # a call larger than the whole bucket only waits for a full bucket
+        if self.tokens_per_minute:
+            tokens = min(tokens, self.tokens_per_minute)
+
+        waits = []
+        if self.requests_per_minute and self.available_requests < 1:
+            waits.append((1 - self.available_requests) * 60 / self.requests_per_minute)
+        if self.tokens_per_minute and self.available_tokens < tokens:
+            waits.append((tokens - self.available_tokens) * 60 / self.tokens_per_minute)
+
+        if waits:
+            return max(waits)
+
+        if self.requests_per_minute:
+            self.available_requests -= 1
+        if self.tokens_per_minute:
+            self.available_tokens -= tokens
+        return 0.0
+
+    async def acquire(self, tokens: int = 0, deadline: float = None):
+        while True:
+            wait = self.reserve(tokens)
+            if wait <= 0:
+                return
+
+            remaining = get_remaining_seconds(deadline)
+            if remaining is not None and wait >= remaining:
+                raise asyncio.TimeoutError("Deadline exceeded while waiting for the provider rate limit.")
+            await asyncio.sleep(wait)
+
+    def get_status_code(self, error: Exception):
+        return getattr(error, "status_code", None)
+
+    def is_retryable_error(self, error: Exception) -> bool:
+        if isinstance(error, (openai.APIConnectionError, httpx.TransportError, asyncio.TimeoutError)):
+            return True
+
+        status_code = self.get_status_code(error)
+        return status_code is not None and (status_code in (408, 409, 429) or status_code >= 500)
+
+    def get_retry_after(self, error: Exception):
+        """Seconds asked by the provider in the Retry-After headers, if any."""
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or getattr(error, "headers", None) or {}
+
+        try:
+            if headers.get("retry-after-ms"):
+                return float(headers["retry-after-ms"]) / 1000
+            if headers.get("retry-after"):
+                return float(headers["retry-after"])
+        except (TypeError, ValueError):
+            # HTTP-date values are ignored in favour of the backoff
+            return None
+
+        return None
+
+    def get_backoff_delay(self, attempt: int, error: Exception) -> float:
+        retry_after = self.get_retry_after(error)
+        if retry_after is not None:
+            return min(self.retry_max_delay, retry_after)
+
+        # equal jitter keeps the delays growing while spreading the callers apart
+        delay = min(self.retry_max_delay, self.retry_base_delay * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    async def run(self, call, tokens: int = 0, operation: str = "call", deadline: float = None):
+        """
+        Awaits `call()` once the buckets allow it, retrying retryable errors up to `max_retries` times.
+        No retry is attempted once its backoff would end after the `deadline`.
+        """
+        self.stats["calls"] += 1
+
+        for attempt in range(self.max_retries + 1):
+            await self.acquire(tokens=tokens, deadline=deadline)
+
+            try:
+                result = await call()
+            except Exception as e:
+                delay = self.get_backoff_delay(attempt=attempt, error=e)
+                out_of_time = deadline is not None and time.monotonic() + delay >= deadline
+
+                if not self.is_retryable_error(e) or attempt == self.max_retries or out_of_time:
+                    self.stats["failures"] += 1
+                    LLM_PROVIDER_CALLS.labels(provider=self.provider, operation=operation, status="failure").inc()
+                    LLM_PROVIDER_CALL_ATTEMPTS.labels(provider=self.provider, operation=operation).observe(attempt + 1)
+                    raise
+
+                status_code = self.get_status_code(e)
+
+                if status_code == 429:
+                    self.stats["rate_limited"] += 1
+                    self.paused_until = max(self.paused_until, time.monotonic() + delay)
+
+                self.stats["retries"] += 1
+                LLM_PROVIDER_RETRIES.labels(
+                    provider=self.provider, operation=operation,
+                    reason=str(status_code) if status_code else type(e).__name__
+                ).inc()
+
+                self.logger.warning(f"{self.provider} {operation} failed ({status_code or type(e).__name__}), "
+                                    f"retry {attempt + 1}/{self.max_retries} in {delay:.2f}s.")
+                await asyncio.sleep(delay)
+                continue
+
+            LLM_PROVIDER_CALLS.labels(provider=self.provider, operation=operation, status="success").inc()
+            LLM_PROVIDER_CALL_ATTEMPTS.labels(provider=self.provider, operation=operation).observe(attempt + 1)
+            return result
+
+
+_schedulers = {}
+
+
+def get_provider_scheduler(provider: str, **kwargs) -> ProviderScheduler:
+    """Returns the scheduler of the provider in this process, creating it on first use."""
+    if provider not in _schedulers:
+        _schedulers[provider] = ProviderScheduler(provider=provider, **kwargs)
+    return _schedulers[provider]
@@ -0,0 +1,114 @@
+from collections import OrderedDict
+from array import array
+import hashlib
+import logging
+import time
+from utils.text_hash import normalize_text
+from utils.metrics import QUERY_EMBEDDING_CACHE_HITS, QUERY_EMBEDDING_CACHE_MISSES
+
+
+class QueryEmbeddingCache:
+    """
+    In-process LRU cache of query vectors keyed by (model, normalized query), with a TTL
+    and a memory cap. An optional Redis tier shares the vectors between workers.
+    """
+
+    def __init__(self, max_size_bytes: int, ttl_seconds: int = 3600, redis_url: str = None):
+        self.max_size_bytes = max_size_bytes
+        self.ttl_seconds = ttl_seconds
+
+        # key -> (expires_at, packed float32 vector)
+        self.entries = OrderedDict()
+        self.size_bytes = 0
+
+        self.redis_client = None
+        if redis_url:
+            import redis.asyncio as redis
+            self.redis_client = redis.from_url(redis_url)
+
+        self.logger = logging.getLogger(__name__)
+
+    def create_key(self, model_id: str, text: str) -> str:
+        text_hash = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+        return f"query_embedding:{model_id}:{text_hash}"
+
+    def pack(self, vector: list) -> bytes:
+        return array("f", vector).tobytes()
+
+    def unpack(self, blob: bytes) -> list:
+        vector = array("f")
+        vector.frombytes(blob)
+        return vector.tolist()
+
+    def get_local(self, key: str) -> bytes:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, blob = entry
+        if expires_at < time.monotonic():
+            self.remove_local(key)
+            return None
+
+        self.entries.move_to_end(key)
+        return blob
+
+    def set_local(self, key: str, blob: bytes, ttl_seconds: float = None):
+        self.remove_local(key)
+
+        entry_size = len(blob) + len(key)
+        if entry_size > self.max_size_bytes:
+            return
+
+        self.entries[key] = (time.monotonic() + (ttl_seconds or self.ttl_seconds), blob)
+        self.size_bytes += entry_size
+
+        # evict the least recently used entries
+        while self.size_bytes > self.max_size_bytes:
+            oldest_key = next(iter(self.entries))
+            self.remove_local(oldest_key)
+
+    def remove_local(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= len(entry[1]) + len(key)
+
+    async def get(self, model_id: str, text: str) -> list:
+        key = self.create_key(model_id=model_id, text=text)
+
+        blob = self.get_local(key)
+        if blob is not None:
+            QUERY_EMBEDDING_CACHE_HITS.labels(tier="local").inc()
+            return self.unpack(blob)
+
+        if self.redis_client is not None:
+            try:
+                blob = await self.redis_client.get(key)
+                ttl = await self.redis_client.ttl(key) if blob is not None else None
+            except Exception as e:
+                self.logger.warning(f"Query embedding cache redis get failed: {e}")
+                blob = None
+
+            if blob is not None:
+                QUERY_EMBEDDING_CACHE_HITS.labels(tier="redis").inc()
+                self.set_local(key, blob, ttl_seconds=ttl if ttl and ttl > 0 else None)
+                return self.unpack(blob)
+
+        QUERY_EMBEDDING_CACHE_MISSES.inc()
+        return None
+
+    async def set(self, model_id: str, text: str, vector: list):
+        key = self.create_key(model_id=model_id, text=text)
+        blob = self.pack(vector)
+
+        self.set_local(key, blob)
+
+        if self.redis_client is not None:
+            try:
+                await self.redis_client.set(key, blob, ex=self.ttl_seconds)
+            except Exception as e:
+                self.logger.warning(f"Query embedding cache redis set failed: {e}")
+
+    async def close(self):
+        if self.redis_client is not None:
+            await self.redis_client.close()
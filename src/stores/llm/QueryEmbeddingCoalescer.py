@@ -0,0 +1,75 @@
+import asyncio
+import logging
+from typing import List
+
+
+class QueryEmbeddingCoalescer:
+    """
+    Merges the single-text embedding calls that arrive within a short window
+    into one provider call, then fans the vectors back out to the waiting callers.
+    """
+
+    def __init__(self, embedding_client, window_ms: float = 5, max_items: int = 32):
+        self.embedding_client = embedding_client
+        self.window = max(0, window_ms) / 1000
+        self.max_items = max(1, max_items)
+
+        # pending (text, future) pairs and the scheduled flush, per document type
+        self.pending = {}
+        self.flush_handles = {}
+        # the event loop only keeps weak references to the tasks, in-flight batches are kept here
+        self.batch_tasks = set()
+
+        self.logger = logging.getLogger(__name__)
+
+    async def embed_text_async(self, text: str, document_type: str = None) -> List[list]:
+        """Same contract as the providers `embed_text_async` for a single text."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        pending = self.pending.setdefault(document_type, [])
+        pending.append((text, future))
+
+        if len(pending) >= self.max_items:
+            self.flush(document_type)
+        elif document_type not in self.flush_handles:
+            self.flush_handles[document_type] = loop.call_later(self.window, self.flush, document_type)
+
+        vector = await future
+        return [vector] if vector is not None else None
+
+    def flush(self, document_type: str):
+        handle = self.flush_handles.pop(document_type, None)
+        if handle is not None:
+            handle.cancel()
+
+        batch = self.pending.pop(document_type, [])
+        if batch:
+            task = asyncio.ensure_future(self.embed_batch(batch, document_type))
+            self.batch_tasks.add(task)
+            task.add_done_callback(self.on_batch_done)
+
+    def on_batch_done(self, task: asyncio.Task):
+        self.batch_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.logger.error(f"Coalesced query embedding failed: {task.exception()}")
+
+    async def embed_batch(self, batch: list, document_type: str):
+        try:
+            vectors = await self.embedding_client.embed_text_async(
+                text=[text for text, _ in batch],
+                document_type=document_type
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        if not vectors or len(vectors) != len(batch):
+            self.logger.error("Failed to embed the coalesced queries.")
+            vectors = [None] * len(batch)
+
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
@@ -1,15 +1,20 @@
 from ..LLMInterface import LLMInterface
 from ..LLMEnums import CoHereEnums, DocumentTypeEnum
+import asyncio
 import logging
 import cohere
+import httpx
 from typing import List, Union
+from ..ProviderScheduler import get_remaining_seconds
 
 class CohereProvider(LLMInterface):
 
     def __init__(self, api_key: str,
                  default_input_max_characters: int = 1000,
                  default_generation_max_output_tokens: int = 1000,
-                 default_generation_temperature: float = 0.1):
+                 default_generation_temperature: float = 0.1,
+                 http_max_connections: int = 100,
+                 scheduler=None):
 
         self.api_key = api_key 
         self.default_input_max_characters = default_input_max_characters
@@ -19,8 +24,27 @@ class CohereProvider(LLMInterface):
         self.embedding_model_id = None
         self.embedding_size = None
 
+        # request limits of the embed endpoint
+        self.embedding_max_batch_size = 96
+        self.embedding_max_batch_tokens = 96 * 512
+
         self.client = cohere.Client(api_key=self.api_key)
 
+        # paces the async calls and retries the throttled ones
+        self.scheduler = scheduler
+
+        # one connection pool shared by all the coroutines using this provider, released by close()
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=http_max_connections,
+                max_keepalive_connections=http_max_connections
+            )
+        )
+        self.async_client = cohere.AsyncClient(
+            api_key=self.api_key,
+            httpx_client=self.http_client
+        )
+
         self.enums = CoHereEnums
         self.logger = logging.getLogger(__name__)
 
@@ -37,8 +61,27 @@ class CohereProvider(LLMInterface):
     def process_text(self, text: str):
         """Process the text to fit within the maximum character limit."""
         return text[:self.default_input_max_characters].strip()
+
+    async def run_scheduled(self, call, tokens: int = 0, operation: str = "call", deadline: float = None):
+        """
+        Runs the provider call through the rate-limit scheduler when one is set.
+        Every attempt is cancelled when the `time.monotonic()` deadline passes.
+        """
+        async def bounded_call():
+            if deadline is None:
+                return await call()
+            return await asyncio.wait_for(call(), timeout=get_remaining_seconds(deadline))
+
+        if self.scheduler is None:
+            return await bounded_call()
+        return await self.scheduler.run(bounded_call, tokens=tokens, operation=operation, deadline=deadline)
+
+    def estimate_tokens(self, texts) -> int:
+        if self.scheduler is None:
+            return 0
+        return self.scheduler.estimate_tokens(texts)
     
-    def generate_text(self, prompt: str, max_output_tokens: int = None, temperature: float = None, chat_history: list = []) -> str:
+    def generate_text(self, prompt: str, max_output_tokens: int = None, temperature: float = None, chat_history: list = None) -> str:
         """Generate text based on the provided prompt."""
         if not self.client:
             self.logger.error("Cohere client is not initialized.")
@@ -53,10 +96,8 @@ class CohereProvider(LLMInterface):
 
         response = self.client.chat(
             model=self.generation_model_id,
-            chat_history=chat_history,
-            messages=[
-                self.construct_prompt(self.process_text(prompt), "user")
-            ],
+            chat_history=chat_history or [],
+            message=prompt,
             temperature=temperature,
             max_tokens=max_output_tokens
         )
@@ -98,10 +139,110 @@ class CohereProvider(LLMInterface):
         ]
 
 
+    async def generate_text_async(self, prompt: str, max_output_tokens: int = None, temperature: float = None, chat_history: list = None,
+                                  deadline: float = None) -> str:
+        """Generate text based on the provided prompt without blocking the event loop."""
+        if not self.async_client:
+            self.logger.error("Cohere async client is not initialized.")
+            return None
+
+        if not self.generation_model_id:
+            self.logger.error("Generation model ID is not set.")
+            return None
+
+        max_output_tokens = max_output_tokens if max_output_tokens else self.default_generation_max_output_tokens
+        temperature = temperature if temperature else self.default_generation_temperature
+
+        response = await self.run_scheduled(
+            lambda: self.async_client.chat(
+                model=self.generation_model_id,
+                chat_history=chat_history or [],
+                message=prompt,
+                temperature=temperature,
+                max_tokens=max_output_tokens
+            ),
+            tokens=self.estimate_tokens([prompt]) + max_output_tokens,
+            operation="generate",
+            deadline=deadline
+        )
+
+        if not response or not response.text:
+            self.logger.error("Failed to generate text.")
+            return None
+
+        return response.text if response else None
+
+    async def generate_text_stream(self, prompt: str, max_output_tokens: int = None, temperature: float = None, chat_history: list = None):
+        """Async generator yielding the generated text pieces as they arrive."""
+        if not self.async_client:
+            self.logger.error("Cohere async client is not initialized.")
+            return
+
+        if not self.generation_model_id:
+            self.logger.error("Generation model ID is not set.")
+            return
+
+        max_output_tokens = max_output_tokens if max_output_tokens else self.default_generation_max_output_tokens
+        temperature = temperature if temperature else self.default_generation_temperature
+
+        # the stream is consumed as it is opened, so it is paced but not retried
+        if self.scheduler is not None:
+            await self.scheduler.acquire(
+                tokens=self.estimate_tokens([prompt]) + max_output_tokens
+            )
+
+        async for event in self.async_client.chat_stream(
+            model=self.generation_model_id,
+            chat_history=chat_history or [],
+            message=prompt,
+            temperature=temperature,
+            max_tokens=max_output_tokens
+        ):
+            if event.event_type == "text-generation" and event.text:
+                yield event.text
+
+    async def embed_text_async(self, text: Union[str, List[str]], document_type: str = None):
+        if not self.async_client:
+            self.logger.error("Cohere async client is not initialized.")
+            return None
+
+        if isinstance(text, str):
+            text = [text]
+
+        if not self.embedding_model_id:
+            self.logger.error("Embedding model ID is not set.")
+            return None
+
+        input_type = CoHereEnums.DOCUMENT.value
+        if document_type == DocumentTypeEnum.QUERY.value:
+            input_type = CoHereEnums.QUERY.value
+
+        texts = [self.process_text(t) for t in text]
+        response = await self.run_scheduled(
+            lambda: self.async_client.embed(
+                model=self.embedding_model_id,
+                texts=texts,
+                input_type=input_type,
+                embedding_types=["float"]
+            ),
+            tokens=self.estimate_tokens(texts),
+            operation="embed"
+        )
+        if not response or not response.embeddings or not response.embeddings.float:
+            self.logger.error("Failed to embed text.")
+            return None
+
+        return [
+            f for f in response.embeddings.float
+        ]
+
+    async def close(self):
+        await self.http_client.aclose()
+
     def construct_prompt(self, prompt, role):
         return {
             "role": role, 
-            "text": prompt
+            "message": prompt
         }
     
     
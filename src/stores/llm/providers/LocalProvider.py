@@ -0,0 +1,207 @@
+from ..LLMInterface import LLMInterface
+from ..LLMEnums import LocalEnums
+import asyncio
+import hashlib
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Union
+import numpy as np
+
+
+# feature of the texts without any token, so they still get a unit vector
+EMPTY_TEXT_FEATURE = "\x00empty"
+
+
+@lru_cache(maxsize=2**18)
+def hash_token(token: str) -> int:
+    # stable across processes, unlike the builtin hash()
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def get_max_threads(worker_concurrency: int = None) -> int:
+    """
+    CPU threads one process can use without the worker processes oversubscribing the CPUs.
+    Celery runs one process per CPU when its concurrency is unset.
+    """
+    cpu_count = os.cpu_count() or 1
+    return max(1, cpu_count // (worker_concurrency or cpu_count))
+
+
+@lru_cache(maxsize=4)
+def load_sentence_transformer(model_path: str, num_threads: int):
+    """
+    Loads the model once per process, every task and provider of the process shares it.
+    A failed load raises, so it is not cached.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    # the torch thread pool is global to the process
+    torch.set_num_threads(num_threads)
+    return SentenceTransformer(model_path, device="cpu")
+
+
+class LocalProvider(LLMInterface):
+    """
+    Embeds text on the local CPU without any network call.
+    The embedding model id is either `hashing`, for deterministic feature hashing,
+    or the path of a sentence-transformers model saved on disk.
+    Text generation is not supported, it is rejected when the generation model is set.
+    """
+
+    def __init__(self, default_input_max_characters: int = 1000,
+                 default_generation_max_output_tokens: int = 1000,
+                 default_generation_temperature: float = 0.1,
+                 num_threads: int = 4,
+                 batch_size: int = 64,
+                 worker_concurrency: int = None):
+
+        self.default_input_max_characters = default_input_max_characters
+        self.default_generation_max_output_tokens = default_generation_max_output_tokens
+        self.default_generation_temperature = default_generation_temperature
+        # every worker process runs its own threads
+        self.num_threads = max(1, min(num_threads, get_max_threads(worker_concurrency)))
+        self.batch_size = max(1, batch_size)
+        self.generation_model_id = None
+        self.embedding_model_id = None
+        self.embedding_size = None
+
+        # no request limits, batches only bound the memory of one inference call
+        self.embedding_max_batch_size = self.batch_size * self.num_threads
+        self.embedding_max_batch_tokens = 10_000_000
+
+        self.model = None
+        self.executor = ThreadPoolExecutor(max_workers=self.num_threads)
+
+        self.token_pattern = re.compile(r"\w+", re.UNICODE)
+
+        self.enums = LocalEnums
+        self.logger = logging.getLogger(__name__)
+
+    def set_generation_model(self, model_id: str):
+        """The local provider has no generation model, fails at startup when used as GENERATION_BACKEND."""
+        raise ValueError("The LOCAL provider only supports embeddings, it can not be used as a generation backend.")
+
+    def set_embedding_model(self, model_id: str, embedding_size: int):
+        """Set the embedding model to be used."""
+        self.embedding_model_id = model_id
+        self.embedding_size = embedding_size
+        self.model = None
+
+        if model_id and model_id != LocalEnums.HASHING.value:
+            self.model = self.load_model(model_path=model_id)
+
+    def load_model(self, model_path: str):
+        model = load_sentence_transformer(model_path=model_path, num_threads=self.num_threads)
+
+        model_size = model.get_sentence_embedding_dimension()
+        if self.embedding_size and model_size != self.embedding_size:
+            self.logger.warning(f"Local model size {model_size} does not match the configured size {self.embedding_size}.")
+        self.embedding_size = model_size
+
+        return model
+
+    def process_text(self, text: str):
+        """Process the text to fit within the maximum character limit."""
+        return text[:self.default_input_max_characters].strip()
+
+    def generate_text(self, prompt: str, max_output_tokens: int = None, temperature: float = None, chat_history: list = None) -> str:
+        self.logger.error("Text generation is not supported by the local provider.")
+        return None
+
+    async def generate_text_async(self, prompt: str, max_output_tokens: int = None, temperature: float = None, chat_history: list = None,
+                                  deadline: float = None) -> str:
+        self.logger.error("Text generation is not supported by the local provider.")
+        return None
+
+    async def generate_text_stream(self, prompt: str, max_output_tokens: int = None, temperature: float = None, chat_history: list = None):
+        self.logger.error("Text generation is not supported by the local provider.")
+        return
+        yield
+
+    def embed_text(self, text: Union[str, List[str]], document_type: str = None):
+        if isinstance(text, str):
+            text = [text]
+
+        if not self.embedding_model_id or not self.embedding_size:
+            self.logger.error("Embedding model ID is not set.")
+            return None
+
+        texts = [self.process_text(t) for t in text]
+
+        if self.embedding_model_id == LocalEnums.HASHING.value:
+            return self.hash_embeddings(texts).tolist()
+
+        if self.model is None:
+            self.logger.error("Local embedding model is not loaded.")
+            return None
+
+        vectors = self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+        return vectors.astype(np.float32).tolist()
+
+    async def embed_text_async(self, text: Union[str, List[str]], document_type: str = None):
+        if isinstance(text, str):
+            text = [text]
+
+        # large inputs are split so every thread of the pool works on a batch
+        batches = [text[i:i + self.batch_size] for i in range(0, len(text), self.batch_size)]
+        if len(batches) == 0:
+            return []
+
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*[
+            loop.run_in_executor(self.executor, self.embed_text, batch, document_type)
+            for batch in batches
+        ])
+
+        if any(r is None for r in results):
+            return None
+
+        return [vector for batch_vectors in results for vector in batch_vectors]
+
+    def hash_embeddings(self, texts: List[str]) -> np.ndarray:
+        """
+        Signed feature hashing of the word unigrams and bigrams, L2 normalized.
+        Identical texts always map to identical vectors, texts without tokens to the same unit vector.
+        """
+        rows, hashes = [], []
+        for row, text in enumerate(texts):
+            tokens = self.token_pattern.findall(text.lower())
+            features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            if not features:
+                # an all-zero vector has no cosine similarity
+                features = [EMPTY_TEXT_FEATURE]
+            rows.extend([row] * len(features))
+            hashes.extend(hash_token(f) for f in features)
+
+        vectors = np.zeros((len(texts), self.embedding_size), dtype=np.float32)
+        if len(hashes) == 0:
+            return vectors
+
+        hashes = np.array(hashes, dtype=np.uint64)
+        columns = (hashes % np.uint64(self.embedding_size)).astype(np.int64)
+        # the top bit picks the sign so colliding features tend to cancel out
+        signs = np.where(hashes >> np.uint64(63), -1.0, 1.0).astype(np.float32)
+
+        np.add.at(vectors, (np.array(rows, dtype=np.int64), columns), signs)
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    async def close(self):
+        self.executor.shutdown(wait=False)
+
+    def construct_prompt(self, prompt, role):
+        return {
+            "role": role,
+            "content": prompt
+        }
@@ -1,15 +1,20 @@
 from ..LLMInterface import LLMInterface
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
+import httpx
+import asyncio
 import logging
 from ..LLMEnums import OpenAIEnums
 from typing import List, Union
+from ..ProviderScheduler import get_remaining_seconds
 
 class OpenAIProvider(LLMInterface):
 
     def __init__(self, api_key: str, api_url: str = None, 
                  default_input_max_characters: int = 1000,
                  default_generation_max_output_tokens: int = 1000,
-                 default_generation_temperature: float = 0.1):
+                 default_generation_temperature: float = 0.1,
+                 http_max_connections: int = 100,
+                 scheduler=None):
 
         self.api_key = api_key
         self.api_url = api_url
@@ -23,11 +28,32 @@ class OpenAIProvider(LLMInterface):
         self.embedding_model_id = None
         self.embedding_size = None
 
+        # request limits of the embeddings endpoint
+        self.embedding_max_batch_size = 2048
+        self.embedding_max_batch_tokens = 300_000
+
         self.client = OpenAI(
             api_key=self.api_key, 
             base_url=self.api_url if self.api_url and len(self.api_url) else None
         )
 
+        # retries are left to the scheduler, which also paces the calls
+        self.scheduler = scheduler
+
+        # one connection pool shared by all the coroutines using this provider, released by close()
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=http_max_connections,
+                max_keepalive_connections=http_max_connections
+            )
+        )
+        self.async_client = AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=self.api_url if self.api_url and len(self.api_url) else None,
+            max_retries=0 if scheduler is not None else 2,
+            http_client=self.http_client
+        )
+
         self.enums = OpenAIEnums
 
         self.logger = logging.getLogger(__name__)
@@ -45,7 +71,26 @@ class OpenAIProvider(LLMInterface):
     def process_text(self, text: str):
         return text[:self.default_input_max_characters].strip()
 
-    def generate_text(self, prompt: str, max_output_tokens: int = None, temperature: float = None , chat_history: list = []) -> str:
+    async def run_scheduled(self, call, tokens: int = 0, operation: str = "call", deadline: float = None):
+        """
+        Runs the provider call through the rate-limit scheduler when one is set.
+        Every attempt is cancelled when the `time.monotonic()` deadline passes.
+        """
+        async def bounded_call():
+            if deadline is None:
+                return await call()
+            return await asyncio.wait_for(call(), timeout=get_remaining_seconds(deadline))
+
+        if self.scheduler is None:
+            return await bounded_call()
+        return await self.scheduler.run(bounded_call, tokens=tokens, operation=operation, deadline=deadline)
+
+    def estimate_tokens(self, texts) -> int:
+        if self.scheduler is None:
+            return 0
+        return self.scheduler.estimate_tokens(texts)
+
+    def generate_text(self, prompt: str, max_output_tokens: int = None, temperature: float = None , chat_history: list = None) -> str:
        
         if not self.client:
             self.logger.error("OpenAI client is not initialized.")
@@ -59,9 +104,11 @@ class OpenAIProvider(LLMInterface):
 
         temperature = temperature if temperature else self.default_generation_temperature
 
-        chat_history.append(
+        # a new list, the caller's history is left as it was
+        chat_history = [
+            *(chat_history or []),
             self.construct_prompt(prompt=prompt, role=OpenAIEnums.USER.value)
-        )
+        ]
 
         response = self.client.chat.completions.create(
             model=self.generation_model_id,
@@ -100,6 +147,115 @@ class OpenAIProvider(LLMInterface):
 
         return [ rec.embedding for rec in response.data]
     
+    async def generate_text_async(self, prompt: str, max_output_tokens: int = None, temperature: float = None, chat_history: list = None,
+                                  deadline: float = None) -> str:
+
+        if not self.async_client:
+            self.logger.error("OpenAI async client is not initialized.")
+            return None
+
+        if not self.generation_model_id:
+            self.logger.error("Generation model ID is not set.")
+            return None
+
+        max_output_tokens = max_output_tokens if max_output_tokens else self.default_generation_max_output_tokens
+
+        temperature = temperature if temperature else self.default_generation_temperature
+
+        # a new list, the caller's history is left as it was
+        chat_history = [
+            *(chat_history or []),
+            self.construct_prompt(prompt=prompt, role=OpenAIEnums.USER.value)
+        ]
+
+        response = await self.run_scheduled(
+            lambda: self.async_client.chat.completions.create(
+                model=self.generation_model_id,
+                messages=chat_history,
+                max_tokens=max_output_tokens,
+                temperature=temperature
+            ),
+            tokens=self.estimate_tokens([m["content"] for m in chat_history]) + max_output_tokens,
+            operation="generate",
+            deadline=deadline
+        )
+
+        if not response or not response.choices or len(response.choices) == 0 or not response.choices[0].message:
+            self.logger.error("Error while generating text with OpenAI.")
+            return None
+
+        return response.choices[0].message.content
+
+    async def generate_text_stream(self, prompt: str, max_output_tokens: int = None, temperature: float = None , chat_history: list = None):
+
+        if not self.async_client:
+            self.logger.error("OpenAI async client is not initialized.")
+            return
+
+        if not self.generation_model_id:
+            self.logger.error("Generation model ID is not set.")
+            return
+
+        max_output_tokens = max_output_tokens if max_output_tokens else self.default_generation_max_output_tokens
+
+        temperature = temperature if temperature else self.default_generation_temperature
+
+        # a new list, the caller's history is left as it was
+        chat_history = [
+            *(chat_history or []),
+            self.construct_prompt(prompt=prompt, role=OpenAIEnums.USER.value)
+        ]
+
+        # only opening the stream is retried, tokens already sent to the client can not be taken back
+        stream = await self.run_scheduled(
+            lambda: self.async_client.chat.completions.create(
+                model=self.generation_model_id,
+                messages=chat_history,
+                max_tokens=max_output_tokens,
+                temperature=temperature,
+                stream=True
+            ),
+            tokens=self.estimate_tokens([m["content"] for m in chat_history]) + max_output_tokens,
+            operation="generate_stream"
+        )
+
+        async for chunk in stream:
+            if not chunk.choices or not chunk.choices[0].delta:
+                continue
+            if chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def embed_text_async(self, text: Union[str, List[str]], document_type: str = None):
+
+        if not self.async_client:
+            self.logger.error("OpenAI async client is not initialized.")
+            return None
+
+        if isinstance(text, str):
+            text = [text]
+
+        if not self.embedding_model_id or not self.embedding_size:
+            self.logger.error("Embedding model ID or size is not set.")
+            return None
+
+        response = await self.run_scheduled(
+            lambda: self.async_client.embeddings.create(
+                input=text,
+                model=self.embedding_model_id
+            ),
+            tokens=self.estimate_tokens(text),
+            operation="embed"
+        )
+
+        if not response or not response.data or len(response.data) == 0 or not response.data[0].embedding:
+            self.logger.error("Error while embedding text with OpenAI.")
+            return None
+
+        return [ rec.embedding for rec in response.data]
+    
+    async def close(self):
+        await self.http_client.aclose()
+
     def construct_prompt(self, prompt: str, role: str) -> str:
         
         return {
@@ -1,2 +1,3 @@
 from .CohereProvider import CohereProvider
-from .OpenAIProvider import OpenAIProvider
\ No newline at end of file
+from .OpenAIProvider import OpenAIProvider
+from .LocalProvider import LocalProvider
\ No newline at end of file
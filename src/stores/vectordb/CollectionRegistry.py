@@ -0,0 +1,49 @@
+import time
+
+
+class CollectionRegistry:
+    """
+    In-process cache of the collections metadata: existence, embedding size, index state and
+    records estimate. Only existing collections are cached, and entries expire after `ttl_seconds`
+    so the changes made by other processes, like the indexing workers, are picked up.
+    """
+
+    def __init__(self, ttl_seconds: float = 60):
+        self.ttl_seconds = ttl_seconds
+        # collection name -> (expires_at, metadata)
+        self.entries = {}
+
+    def get(self, collection_name: str) -> dict:
+        entry = self.entries.get(collection_name)
+        if entry is None:
+            return None
+
+        expires_at, metadata = entry
+        if expires_at < time.monotonic():
+            del self.entries[collection_name]
+            return None
+
+        return metadata
+
+    def set(self, collection_name: str, **metadata) -> dict:
+        current = self.get(collection_name) or {}
+        current.update(metadata)
+        self.entries[collection_name] = (time.monotonic() + self.ttl_seconds, current)
+        return current
+
+    def update(self, collection_name: str, **metadata):
+        """Updates the fields of a cached collection, without caching an unknown one."""
+        current = self.get(collection_name)
+        if current is not None:
+            current.update(metadata)
+
+    def add_records(self, collection_name: str, records_count: int):
+        current = self.get(collection_name)
+        if current is not None and current.get("records_estimate") is not None:
+            current["records_estimate"] += records_count
+
+    def invalidate(self, collection_name: str = None):
+        if collection_name is None:
+            self.entries.clear()
+            return
+        self.entries.pop(collection_name, None)
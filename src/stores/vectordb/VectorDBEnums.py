@@ -16,6 +16,7 @@ class PgVectorTableSchemeEnums(Enum):
     VECTOR = "vector"
     CHUNK_ID = "chunk_id"
     METADATA = "metadata"
+    ASSET_IDS = "asset_ids"
     _PREFIX = "pgvector"
 
 class PgVectorDistanceMethodEnums(Enum):
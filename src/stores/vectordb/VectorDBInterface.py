@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
 from typing import List
-from models.db_schemes import RetrievedDocument
+from models.db_schemes import RetrievedDocument, SearchParams, SearchFilter
 class VectorDBInterface(ABC):
     
     @abstractmethod
@@ -51,13 +51,36 @@ class VectorDBInterface(ABC):
     @abstractmethod
     def insert_many(self, collection_name: str, texts:list,
                     vectors: list, metadata: list = None, 
-                    record_ids: list = None, batch_size: int = 50):
-        """Insert multiple records into a collection."""
+                    record_ids: list = None, batch_size: int = 50,
+                    asset_ids: list = None):
+        """Insert multiple records into a collection, with the asset of every record for the filtered searches."""
         pass
 
     @abstractmethod
-    def search_by_vector(self, collection_name: str, vector: list, limit: int) -> List[RetrievedDocument]:
-        """Search for records in a collection by vector."""
+    def set_records_asset_ids(self, collection_name: str, records_asset_ids: dict) -> bool:
+        """Replace the assets of the records, by record ID, e.g. of a deduplicated chunk shared by several assets."""
+        pass
+
+    @abstractmethod
+    def create_vector_index(self, collection_name: str) -> bool:
+        """Build the vector index of a collection once its records are loaded."""
+        pass
+
+    @abstractmethod
+    def delete_by_record_ids(self, collection_name: str, record_ids: list) -> bool:
+        """Delete the records with the given IDs from a collection."""
+        pass
+
+    @abstractmethod
+    def get_existing_record_ids(self, collection_name: str, record_ids: list) -> list:
+        """Return the subset of the given record IDs already stored in a collection."""
+        pass
+
+    @abstractmethod
+    def search_by_vector(self, collection_name: str, vector: list, limit: int,
+                         search_params: SearchParams = None,
+                         search_filter: SearchFilter = None) -> List[RetrievedDocument]:
+        """Search for records in a collection by vector, with optional recall/latency parameters and filter."""
         pass
 
     
\ No newline at end of file
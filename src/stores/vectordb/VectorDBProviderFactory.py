@@ -17,7 +17,8 @@ class VectorDBProviderFactory:
                 db_client=qdrant_db_client,
                 distance_method=self.config.VECTOR_DB_DISTANCE_METHOD,
                 default_vector_size=self.config.EMBEDDING_MODEL_SIZE,
-                index_threshold=self.config.VECTOR_DB_PGVEC_INDEX_THRESHOLD 
+                index_threshold=self.config.VECTOR_DB_PGVEC_INDEX_THRESHOLD,
+                collection_cache_ttl=self.config.VECTOR_DB_COLLECTION_CACHE_TTL
             )
 
         if provider == VectorDBEnums.PGVECTOR.value:
@@ -25,7 +26,18 @@ class VectorDBProviderFactory:
                 db_client=self.db_client,
                 distance_method=self.config.VECTOR_DB_DISTANCE_METHOD,
                 default_vector_size=self.config.EMBEDDING_MODEL_SIZE,
-                index_threshold=self.config.VECTOR_DB_PGVEC_INDEX_THRESHOLD 
+                index_threshold=self.config.VECTOR_DB_PGVEC_INDEX_THRESHOLD,
+                bulk_load=self.config.VECTOR_DB_PGVEC_BULK_LOAD,
+                copy_batch_size=self.config.VECTOR_DB_PGVEC_COPY_BATCH_SIZE,
+                index_type=self.config.VECTOR_DB_PGVEC_INDEX_TYPE,
+                hnsw_m=self.config.VECTOR_DB_PGVEC_HNSW_M,
+                hnsw_ef_construction=self.config.VECTOR_DB_PGVEC_HNSW_EF_CONSTRUCTION,
+                ivfflat_lists=self.config.VECTOR_DB_PGVEC_IVFFLAT_LISTS,
+                index_concurrently=self.config.VECTOR_DB_PGVEC_INDEX_CONCURRENTLY,
+                maintenance_work_mem=self.config.VECTOR_DB_PGVEC_MAINTENANCE_WORK_MEM,
+                max_parallel_maintenance_workers=self.config.VECTOR_DB_PGVEC_MAX_PARALLEL_MAINTENANCE_WORKERS,
+                iterative_scan=self.config.VECTOR_DB_PGVEC_ITERATIVE_SCAN,
+                collection_cache_ttl=self.config.VECTOR_DB_COLLECTION_CACHE_TTL
             )
 
         return None
\ No newline at end of file
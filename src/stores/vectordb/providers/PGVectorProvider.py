@@ -1,19 +1,51 @@
 from ..VectorDBInterface import VectorDBInterface
+from ..CollectionRegistry import CollectionRegistry
 from ..VectorDBEnums import (DistanceMethodEnums, PgVectorTableSchemeEnums, 
                              PgVectorDistanceMethodEnums, PgVectorIndexTypeEnums)
 
 from typing import List
 import logging 
-from models.db_schemes import RetrievedDocument
-from sqlalchemy import text as sql_text
+import math
+import time
+from models.db_schemes import RetrievedDocument, SearchParams, SearchFilter
+from sqlalchemy import text as sql_text, event
+from sqlalchemy.exc import ProgrammingError
+from pgvector.asyncpg import register_vector
+import numpy as np
 import json
 
+
+def register_vector_type(dbapi_connection, connection_record):
+    """Installs the binary codec of the vector type once, when the pool opens the connection."""
+    dbapi_connection.run_async(register_vector)
+
+
 class PGVectorProvider(VectorDBInterface):
 
-    def __init__(self, db_client, default_vector_size: int = 768, distance_method: str = None, index_threshold: int = 100):
+    def __init__(self, db_client, default_vector_size: int = 768, distance_method: str = None, index_threshold: int = 100,
+                 bulk_load: bool = True, copy_batch_size: int = 10000,
+                 index_type: str = PgVectorIndexTypeEnums.HNSW.value, hnsw_m: int = None,
+                 hnsw_ef_construction: int = None, ivfflat_lists: int = None,
+                 index_concurrently: bool = True, maintenance_work_mem: str = None,
+                 max_parallel_maintenance_workers: int = None,
+                 collection_cache_ttl: float = 60, iterative_scan: str = "relaxed_order"):
         self.db_client = db_client
         self.default_vector_size = default_vector_size
         self.index_threshold = index_threshold
+        self.bulk_load = bulk_load
+        self.copy_batch_size = copy_batch_size
+
+        # index build settings, unset sizes are derived from the number of records
+        self.index_type = index_type or PgVectorIndexTypeEnums.HNSW.value
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_construction = hnsw_ef_construction
+        self.ivfflat_lists = ivfflat_lists
+        self.index_concurrently = index_concurrently
+        self.maintenance_work_mem = maintenance_work_mem
+        self.max_parallel_maintenance_workers = max_parallel_maintenance_workers
+
+        # pgvector >= 0.8 keeps scanning the index until enough rows pass the filter
+        self.iterative_scan = iterative_scan
         
         if distance_method == DistanceMethodEnums.COSINE.value:
             distance_method = PgVectorDistanceMethodEnums.COSINE.value
@@ -26,8 +58,12 @@ class PGVectorProvider(VectorDBInterface):
         self.logger = logging.getLogger("uvicorn")
         self.default_index_name = lambda collection_name: f"{collection_name}_vector_idx"
 
+        # saves the catalog lookups made before every search and insert
+        self.collection_registry = CollectionRegistry(ttl_seconds=collection_cache_ttl)
+
 
     async def connect(self):
+        extension_ready = False
         async with self.db_client() as session:
             try:
                 result = await session.execute(sql_text(
@@ -38,23 +74,60 @@ class PGVectorProvider(VectorDBInterface):
                 if not extension_exists:
                     await session.execute(sql_text("CREATE EXTENSION vector"))
                     await session.commit()
+                extension_ready = True
             except Exception as e:
                 self.logger.warning(f"Vector extension setup: {str(e)}")
                 await session.rollback()
+            engine = session.bind
+
+        # the vectors are bound as float32 arrays on every path, the codec needs the extension to exist
+        if extension_ready and not event.contains(engine.sync_engine, "connect", register_vector_type):
+            event.listen(engine.sync_engine, "connect", register_vector_type)
+            # the connection opened above has no codec
+            await engine.dispose()
 
 
     async def disconnect(self):
         pass
 
-    async def is_collection_existed(self, collection_name):
-        record = None
+    async def get_collection_metadata(self, collection_name) -> dict:
+        """Cached embedding size, index state and records estimate of the collection, None if it does not exist."""
+        metadata = self.collection_registry.get(collection_name)
+        if metadata is not None:
+            return metadata
+
         async with self.db_client() as session:
             async with session.begin():
-                list_tbl = sql_text('SELECT * FROM pg_tables WHERE tablename = :collection_name')
-                results = await session.execute(list_tbl, {'collection_name': collection_name})
-                record = results.scalar_one_or_none()
-        
-        return record is not None
+                # the typmod of a vector column is its dimension
+                metadata_sql = sql_text("""
+                                        SELECT c.reltuples::bigint AS records_estimate,
+                                               (SELECT a.atttypmod FROM pg_attribute a
+                                                WHERE a.attrelid = c.oid AND a.attname = :vector_column) AS embedding_size,
+                                               EXISTS (SELECT 1 FROM pg_indexes i
+                                                       WHERE i.tablename = c.relname AND i.indexname = :index_name) AS index_existed
+                                        FROM pg_class c
+                                        WHERE c.relname = :collection_name AND c.relkind = 'r'
+                                """)
+                result = await session.execute(metadata_sql, {
+                    'collection_name': collection_name,
+                    'vector_column': PgVectorTableSchemeEnums.VECTOR.value,
+                    'index_name': self.default_index_name(collection_name)
+                })
+                record = result.fetchone()
+
+        if record is None:
+            return None
+
+        return self.collection_registry.set(
+            collection_name,
+            embedding_size=record.embedding_size,
+            index_existed=record.index_existed,
+            # reltuples is -1 until the table is first analyzed
+            records_estimate=max(0, record.records_estimate)
+        )
+
+    async def is_collection_existed(self, collection_name):
+        return await self.get_collection_metadata(collection_name=collection_name) is not None
     
     async def list_all_collections(self):
         records = []
@@ -101,6 +174,7 @@ class PGVectorProvider(VectorDBInterface):
                 delete_sql = sql_text(f'DROP TABLE IF EXISTS {collection_name}')
                 await session.execute(delete_sql)
                 await session.commit()
+        self.collection_registry.invalidate(collection_name)
         return True
 
     async def create_collection(self, collection_name: str, embedding_size: int, do_reset: bool = False):
@@ -120,16 +194,109 @@ class PGVectorProvider(VectorDBInterface):
                             f'{PgVectorTableSchemeEnums.VECTOR.value} VECTOR({embedding_size}),'
                             f'{PgVectorTableSchemeEnums.METADATA.value} JSONB DEFAULT \'{{}}\','
                             f'{PgVectorTableSchemeEnums.CHUNK_ID.value} integer,'
+                            f'{PgVectorTableSchemeEnums.ASSET_IDS.value} integer[] DEFAULT \'{{}}\','
                             f'FOREIGN KEY ({PgVectorTableSchemeEnums.CHUNK_ID.value}) REFERENCES chunks(chunk_id)'
                         ')'
                     )
                     await session.execute(create_sql)
+                    # the table is empty, its filter indexes are built right away
+                    for index_sql in self.get_filter_indexes_sql(collection_name=collection_name).values():
+                        await session.execute(sql_text(index_sql))
                     await session.commit()
+            self.collection_registry.set(
+                collection_name,
+                embedding_size=embedding_size,
+                index_existed=False,
+                filter_indexes_existed=True,
+                records_estimate=0
+            )
             return True
         else:
+            # collections created before the filters get their asset column and indexes once
+            await self.ensure_filter_indexes(collection_name=collection_name)
             return False
+
+    def get_filter_indexes_sql(self, collection_name: str, concurrently: bool = False) -> dict:
+        """Index name -> CREATE INDEX statement, for the indexes backing the filtered searches."""
+        metadata_column = PgVectorTableSchemeEnums.METADATA.value
+        asset_ids_column = PgVectorTableSchemeEnums.ASSET_IDS.value
+        create_index = f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS"
+
+        return {
+            f'{collection_name}_{asset_ids_column}_idx':
+                f'{create_index} {collection_name}_{asset_ids_column}_idx '
+                f'ON {collection_name} USING gin ({asset_ids_column})',
+            # jsonb_path_ops serves the @> containment of the metadata filters
+            f'{collection_name}_{metadata_column}_idx':
+                f'{create_index} {collection_name}_{metadata_column}_idx '
+                f'ON {collection_name} USING gin ({metadata_column} jsonb_path_ops)',
+            # the page range predicates compare these exact expressions
+            f'{collection_name}_page_start_idx':
+                f'{create_index} {collection_name}_page_start_idx '
+                f"ON {collection_name} ((({metadata_column}->>'page_start')::int))",
+            f'{collection_name}_page_end_idx':
+                f'{create_index} {collection_name}_page_end_idx '
+                f"ON {collection_name} ((({metadata_column}->>'page_end')::int))",
+        }
+
+    async def ensure_filter_indexes(self, collection_name: str):
+        """
+        Adds the asset column and the filter indexes missing from an existing collection.
+        Only the missing ones are created, concurrently, so a live collection is not locked
+        against writes; collections already up to date only cost a catalog lookup.
+        """
+        metadata = self.collection_registry.get(collection_name)
+        if metadata is not None and metadata.get("filter_indexes_existed"):
+            return
+
+        filter_indexes_sql = self.get_filter_indexes_sql(collection_name=collection_name, concurrently=True)
+
+        async with self.db_client() as session:
+            async with session.begin():
+                result = await session.execute(sql_text("""
+                                                SELECT
+                                                    EXISTS (SELECT 1 FROM information_schema.columns
+                                                            WHERE table_name = :collection_name AND column_name = :asset_ids_column) AS column_existed,
+                                                    ARRAY(SELECT indexname FROM pg_indexes
+                                                          WHERE tablename = :collection_name AND indexname = ANY(:index_names)) AS existing_indexes
+                                        """), {
+                    'collection_name': collection_name,
+                    'asset_ids_column': PgVectorTableSchemeEnums.ASSET_IDS.value,
+                    'index_names': list(filter_indexes_sql.keys())
+                })
+                record = result.fetchone()
+
+        missing_indexes = [name for name in filter_indexes_sql if name not in set(record.existing_indexes or [])]
+
+        if not record.column_existed:
+            # adding a column with a constant default does not rewrite the table
+            async with self.db_client() as session:
+                async with session.begin():
+                    await session.execute(sql_text(
+                        f"ALTER TABLE {collection_name} ADD COLUMN IF NOT EXISTS "
+                        f"{PgVectorTableSchemeEnums.ASSET_IDS.value} integer[] DEFAULT '{{}}'"
+                    ))
+
+        if missing_indexes:
+            self.logger.info(f"Creating the filter indexes {missing_indexes} of collection: {collection_name}")
+            async with self.db_client() as session:
+                # CREATE INDEX CONCURRENTLY can not run inside a transaction block
+                connection = await session.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+                for index_name in missing_indexes:
+                    try:
+                        await connection.execute(sql_text(filter_indexes_sql[index_name]))
+                    except Exception as e:
+                        self.logger.error(f"Error while creating index {index_name}: {e}")
+                        await self.drop_invalid_index(connection=connection, index_name=index_name)
+                        return
+
+        self.collection_registry.update(collection_name, filter_indexes_existed=True)
         
     async def is_index_existed(self, collection_name):
+        metadata = self.collection_registry.get(collection_name)
+        if metadata is not None and metadata.get("index_existed") is not None:
+            return metadata["index_existed"]
+
         index_name = self.default_index_name(collection_name)  
         async with self.db_client() as session:
             async with session.begin():
@@ -138,11 +305,34 @@ class PGVectorProvider(VectorDBInterface):
                                      FROM pg_indexes
                                      WHERE tablename = :collection_name AND indexname = :index_name
                                 """)
-            result = await session.execute(check_sql, {'collection_name': collection_name, 'index_name': index_name})
-            return result.scalar_one_or_none() is not None
+                result = await session.execute(check_sql, {'collection_name': collection_name, 'index_name': index_name})
+                is_index_existed = result.scalar_one_or_none() is not None
+
+        self.collection_registry.update(collection_name, index_existed=is_index_existed)
+        return is_index_existed
+
+    def get_index_params(self, index_type: str, records_count: int) -> dict:
+        """Build parameters of the index, sized from the number of records unless configured."""
+        if index_type == PgVectorIndexTypeEnums.IVFFLAT.value:
+            # pgvector guidance: rows / 1000 lists up to 1M rows, sqrt(rows) above
+            lists = self.ivfflat_lists
+            if not lists:
+                lists = records_count // 1000 if records_count <= 1_000_000 else int(math.sqrt(records_count))
+            return {"lists": max(1, lists)}
+
+        # larger graphs need more links per node to keep the recall
+        m = self.hnsw_m or (16 if records_count < 1_000_000 else 32)
+        ef_construction = self.hnsw_ef_construction or max(64, 4 * m)
+        return {"m": m, "ef_construction": max(ef_construction, 2 * m)}
+
+    async def create_vector_index(self, collection_name: str, index_type: str = None, concurrently: bool = None) -> bool:
+        """
+        Builds the vector index once the collection is loaded, the inserts do not build it anymore.
+        With `concurrently` the table stays writable during the build.
+        """
+        index_type = index_type or self.index_type
+        concurrently = self.index_concurrently if concurrently is None else concurrently
 
-    async def create_vector_index(self, collection_name: str,
-                                        index_type: str = PgVectorIndexTypeEnums.HNSW.value):
         is_index_existed =  await self.is_index_existed(collection_name=collection_name)
         if is_index_existed: 
             return False
@@ -153,30 +343,76 @@ class PGVectorProvider(VectorDBInterface):
                 count_result = await session.execute(count_sql)
                 records_counts = count_result.scalar_one()
 
-                if records_counts < self.index_threshold:
-                    self.logger.info(f"Not enough records to create index (found: {records_counts}, required: {self.index_threshold}).")
-                    return False
-                
-                self.logger.info(f"Creating index for collection: {collection_name}")
-                
-                index_name = self.default_index_name(collection_name)
-                create_idx_sql = sql_text(
-                    f"CREATE INDEX {index_name} ON {collection_name} USING {index_type} ({PgVectorTableSchemeEnums.VECTOR.value} {self.distance_method})"
-                )
-                await session.execute(create_idx_sql)
-
-                self.logger.info(f"END: Creating index for collection: {collection_name}")
-
-    async def reset_vector_index(self, collection_name: str, 
-                                       index_type: str = PgVectorIndexTypeEnums.HNSW.value) -> bool:
+        self.collection_registry.update(collection_name, records_estimate=records_counts)
+
+        if records_counts < self.index_threshold:
+            self.logger.info(f"Not enough records to create index (found: {records_counts}, required: {self.index_threshold}).")
+            return False
+
+        index_name = self.default_index_name(collection_name)
+        index_params = self.get_index_params(index_type=index_type, records_count=records_counts)
+
+        create_idx_sql = sql_text(
+            f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {index_name} ON {collection_name} "
+            f"USING {index_type} ({PgVectorTableSchemeEnums.VECTOR.value} {self.distance_method}) "
+            f"WITH ({', '.join(f'{k} = {v}' for k, v in index_params.items())})"
+        )
+
+        self.logger.info(f"Creating {index_type} index {index_params} for collection: {collection_name} ({records_counts} records)")
+        started_at = time.monotonic()
+
+        async with self.db_client() as session:
+            # CREATE INDEX CONCURRENTLY can not run inside a transaction block
+            connection = await session.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+            try:
+                if self.maintenance_work_mem:
+                    await connection.execute(sql_text(f"SET maintenance_work_mem = '{self.maintenance_work_mem}'"))
+                if self.max_parallel_maintenance_workers is not None:
+                    await connection.execute(sql_text(f"SET max_parallel_maintenance_workers = {int(self.max_parallel_maintenance_workers)}"))
+
+                await connection.execute(create_idx_sql)
+            except Exception as e:
+                self.logger.error(f"Error while creating index for collection {collection_name}: {e}")
+                await self.drop_invalid_index(connection=connection, index_name=index_name)
+                self.collection_registry.update(collection_name, index_existed=False)
+                return False
+            finally:
+                # the session settings would outlive the build on the pooled connection
+                await connection.execute(sql_text("RESET maintenance_work_mem"))
+                await connection.execute(sql_text("RESET max_parallel_maintenance_workers"))
+
+        self.collection_registry.update(collection_name, index_existed=True)
+
+        self.logger.info(f"END: Creating index for collection: {collection_name} in {time.monotonic() - started_at:.1f}s")
+        return True
+
+    async def drop_invalid_index(self, connection, index_name: str) -> bool:
+        """
+        Drops the index left invalid by a failed concurrent build.
+        A valid index, e.g. finished meanwhile by another task, is kept.
+        """
+        result = await connection.execute(sql_text("""
+                                          SELECT i.indisvalid FROM pg_index i
+                                          JOIN pg_class c ON c.oid = i.indexrelid
+                                          WHERE c.relname = :index_name
+                                    """), {'index_name': index_name})
+        is_valid = result.scalar_one_or_none()
+        if is_valid is None or is_valid:
+            return False
+
+        await connection.execute(sql_text(f"DROP INDEX IF EXISTS {index_name}"))
+        return True
+
+    async def reset_vector_index(self, collection_name: str, index_type: str = None) -> bool:
         index_name = self.default_index_name(collection_name)
         async with self.db_client() as session:
             async with session.begin():
                 drop_idx_sql = sql_text(f"DROP INDEX IF EXISTS {index_name}")
                 await session.execute(drop_idx_sql)
+        self.collection_registry.update(collection_name, index_existed=False)
         return await self.create_vector_index(collection_name=collection_name, index_type=index_type)
 
-    async def insert_one(self, collection_name, text, vector, metadata = None, record_id = None):
+    async def insert_one(self, collection_name, text, vector, metadata = None, record_id = None, asset_id = None):
         
         is_collection_existed = await self.is_collection_existed(collection_name=collection_name)
         if not is_collection_existed:
@@ -190,24 +426,25 @@ class PGVectorProvider(VectorDBInterface):
         async with self.db_client() as session:
             async with session.begin():
                 insert_sql = sql_text(f'INSERT INTO {collection_name}'
-                                      f'({PgVectorTableSchemeEnums.TEXT.value},{PgVectorTableSchemeEnums.VECTOR.value},{PgVectorTableSchemeEnums.METADATA.value},{PgVectorTableSchemeEnums.CHUNK_ID.value})'
-                                      f'VALUES (:text, :vector, :metadata, :chunk_id)'
+                                      f'({PgVectorTableSchemeEnums.TEXT.value},{PgVectorTableSchemeEnums.VECTOR.value},{PgVectorTableSchemeEnums.METADATA.value},{PgVectorTableSchemeEnums.CHUNK_ID.value},{PgVectorTableSchemeEnums.ASSET_IDS.value})'
+                                      f'VALUES (:text, :vector, :metadata, :chunk_id, :asset_ids)'
                                 )
                 metadata_json = json.dumps(metadata, ensure_ascii=False) if metadata else '{}'
 
                 await session.execute(insert_sql, {
                     'text': text,
-                    'vector': "["+ ",".join([str(v) for v in vector]) + "]",
+                    'vector': np.asarray(vector, dtype=np.float32),
                     'metadata': metadata_json,
-                    'chunk_id': record_id
+                    'chunk_id': record_id,
+                    'asset_ids': [asset_id] if asset_id is not None else []
                 })
                 await session.commit()
 
-                await self.create_vector_index(collection_name=collection_name)
-
+        self.collection_registry.add_records(collection_name, 1)
         return True
 
-    async def insert_many(self, collection_name, texts, vectors, metadata = None, record_ids = None, batch_size = 50):
+    async def insert_many(self, collection_name, texts, vectors, metadata = None, record_ids = None, batch_size = 50,
+                          asset_ids = None):
 
         is_collection_existed = await self.is_collection_existed(collection_name=collection_name)
         if not is_collection_existed:
@@ -218,6 +455,18 @@ class PGVectorProvider(VectorDBInterface):
             self.logger.error(f"Vectors length {len(vectors)} does not match record IDs length {len(record_ids)}.")
             return False
 
+        if self.bulk_load:
+            await self.copy_many(
+                collection_name=collection_name,
+                texts=texts,
+                vectors=vectors,
+                metadata=metadata,
+                record_ids=record_ids,
+                asset_ids=asset_ids
+            )
+            self.collection_registry.add_records(collection_name, len(texts))
+            return True
+
         async with self.db_client() as session:
             async with session.begin():
                 for i in range(0, len(texts), batch_size):
@@ -225,57 +474,212 @@ class PGVectorProvider(VectorDBInterface):
                     batch_vectors = vectors[i:i + batch_size]
                     batch_metadata = metadata[i:i + batch_size] if metadata else [None] * len(batch_texts)
                     batch_record_ids = record_ids[i:i + batch_size]
+                    batch_asset_ids = asset_ids[i:i + batch_size] if asset_ids else [None] * len(batch_texts)
 
                     values = []
 
-                    for _text, _vector, _metadata, _record_id in zip(batch_texts, batch_vectors, batch_metadata, batch_record_ids):
+                    for _text, _vector, _metadata, _record_id, _asset_id in zip(batch_texts, batch_vectors, batch_metadata,
+                                                                                 batch_record_ids, batch_asset_ids):
 
                         metadata_json = json.dumps(_metadata, ensure_ascii=False) if _metadata else '{}'
                         values.append(
                             {
                                 'text': _text,
-                                'vector': "["+ ",".join([str(v) for v in _vector]) + "]",
+                                'vector': np.asarray(_vector, dtype=np.float32),
                                 'metadata': metadata_json,
-                                'chunk_id': _record_id
+                                'chunk_id': _record_id,
+                                'asset_ids': [_asset_id] if _asset_id is not None else []
                             }
                         )
                     batch_insert_sql = sql_text(f'INSERT INTO {collection_name}'
                                         f'({PgVectorTableSchemeEnums.TEXT.value}, '
                                         f'{PgVectorTableSchemeEnums.VECTOR.value}, '
                                         f'{PgVectorTableSchemeEnums.METADATA.value}, '
-                                        f'{PgVectorTableSchemeEnums.CHUNK_ID.value})'
-                                        f'VALUES (:text, :vector, :metadata, :chunk_id)'
+                                        f'{PgVectorTableSchemeEnums.CHUNK_ID.value}, '
+                                        f'{PgVectorTableSchemeEnums.ASSET_IDS.value})'
+                                        f'VALUES (:text, :vector, :metadata, :chunk_id, :asset_ids)'
                                         )
                     await session.execute(batch_insert_sql, values)
 
-        await self.create_vector_index(collection_name=collection_name)
-        
+        self.collection_registry.add_records(collection_name, len(texts))
         return True
     
 
-    async def search_by_vector(self, collection_name, vector, limit):
+    async def copy_many(self, collection_name, texts, vectors, metadata = None, record_ids = None, asset_ids = None):
+        """
+        Streams the rows with COPY ... FROM STDIN in binary format, the vectors being sent
+        as float32 arrays in pgvector's binary representation instead of text literals.
+        All the batches are loaded in one transaction.
+        """
+        columns = [
+            PgVectorTableSchemeEnums.TEXT.value,
+            PgVectorTableSchemeEnums.VECTOR.value,
+            PgVectorTableSchemeEnums.METADATA.value,
+            PgVectorTableSchemeEnums.CHUNK_ID.value,
+            PgVectorTableSchemeEnums.ASSET_IDS.value,
+        ]
+
+        async with self.db_client() as session:
+            async with session.begin():
+                connection = await session.connection()
+                raw_connection = await connection.get_raw_connection()
+                driver_connection = raw_connection.driver_connection
+
+                # COPY bypasses the SQLAlchemy transaction, asyncpg's own one makes the load all or nothing
+                async with driver_connection.transaction():
+                    for i in range(0, len(texts), self.copy_batch_size):
+                        batch_texts = texts[i:i + self.copy_batch_size]
+                        batch_vectors = np.asarray(vectors[i:i + self.copy_batch_size], dtype=np.float32)
+                        batch_metadata = metadata[i:i + self.copy_batch_size] if metadata else [None] * len(batch_texts)
+                        batch_record_ids = record_ids[i:i + self.copy_batch_size]
+                        batch_asset_ids = asset_ids[i:i + self.copy_batch_size] if asset_ids else [None] * len(batch_texts)
+
+                        await driver_connection.copy_records_to_table(
+                            collection_name,
+                            records=(
+                                (
+                                    _text,
+                                    _vector,
+                                    json.dumps(_metadata, ensure_ascii=False) if _metadata else '{}',
+                                    _record_id,
+                                    [_asset_id] if _asset_id is not None else []
+                                )
+                                for _text, _vector, _metadata, _record_id, _asset_id in zip(batch_texts, batch_vectors, batch_metadata,
+                                                                                             batch_record_ids, batch_asset_ids)
+                            ),
+                            columns=columns
+                        )
+
+        return True
+
+    async def set_records_asset_ids(self, collection_name, records_asset_ids: dict):
+        if not records_asset_ids:
+            return True
+
+        is_collection_existed = await self.is_collection_existed(collection_name=collection_name)
+        if not is_collection_existed:
+            return False
+
+        async with self.db_client() as session:
+            async with session.begin():
+                update_sql = sql_text(f'UPDATE {collection_name} SET {PgVectorTableSchemeEnums.ASSET_IDS.value} = :asset_ids '
+                                      f'WHERE {PgVectorTableSchemeEnums.CHUNK_ID.value} = :chunk_id')
+                await session.execute(update_sql, [
+                    {'chunk_id': chunk_id, 'asset_ids': sorted(set(asset_ids))}
+                    for chunk_id, asset_ids in records_asset_ids.items()
+                ])
+        return True
+
+    async def delete_by_record_ids(self, collection_name, record_ids):
+        if not record_ids:
+            return True
+
+        is_collection_existed = await self.is_collection_existed(collection_name=collection_name)
+        if not is_collection_existed:
+            return True
+
+        async with self.db_client() as session:
+            async with session.begin():
+                delete_sql = sql_text(f'DELETE FROM {collection_name} '
+                                      f'WHERE {PgVectorTableSchemeEnums.CHUNK_ID.value} = ANY(:record_ids)')
+                await session.execute(delete_sql, {'record_ids': list(record_ids)})
+        return True
+
+    async def get_existing_record_ids(self, collection_name, record_ids):
+        if not record_ids:
+            return []
+
+        is_collection_existed = await self.is_collection_existed(collection_name=collection_name)
+        if not is_collection_existed:
+            return []
+
+        async with self.db_client() as session:
+            async with session.begin():
+                select_sql = sql_text(f'SELECT {PgVectorTableSchemeEnums.CHUNK_ID.value} FROM {collection_name} '
+                                      f'WHERE {PgVectorTableSchemeEnums.CHUNK_ID.value} = ANY(:record_ids)')
+                result = await session.execute(select_sql, {'record_ids': list(record_ids)})
+                return result.scalars().all()
+
+    def get_filter_clauses(self, search_filter: SearchFilter = None):
+        """SQL predicates and bind values of the search filter."""
+        clauses, values = [], {}
+        if search_filter is None:
+            return clauses, values
+
+        metadata_column = PgVectorTableSchemeEnums.METADATA.value
+
+        if search_filter.asset_ids:
+            # a deduplicated chunk lists every asset containing its text, served by the GIN index
+            clauses.append(f'{PgVectorTableSchemeEnums.ASSET_IDS.value} && CAST(:asset_ids AS integer[])')
+            values['asset_ids'] = list(search_filter.asset_ids)
+
+        if search_filter.metadata:
+            # containment is served by the GIN index on the metadata
+            clauses.append(f'{metadata_column} @> CAST(:metadata_filter AS jsonb)')
+            values['metadata_filter'] = json.dumps(search_filter.metadata, ensure_ascii=False)
+
+        # a chunk matches when the pages it spans overlap the range
+        if search_filter.page_to is not None:
+            clauses.append(f"({metadata_column}->>'page_start')::int <= :page_to")
+            values['page_to'] = search_filter.page_to
+        if search_filter.page_from is not None:
+            clauses.append(f"({metadata_column}->>'page_end')::int >= :page_from")
+            values['page_from'] = search_filter.page_from
+
+        return clauses, values
+
+    async def search_by_vector(self, collection_name, vector, limit, search_params: SearchParams = None,
+                               search_filter: SearchFilter = None):
         is_collection_existed = await self.is_collection_existed(collection_name=collection_name)
         if not is_collection_existed:
             self.logger.error(f"Collection {collection_name} does not exist.")
             return []
 
-        vector = "[" + ",".join([str(v) for v in vector]) + "]"
+        vector = np.asarray(vector, dtype=np.float32)
 
+        filter_clauses, filter_values = self.get_filter_clauses(search_filter=search_filter)
 
         async with self.db_client() as session:
             async with session.begin():
-                search_sql = sql_text(f'SELECT {PgVectorTableSchemeEnums.TEXT.value} as text, 1 - ({PgVectorTableSchemeEnums.VECTOR.value} <=> :vector) AS score'
+                # SET LOCAL only lasts for this transaction, so the pooled connection keeps its defaults
+                if search_params is not None:
+                    if search_params.ef_search:
+                        await session.execute(sql_text(f"SET LOCAL hnsw.ef_search = {int(search_params.ef_search)}"))
+                    if search_params.probes:
+                        await session.execute(sql_text(f"SET LOCAL ivfflat.probes = {int(search_params.probes)}"))
+                    if search_params.exact:
+                        await session.execute(sql_text("SET LOCAL enable_indexscan = off"))
+
+                # without iterative scans a selective filter would leave fewer than `limit` rows out of ef_search candidates
+                if filter_clauses and self.iterative_scan:
+                    await session.execute(sql_text(f"SET LOCAL hnsw.iterative_scan = {self.iterative_scan}"))
+                    await session.execute(sql_text(f"SET LOCAL ivfflat.iterative_scan = {self.iterative_scan}"))
+
+                # ordering by the distance operator itself is what lets the planner use the vector index
+                search_sql = sql_text(f'SELECT {PgVectorTableSchemeEnums.TEXT.value} as text, {PgVectorTableSchemeEnums.CHUNK_ID.value} as chunk_id,'
+                                      f" ({PgVectorTableSchemeEnums.METADATA.value}->>'chunk_token_count')::int as token_count,"
+                                      f' 1 - ({PgVectorTableSchemeEnums.VECTOR.value} <=> :vector) AS score'
                                       f' FROM {collection_name}'
-                                      f' ORDER BY score DESC'
+                                      + (f' WHERE {" AND ".join(filter_clauses)}' if filter_clauses else '') +
+                                      f' ORDER BY {PgVectorTableSchemeEnums.VECTOR.value} <=> :vector'
                                       f' LIMIT :limit'
                                       )
-                result = await session.execute(search_sql, {'vector': vector, 'limit': limit})
+                try:
+                    result = await session.execute(search_sql, {'vector': vector, 'limit': limit, **filter_values})
+                except ProgrammingError as e:
+                    # the collection may have been dropped by another process since it was cached
+                    self.collection_registry.invalidate(collection_name)
+                    self.logger.error(f"Error while searching collection {collection_name}: {e}")
+                    return []
                 records = result.fetchall()
 
-                return [
+                # relaxed_order iterative scans can return the rows slightly out of order
+                return sorted([
                     RetrievedDocument(
                         text=record.text,
-                        score=record.score
+                        score=record.score,
+                        chunk_id=record.chunk_id,
+                        token_count=record.token_count
                     )
                     for record in records
-                ]
\ No newline at end of file
+                ], key=lambda doc: doc.score, reverse=True)
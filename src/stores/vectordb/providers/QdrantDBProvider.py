@@ -1,13 +1,15 @@
 from qdrant_client import QdrantClient, models
 from ..VectorDBInterface import  VectorDBInterface
+from ..CollectionRegistry import CollectionRegistry
 from ..VectorDBEnums import VectorDBEnums, DistanceMethodEnums
 import logging
 from typing import List
-from models.db_schemes import RetrievedDocument
+from models.db_schemes import RetrievedDocument, SearchParams, SearchFilter
 
 class QdrantDB(VectorDBInterface):
 
-    def __init__(self, db_client: str,  default_vector_size: int = 768, distance_method: str = None, index_threshold: int = 100):
+    def __init__(self, db_client: str,  default_vector_size: int = 768, distance_method: str = None, index_threshold: int = 100,
+                 collection_cache_ttl: float = 60):
         self.client = None
         self.db_client = db_client
         self.distance_method = distance_method
@@ -20,14 +22,34 @@ class QdrantDB(VectorDBInterface):
         
         self.logger = logging.getLogger("uvicorn")
 
+        # saves the collection lookups made before every search and insert
+        self.collection_registry = CollectionRegistry(ttl_seconds=collection_cache_ttl)
+
     async def connect(self):
         self.client = QdrantClient(path=self.db_client)
 
     async def disconnect(self):
         self.client = None 
 
+    async def get_collection_metadata(self, collection_name: str) -> dict:
+        """Cached embedding size, index state and records estimate of the collection, None if it does not exist."""
+        metadata = self.collection_registry.get(collection_name)
+        if metadata is not None:
+            return metadata
+
+        if not self.client.collection_exists(collection_name=collection_name):
+            return None
+
+        collection_info = self.client.get_collection(collection_name=collection_name)
+        return self.collection_registry.set(
+            collection_name,
+            embedding_size=collection_info.config.params.vectors.size,
+            index_existed=collection_info.status == models.CollectionStatus.GREEN,
+            records_estimate=collection_info.points_count or 0
+        )
+
     async def is_collection_existed(self, collection_name: str) -> bool:
-        return self.client.collection_exists(collection_name=collection_name)
+        return await self.get_collection_metadata(collection_name=collection_name) is not None
     
     async def list_all_collections(self):
         return self.client.get_collections()
@@ -36,15 +58,16 @@ class QdrantDB(VectorDBInterface):
         return self.client.get_collection(collection_name=collection_name)
     
     async def delete_collection(self, collection_name: str) -> bool:
-        if self.is_collection_existed(collection_name):
+        if await self.is_collection_existed(collection_name):
+            self.collection_registry.invalidate(collection_name)
             return self.client.delete_collection(collection_name=collection_name)
 
     async def create_collection(self, collection_name: str, embedding_size: int, do_reset: bool = False) -> bool:
         
         if do_reset:
-            _ = self.delete_collection(collection_name=collection_name)
+            _ = await self.delete_collection(collection_name=collection_name)
         
-        if not self.is_collection_existed(collection_name):
+        if not await self.is_collection_existed(collection_name):
             self.logger.info(f"Creating new Qdrant collection: {collection_name}")
             try:
                 self.client.create_collection(
@@ -55,16 +78,50 @@ class QdrantDB(VectorDBInterface):
                     )
                 )
                 self.logger.info(f"Successfully created collection: {collection_name}")
+                self.create_payload_indexes(collection_name=collection_name)
+                self.collection_registry.set(
+                    collection_name,
+                    embedding_size=embedding_size,
+                    index_existed=True,
+                    payload_indexes_existed=True,
+                    records_estimate=0
+                )
                 return True
             except Exception as e:
                 self.logger.error(f"Failed to create collection {collection_name}: {e}")
                 return False
         else:
             self.logger.info(f"Collection {collection_name} already exists")
+            # collections created before the filters get their payload indexes once
+            metadata = self.collection_registry.get(collection_name)
+            if metadata is None or not metadata.get("payload_indexes_existed"):
+                self.create_payload_indexes(collection_name=collection_name)
+                self.collection_registry.update(collection_name, payload_indexes_existed=True)
             return True
+
+    def create_payload_indexes(self, collection_name: str):
+        """Payload indexes of the fields the searches are filtered on, only the ones the collection misses."""
+        try:
+            payload_schema = self.client.get_collection(collection_name=collection_name).payload_schema or {}
+        except Exception as e:
+            self.logger.error(f"Failed to read the payload schema of {collection_name}: {e}")
+            payload_schema = {}
+
+        for field_name in ["asset_ids", "metadata.page_start", "metadata.page_end"]:
+            if field_name in payload_schema:
+                continue
+            try:
+                self.client.create_payload_index(
+                    collection_name=collection_name,
+                    field_name=field_name,
+                    field_schema=models.PayloadSchemaType.INTEGER
+                )
+            except Exception as e:
+                self.logger.error(f"Failed to create payload index {field_name} on {collection_name}: {e}")
     
-    async def insert_one(self, collection_name: str, text: str, vector: list, metadata: dict = None, record_id: str = None):
-        if not self.is_collection_existed(collection_name):
+    async def insert_one(self, collection_name: str, text: str, vector: list, metadata: dict = None, record_id: str = None,
+                         asset_id: int = None):
+        if not await self.is_collection_existed(collection_name):
             self.logger.error(f"Collection {collection_name} does not exist.")
             return False
         try:
@@ -76,7 +133,8 @@ class QdrantDB(VectorDBInterface):
                         vector=vector,
                         payload={
                             "text": text,
-                            "metadata": metadata
+                            "metadata": metadata,
+                            "asset_ids": [asset_id] if asset_id is not None else []
                         }
                     )
                 ]
@@ -84,11 +142,13 @@ class QdrantDB(VectorDBInterface):
         except Exception as e:
             self.logger.error(f"Error inserting record into {collection_name}: {e}")
             return False
+        self.collection_registry.add_records(collection_name, 1)
         return True
     
-    async def insert_many(self, collection_name: str, texts: List[str], vectors: List[list], metadata: List[dict] = None, record_ids: List[str] = None, batch_size: int = 50):
+    async def insert_many(self, collection_name: str, texts: List[str], vectors: List[list], metadata: List[dict] = None, record_ids: List[str] = None, batch_size: int = 50,
+                          asset_ids: List[int] = None):
 
-        if not self.is_collection_existed(collection_name):
+        if not await self.is_collection_existed(collection_name):
             self.logger.error(f"Collection {collection_name} does not exist.")
             return False
 
@@ -98,11 +158,15 @@ class QdrantDB(VectorDBInterface):
         if record_ids is None:
             record_ids = list(range(len(texts)))
 
+        if asset_ids is None:
+            asset_ids = [None] * len(texts)
+
         for i in range(0, len(texts), batch_size):
             batch_texts = texts[i:i + batch_size]
             batch_vectors = vectors[i:i + batch_size]
             batch_metadata = metadata[i:i + batch_size]
             batch_record_ids = record_ids[i:i + batch_size]
+            batch_asset_ids = asset_ids[i:i + batch_size]
 
             batch_records = [
                 models.Record(
@@ -110,7 +174,8 @@ class QdrantDB(VectorDBInterface):
                     vector=batch_vectors[x],
                     payload={
                         "text": batch_texts[x],
-                        "metadata": batch_metadata[x]
+                        "metadata": batch_metadata[x],
+                        "asset_ids": [batch_asset_ids[x]] if batch_asset_ids[x] is not None else []
                     }
                 )
                 for x in range(len(batch_texts))
@@ -123,22 +188,99 @@ class QdrantDB(VectorDBInterface):
             except Exception as e:
                 self.logger.error(f"Error inserting batch into {collection_name}: {e}")
                 return False
+        self.collection_registry.add_records(collection_name, len(texts))
         return True
     
-    async def search_by_vector(self, collection_name: str, vector: list, limit: int = 5) -> list:
+    async def create_vector_index(self, collection_name: str) -> bool:
+        # Qdrant builds and maintains its HNSW index in the background
+        return False
+
+    async def set_records_asset_ids(self, collection_name: str, records_asset_ids: dict) -> bool:
+        if not records_asset_ids or not await self.is_collection_existed(collection_name):
+            return True
+        try:
+            for record_id, asset_ids in records_asset_ids.items():
+                _ = self.client.set_payload(
+                    collection_name=collection_name,
+                    payload={"asset_ids": sorted(set(asset_ids))},
+                    points=[record_id]
+                )
+        except Exception as e:
+            self.logger.error(f"Error setting the assets of records in {collection_name}: {e}")
+            return False
+        return True
+
+    async def delete_by_record_ids(self, collection_name: str, record_ids: List[int]) -> bool:
+        if not record_ids or not await self.is_collection_existed(collection_name):
+            return True
+        try:
+            _ = self.client.delete(
+                collection_name=collection_name,
+                points_selector=models.PointIdsList(points=list(record_ids))
+            )
+        except Exception as e:
+            self.logger.error(f"Error deleting records from {collection_name}: {e}")
+            return False
+        return True
+
+    async def get_existing_record_ids(self, collection_name: str, record_ids: List[int]) -> List[int]:
+        if not record_ids or not await self.is_collection_existed(collection_name):
+            return []
+
+        records = self.client.retrieve(
+            collection_name=collection_name,
+            ids=list(record_ids),
+            with_payload=False,
+            with_vectors=False
+        )
+        return [record.id for record in records]
+    
+    def get_query_filter(self, search_filter: SearchFilter = None):
+        if search_filter is None or search_filter.is_empty():
+            return None
+
+        conditions = []
+        if search_filter.asset_ids:
+            # a deduplicated chunk lists every asset containing its text
+            conditions.append(models.FieldCondition(key="asset_ids", match=models.MatchAny(any=list(search_filter.asset_ids))))
+
+        for key, value in (search_filter.metadata or {}).items():
+            conditions.append(models.FieldCondition(key=f"metadata.{key}", match=models.MatchValue(value=value)))
+
+        # a chunk matches when the pages it spans overlap the range
+        if search_filter.page_to is not None:
+            conditions.append(models.FieldCondition(key="metadata.page_start", range=models.Range(lte=search_filter.page_to)))
+        if search_filter.page_from is not None:
+            conditions.append(models.FieldCondition(key="metadata.page_end", range=models.Range(gte=search_filter.page_from)))
+
+        return models.Filter(must=conditions)
+
+    async def search_by_vector(self, collection_name: str, vector: list, limit: int = 5,
+                               search_params: SearchParams = None, search_filter: SearchFilter = None) -> list:
+
+        query_search_params = None
+        if search_params is not None and (search_params.ef_search or search_params.exact is not None):
+            query_search_params = models.SearchParams(
+                hnsw_ef=search_params.ef_search,
+                exact=bool(search_params.exact)
+            )
         
         results= self.client.search(
             collection_name=collection_name,
             query_vector=vector,
-            limit=limit
+            limit=limit,
+            search_params=query_search_params,
+            query_filter=self.get_query_filter(search_filter=search_filter)
         )
     
         if not results or len(results) == 0:
             return None
         return [
             RetrievedDocument(
-                score=result.payload.get("score", 0.0),
-                text=result.payload.get("text", "")
+                score=result.score,
+                text=result.payload.get("text", ""),
+                chunk_id=result.id,
+                token_count=(result.payload.get("metadata") or {}).get("chunk_token_count")
             )
             for result in results
         ]
@@ -1,27 +1,33 @@
 from celery_app import celery_app, get_setup_utils
 import asyncio
+import math
+import time
 import logging 
 from models.ProjectModel import ProjectModel
 from models.ChunkModel import ChunkModel
+from models.EmbeddingCacheModel import EmbeddingCacheModel
 from controllers import NLPController
 from models import ResponseSignal
 from tqdm.auto import tqdm
+from helpers.config import get_settings
+from stores.llm.EmbeddingBatcher import EmbeddingBatcher
 
 logger = logging.getLogger('celery.task')
 
 @celery_app.task(bind=True, name="tasks.data_indexing.index_data_content",
                  autoretry_for=(Exception,),
                  retry_kwargs={'max_retries': 3, 'countdown': 60})
-def index_data_content(self, project_id: int, do_reset: bool):
+def index_data_content(self, project_id: int, do_reset: bool, incremental: bool = False):
     
     return asyncio.run(
-        _index_data_content(self, project_id, do_reset)
+        _index_data_content(self, project_id, do_reset, incremental)
     )
 
 
-async def _index_data_content(task_instance, project_id: int, do_reset: bool):
-    db_engine, vectordb_client = None, None
+async def _index_data_content(task_instance, project_id: int, do_reset: bool, incremental: bool = False):
+    db_engine, vectordb_client, generation_client, embedding_client = None, None, None, None
     try:
+        settings = get_settings()
         (db_engine, db_client, llm_provider_factory, vector_db_provider_factory, generation_client, embedding_client, vectordb_client, template_parser) = await get_setup_utils()
         
         project_model = await ProjectModel.create_instance(db_client=db_client)
@@ -39,18 +45,23 @@ async def _index_data_content(task_instance, project_id: int, do_reset: bool):
             )
             raise Exception(f"No project found for project_id {project_id}")
 
+        embedding_cache = None
+        if settings.EMBEDDING_CACHE_ENABLED:
+            embedding_cache = await EmbeddingCacheModel.create_instance(db_client=db_client)
+
         nlp_controller = NLPController(
             vectordb_client=vectordb_client,
             generation_client=generation_client,
             embedding_client=embedding_client,
-            template_parser=template_parser
+            template_parser=template_parser,
+            embedding_cache=embedding_cache,
+            embedding_batcher=EmbeddingBatcher(
+                embedding_client=embedding_client,
+                max_concurrency=settings.EMBEDDING_BATCHER_MAX_CONCURRENCY,
+                max_retries=settings.EMBEDDING_BATCHER_MAX_RETRIES
+            )
         )
 
-        has_records = True
-        page_no = 1
-        inserted_items_count = 0
-        idx = 0
-
         # create collection if not exists
         collection_name = nlp_controller.create_collection_name(project_id=project.project_id)
 
@@ -64,52 +75,81 @@ async def _index_data_content(task_instance, project_id: int, do_reset: bool):
         total_chunks_count = await chunk_model.get_total_chunks_count(project_id=project.project_id)
         pbar = tqdm(total=total_chunks_count, desc="Vector Indexing", position=0)
 
+        counters = {
+            "read_items_count": 0,
+            "skipped_items_count": 0,
+            "duplicated_items_count": 0,
+        }
+        # canonical chunk_id -> text hash, for the chunks standing for duplicates of other assets
+        shared_records = {}
 
+        chunks_pages = _iter_chunks_pages(
+            chunk_model=chunk_model,
+            vectordb_client=vectordb_client,
+            project=project,
+            collection_name=collection_name,
+            counters=counters,
+            pbar=pbar,
+            page_size=_get_indexing_page_size(settings=settings, embedding_client=embedding_client),
+            skip_indexed=incremental and not do_reset,
+            dedup_chunks=settings.VECTOR_DB_DEDUP_CHUNKS,
+            shared_records=shared_records
+        )
 
+        stages_stats = await _run_indexing_pipeline(
+            task_instance=task_instance,
+            chunks_pages=chunks_pages,
+            nlp_controller=nlp_controller,
+            project=project,
+            total_chunks_count=total_chunks_count,
+            embedding_workers=settings.INDEXING_EMBEDDING_WORKERS,
+            queue_size=settings.INDEXING_QUEUE_SIZE
+        )
 
-        while has_records:
-            page_chunks = await chunk_model.get_chunks_by_project_id(
-                project_id=project.project_id,
-                page_no=page_no
-            )
-            if len(page_chunks):
-                page_no += 1
-
-            if not page_chunks or len(page_chunks) == 0:
-                has_records = False
-                break
-
-            chunks_ids = [c.chunk_id for c in page_chunks]
-            idx += len(page_chunks)
-
-            is_inserted = await nlp_controller.index_into_vector_db(
-                project=project,
-                chunks=page_chunks,
-                chunks_ids=chunks_ids
-            )
+        # the asset filters must match the assets of the duplicates too
+        await _set_shared_records_asset_ids(
+            chunk_model=chunk_model,
+            vectordb_client=vectordb_client,
+            project=project,
+            collection_name=collection_name,
+            shared_records=shared_records
+        )
 
-            if not is_inserted:
-                task_instance.update_state(
-                    state='FAILURE',
-                    meta={
-                        "error": ResponseSignal.INSERT_INTO_VECTORDB_ERROR.value
-                    }
-                )
-                raise Exception(f"Failed to insert chunks into vectordb for project_id {project.project_id}")
+        idx = counters["read_items_count"]
+        inserted_items_count = stages_stats["write"]["items"]
 
+        # the vector index is built once, after the bulk load
+        index_started_at = time.monotonic()
+        is_index_created = await vectordb_client.create_vector_index(collection_name=collection_name)
+        stages_stats["index"] = {
+            "created": bool(is_index_created),
+            "seconds": round(time.monotonic() - index_started_at, 3)
+        }
+        skipped_items_count = counters["skipped_items_count"]
+        duplicated_items_count = counters["duplicated_items_count"]
 
-            pbar.update(len(page_chunks))
+        dedup_ratio = round(duplicated_items_count / idx, 4) if idx else 0.0
 
-            inserted_items_count += len(page_chunks)
+        # cached answers were generated from the previous index content
+        if do_reset or inserted_items_count > 0:
+            _ = await project_model.bump_index_version(project_id=project.project_id)
 
         task_instance.update_state(
             state='SUCCESS',
-            meta={"signal": ResponseSignal.INSERT_INTO_VECTORDB_SUCCESS.value}
+            meta={
+                "signal": ResponseSignal.INSERT_INTO_VECTORDB_SUCCESS.value,
+                "dedup_ratio": dedup_ratio,
+                "stages": stages_stats
+            }
         )
         
         return {
                 "signal": ResponseSignal.INSERT_INTO_VECTORDB_SUCCESS.value,
                 "inserted_items_count": inserted_items_count,
+                "skipped_items_count": skipped_items_count,
+                "duplicated_items_count": duplicated_items_count,
+                "dedup_ratio": dedup_ratio,
+                "stages": stages_stats,
         }
 
     except Exception as e:
@@ -120,5 +160,216 @@ async def _index_data_content(task_instance, project_id: int, do_reset: bool):
                 await db_engine.dispose()
             if vectordb_client:
                 await vectordb_client.disconnect()
+            # the providers are built per task, their connection pools would leak otherwise
+            for llm_client in (generation_client, embedding_client):
+                if llm_client:
+                    await llm_client.close()
         except Exception as e:
-            logger.error(f"Error closing resources: {str(e)}")
\ No newline at end of file
+            logger.error(f"Error closing resources: {str(e)}")
+
+
+def _get_indexing_page_size(settings, embedding_client) -> int:
+    """
+    Pages hold whole provider batches, enough of them for the embedding workers to keep
+    EMBEDDING_BATCHER_MAX_CONCURRENCY requests in flight, up to INDEXING_MAX_PAGE_SIZE chunks.
+    """
+    batch_size = getattr(embedding_client, "embedding_max_batch_size", None) or settings.INDEXING_PAGE_SIZE
+    batches_per_page = math.ceil(settings.EMBEDDING_BATCHER_MAX_CONCURRENCY / max(1, settings.INDEXING_EMBEDDING_WORKERS))
+
+    page_size = max(settings.INDEXING_PAGE_SIZE, batches_per_page * batch_size)
+    page_size = math.ceil(page_size / batch_size) * batch_size
+
+    max_page_size = settings.INDEXING_MAX_PAGE_SIZE
+    if max_page_size and page_size > max_page_size:
+        page_size = (max_page_size // batch_size) * batch_size or max_page_size
+
+    return page_size
+
+
+async def _iter_chunks_pages(chunk_model: ChunkModel, vectordb_client, project, collection_name: str,
+                             counters: dict, pbar, page_size: int = 100,
+                             skip_indexed: bool = False, dedup_chunks: bool = True, shared_records: dict = None):
+    """
+    Reads the project chunks page by page and yields the ones that still need a vector,
+    repacked into pages of `page_size` chunks so the skipped and duplicated ones do not
+    leave partial embedding batches behind.
+    """
+    last_chunk_id = 0
+    pending_chunks = []
+
+    while True:
+        page_chunks = await chunk_model.get_chunks_by_project_id_after(
+            project_id=project.project_id,
+            last_chunk_id=last_chunk_id,
+            page_size=page_size
+        )
+
+        if not page_chunks or len(page_chunks) == 0:
+            break
+
+        last_chunk_id = page_chunks[-1].chunk_id
+        counters["read_items_count"] += len(page_chunks)
+        pbar.update(len(page_chunks))
+
+        # only embed the chunks that are not in the collection yet
+        if skip_indexed:
+            existing_ids = set(await vectordb_client.get_existing_record_ids(
+                collection_name=collection_name,
+                record_ids=[c.chunk_id for c in page_chunks]
+            ))
+            new_chunks = [c for c in page_chunks if c.chunk_id not in existing_ids]
+            counters["skipped_items_count"] += len(page_chunks) - len(new_chunks)
+            page_chunks = new_chunks
+
+        # identical chunks are embedded and stored once, the first chunk with the same text stands for the others
+        # and its record lists the assets of all of them (see _set_shared_records_asset_ids)
+        if dedup_chunks and len(page_chunks):
+            first_chunks_ids = await chunk_model.get_first_chunks_ids_by_text_hash(
+                project_id=project.project_id,
+                text_hashes=[c.chunk_text_hash for c in page_chunks if c.chunk_text_hash]
+            )
+            unique_chunks = [
+                c for c in page_chunks
+                if not c.chunk_text_hash or first_chunks_ids.get(c.chunk_text_hash, c.chunk_id) == c.chunk_id
+            ]
+            counters["duplicated_items_count"] += len(page_chunks) - len(unique_chunks)
+            if shared_records is not None:
+                for c in page_chunks:
+                    first_chunk_id = first_chunks_ids.get(c.chunk_text_hash) if c.chunk_text_hash else None
+                    if first_chunk_id is not None and first_chunk_id != c.chunk_id:
+                        shared_records[first_chunk_id] = c.chunk_text_hash
+            page_chunks = unique_chunks
+
+        pending_chunks.extend(page_chunks)
+        while len(pending_chunks) >= page_size:
+            yield pending_chunks[:page_size]
+            pending_chunks = pending_chunks[page_size:]
+
+    if len(pending_chunks):
+        yield pending_chunks
+
+
+async def _set_shared_records_asset_ids(chunk_model: ChunkModel, vectordb_client, project, collection_name: str,
+                                       shared_records: dict, batch_size: int = 1000):
+    """
+    Sets the assets of every chunk sharing its text on the canonical records, so a search
+    filtered on one asset still finds the chunks deduplicated into another asset's record.
+    """
+    records_ids = list(shared_records.keys())
+    for i in range(0, len(records_ids), batch_size):
+        batch_records_ids = records_ids[i:i + batch_size]
+        asset_ids_by_hash = await chunk_model.get_asset_ids_by_text_hash(
+            project_id=project.project_id,
+            text_hashes=[shared_records[record_id] for record_id in batch_records_ids]
+        )
+        _ = await vectordb_client.set_records_asset_ids(
+            collection_name=collection_name,
+            records_asset_ids={
+                record_id: asset_ids_by_hash[shared_records[record_id]]
+                for record_id in batch_records_ids
+                if shared_records[record_id] in asset_ids_by_hash
+            }
+        )
+
+
+async def _run_indexing_pipeline(task_instance, chunks_pages, nlp_controller: NLPController, project,
+                                 total_chunks_count: int, embedding_workers: int = 2, queue_size: int = 4) -> dict:
+    """
+    Runs the reader, `embedding_workers` embedders and the vector writer as concurrent stages
+    connected by bounded queues, so reads, embedding calls and vector writes overlap.
+    `queue_size` is the number of pages each queue can buffer before the upstream stage waits.
+    """
+    embedding_workers = max(1, embedding_workers or 1)
+    embed_queue = asyncio.Queue(maxsize=max(1, queue_size))
+    write_queue = asyncio.Queue(maxsize=max(1, queue_size))
+    end_of_stream = None
+
+    stages_stats = {
+        stage: {"items": 0, "seconds": 0.0, "items_per_second": 0.0}
+        for stage in ("read", "embed", "write")
+    }
+    started_at = time.monotonic()
+
+    def record(stage: str, items: int, seconds: float):
+        stats = stages_stats[stage]
+        stats["items"] += items
+        stats["seconds"] = round(stats["seconds"] + seconds, 3)
+        stats["items_per_second"] = round(stats["items"] / stats["seconds"], 2) if stats["seconds"] else 0.0
+
+    async def reader():
+        page_started_at = time.monotonic()
+        async for page_chunks in chunks_pages:
+            record("read", len(page_chunks), time.monotonic() - page_started_at)
+            await embed_queue.put(page_chunks)
+            page_started_at = time.monotonic()
+
+        for _ in range(embedding_workers):
+            await embed_queue.put(end_of_stream)
+
+    async def embedder():
+        while True:
+            page_chunks = await embed_queue.get()
+            if page_chunks is end_of_stream:
+                await write_queue.put(end_of_stream)
+                return
+
+            embed_started_at = time.monotonic()
+            vectors = await nlp_controller.embed_chunks(chunks=page_chunks)
+            if not vectors or len(vectors) != len(page_chunks):
+                raise Exception(f"Failed to embed chunks for project_id {project.project_id}")
+            # stage time is summed over the embedders, so items_per_second is per worker
+            record("embed", len(page_chunks), time.monotonic() - embed_started_at)
+
+            await write_queue.put((page_chunks, vectors))
+
+    async def writer():
+        finished_embedders = 0
+        while finished_embedders < embedding_workers:
+            item = await write_queue.get()
+            if item is end_of_stream:
+                finished_embedders += 1
+                continue
+
+            page_chunks, vectors = item
+            write_started_at = time.monotonic()
+            is_inserted = await nlp_controller.insert_vectors_into_vector_db(
+                project=project,
+                chunks=page_chunks,
+                vectors=vectors,
+                chunks_ids=[c.chunk_id for c in page_chunks]
+            )
+
+            if not is_inserted:
+                task_instance.update_state(
+                    state='FAILURE',
+                    meta={
+                        "error": ResponseSignal.INSERT_INTO_VECTORDB_ERROR.value
+                    }
+                )
+                raise Exception(f"Failed to insert chunks into vectordb for project_id {project.project_id}")
+
+            record("write", len(page_chunks), time.monotonic() - write_started_at)
+
+            task_instance.update_state(
+                state='PROGRESS',
+                meta={
+                    "total_chunks_count": total_chunks_count,
+                    "inserted_items_count": stages_stats["write"]["items"],
+                    "elapsed_seconds": round(time.monotonic() - started_at, 3),
+                    "stages": stages_stats
+                }
+            )
+
+    stages = [asyncio.create_task(reader()), asyncio.create_task(writer())]
+    stages += [asyncio.create_task(embedder()) for _ in range(embedding_workers)]
+
+    try:
+        await asyncio.gather(*stages)
+    except Exception:
+        # a failed stage would leave the others blocked on the queues
+        for stage in stages:
+            stage.cancel()
+        await asyncio.gather(*stages, return_exceptions=True)
+        raise
+
+    return stages_stats
@@ -8,18 +8,23 @@ from models.AssetModel import AssetModel
 from models.enums.ResponseEnums import ResponseSignal
 from models.enums.AssetTypeEnum import AssetTypeEnum
 from controllers import NLPController, ProcessController
+from controllers.ProcessController import process_file_chunks
+import billiard
+import itertools
 import logging
 from utils.idempotency_manager import IdempotencyManager
+from utils.text_hash import get_text_hash
+from utils.token_counter import count_tokens
 
 logger = logging.getLogger('celery.task')
 
 @celery_app.task(bind=True, name="tasks.file_processing.process_project_files", autoretry_for=(Exception,), retry_kwargs={'max_retries': 3, 'countdown': 60})
-def process_project_files(self, project_id: int,file_id: int, chunk_size,overlap_size: int, do_reset: int):
+def process_project_files(self, project_id: int,file_id: int, chunk_size,overlap_size: int, do_reset: int, incremental: bool = False):
 
-    return asyncio.run(_process_project_files(self, project_id,file_id, chunk_size,overlap_size, do_reset))
+    return asyncio.run(_process_project_files(self, project_id,file_id, chunk_size,overlap_size, do_reset, incremental))
 
-async def _process_project_files(task_instance, project_id,file_id, chunk_size,overlap_size, do_reset):
-    db_engine, vectordb_client = None, None
+async def _process_project_files(task_instance, project_id,file_id, chunk_size,overlap_size, do_reset, incremental=False):
+    db_engine, vectordb_client, generation_client, embedding_client = None, None, None, None
     try:
         (db_engine, db_client, llm_provider_factory, vector_db_provider_factory, generation_client, embedding_client, vectordb_client, template_parser) = await get_setup_utils()
 
@@ -30,7 +35,8 @@ async def _process_project_files(task_instance, project_id,file_id, chunk_size,o
             "file_id": file_id,
             "chunk_size": chunk_size,
             "overlap_size": overlap_size,
-            "do_reset": do_reset
+            "do_reset": do_reset,
+            "incremental": incremental
         }
         task_name = "tasks.file_processing.process_project_files"
 
@@ -108,7 +114,7 @@ async def _process_project_files(task_instance, project_id,file_id, chunk_size,o
 
                 raise Exception(f"No assets for file: {file_id}")
 
-            project_files_ids = {asset_record.asset_id: asset_record.asset_name}
+            project_assets = {asset_record.asset_id: asset_record}
         
         else:
             
@@ -117,7 +123,9 @@ async def _process_project_files(task_instance, project_id,file_id, chunk_size,o
                 asset_type=AssetTypeEnum.FILE.value
             )
             
-            project_files_ids = {file.asset_id: file.asset_name for file in project_files}
+            project_assets = {file.asset_id: file for file in project_files}
+
+        project_files_ids = {asset_id: asset.asset_name for asset_id, asset in project_assets.items()}
 
         if len(project_files_ids) == 0:
             task_instance.update_state(
@@ -141,57 +149,112 @@ async def _process_project_files(task_instance, project_id,file_id, chunk_size,o
                 db_client=   db_client
             )
 
+        collection_name = nlp_controller.create_collection_name(project_id=project.project_id)
         
         if do_reset:
-            collection_name = nlp_controller.create_collection_name(project_id=project.project_id)
             # delete associated vectors collection
             _ = await  vectordb_client.delete_collection(collection_name=collection_name)
             # delete associated chunks
             _ = await chunk_model.delete_chunks_by_project_id(project_id=project.project_id)
+            # cached answers were generated from the deleted vectors
+            _ = await project_model.bump_index_version(project_id=project.project_id)
+
+
+        # current state of the files, saved on their asset once the file chunks are inserted.
+        # Only incremental runs compare every file, the others fingerprint the processed files.
+        files_states = dict()
+
+        no_removed_files = 0
+        if incremental and not do_reset:
+            # hashing reads the whole file, keep it off the event loop
+            files_states = {
+                asset_id: await asyncio.to_thread(
+                    _get_file_state,
+                    process_controller=process_controller,
+                    asset=asset,
+                    chunk_size=chunk_size,
+                    overlap_size=overlap_size
+                )
+                for asset_id, asset in project_assets.items()
+            }
 
+            project_files_ids, no_removed_files = await _get_incremental_files(
+                project_assets=project_assets,
+                files_states=files_states,
+                asset_model=asset_model,
+                chunk_model=chunk_model,
+                vectordb_client=vectordb_client,
+                collection_name=collection_name
+            )
+            # stale vectors of the changed and removed files were deleted
+            if len(project_files_ids) or no_removed_files:
+                _ = await project_model.bump_index_version(project_id=project.project_id)
+
+        async def on_file_processed(asset_id: int):
+            asset = project_assets[asset_id]
+            if asset_id not in files_states:
+                # hashing reads the whole file, keep it off the event loop
+                files_states[asset_id] = await asyncio.to_thread(
+                    _get_file_state,
+                    process_controller=process_controller,
+                    asset=asset,
+                    chunk_size=chunk_size,
+                    overlap_size=overlap_size
+                )
+            if files_states[asset_id] is None:
+                return
+            await asset_model.update_asset_config(
+                asset_id=asset_id,
+                asset_config={**(asset.asset_config or {}), "processing": files_states[asset_id]}
+            )
 
-        no_records  = 0
-        no_files = 0
-        for asset_id, file_id in project_files_ids.items():
-
-            file_content = process_controller.get_file_content(file_id=file_id)
-
-            if file_content is None:
-                logger.error(f"File with ID {file_id} not found or empty.")
-                continue
+        file_processing_concurrency = settings.FILE_PROCESSING_CONCURRENCY or 1
 
-            file_chunks = process_controller.process_file_content(
-                file_content=file_content,
-                file_id=file_id,
+        if file_processing_concurrency > 1 and len(project_files_ids) > 1:
+            no_records, no_files = await _process_files_concurrently(
+                project=project,
+                project_files_ids=project_files_ids,
+                chunk_model=chunk_model,
                 chunk_size=chunk_size,
-                overlap_size=overlap_size
+                overlap_size=overlap_size,
+                concurrency=file_processing_concurrency,
+                on_file_processed=on_file_processed
             )
+        else:
+            no_records  = 0
+            no_files = 0
+            for asset_id, file_id in project_files_ids.items():
 
-            if file_chunks is None or len(file_chunks) == 0:
-                logger.error(f"No chunks created for file with ID {file_id}.")
-                pass 
-            
-            file_chunks_records = [
-                DataChunk(
-                    chunk_text=chunk.page_content,
-                    chunk_metadata=chunk.metadata,
-                    chunk_order=i + 1,
-                    chunk_project_id=project.project_id,
-                    chunk_asset_id= asset_id
+                file_content = process_controller.iter_file_content(file_id=file_id)
+
+                if file_content is None:
+                    logger.error(f"File with ID {file_id} not found or empty.")
+                    continue
+
+                file_chunks = process_controller.process_file_content(
+                    file_content=file_content,
+                    file_id=file_id,
+                    chunk_size=chunk_size,
+                    overlap_size=overlap_size
                 )
-                for i, chunk in enumerate(file_chunks)  
-            ]
 
-        
-            no_records += await chunk_model.insert_many_chunks(chunks=file_chunks_records)
-            no_files += 1
+                no_records += await _insert_file_chunks(
+                    chunk_model=chunk_model,
+                    file_chunks_batches=_iter_file_chunks_batches(file_chunks=file_chunks),
+                    project_id=project.project_id,
+                    asset_id=asset_id,
+                    file_id=file_id
+                )
+                await on_file_processed(asset_id)
+                no_files += 1
         
         task_instance.update_state(
             state='SUCCESS',
             meta={
                 'signal': ResponseSignal.PROCESSING_SUCCESS.value,
                 'no_files': no_files,
-                'no_records': no_records
+                'no_records': no_records,
+                'no_removed_files': no_removed_files
             }
         )
 
@@ -209,8 +272,10 @@ async def _process_project_files(task_instance, project_id,file_id, chunk_size,o
             "signal": ResponseSignal.PROCESSING_SUCCESS.value,
             "inserted_chunks": no_records,
             "processed_files": no_files,
+            "removed_files": no_removed_files,
             "project_id": project_id,
-            "do_reset": do_reset
+            "do_reset": do_reset,
+            "incremental": incremental
         }
     except Exception as e:
         logger.error(f"Task failed: {e}")
@@ -220,5 +285,218 @@ async def _process_project_files(task_instance, project_id,file_id, chunk_size,o
                 await db_engine.dispose()
             if vectordb_client:
                 await vectordb_client.disconnect()
+            # the providers are built per task, their connection pools would leak otherwise
+            for llm_client in (generation_client, embedding_client):
+                if llm_client:
+                    await llm_client.close()
         except Exception as e:
-            logger.error(f"Error closing resources: {str(e)}")
\ No newline at end of file
+            logger.error(f"Error closing resources: {str(e)}")
+
+
+def _get_next_chunks_batch(file_chunks, batch_size: int, settings) -> list:
+    """
+    Next `batch_size` file chunks, as the chunk fields computed from their text.
+    """
+    # the token counts are only used to pack the prompts into RAG_PROMPT_MAX_TOKENS
+    count_chunks_tokens = bool(settings.RAG_PROMPT_MAX_TOKENS)
+
+    return [
+        {
+            "chunk_text": chunk.page_content,
+            "chunk_metadata": chunk.metadata,
+            "chunk_text_hash": get_text_hash(chunk.page_content),
+            "chunk_token_count": count_tokens(
+                chunk.page_content,
+                encoding_name=settings.TOKENIZER_ENCODING,
+                cache_dir=settings.TOKENIZER_CACHE_DIR
+            ) if count_chunks_tokens else None,
+        }
+        for chunk in itertools.islice(file_chunks, batch_size)
+    ]
+
+
+async def _iter_file_chunks_batches(file_chunks):
+    """
+    Yields the lazily produced file chunks in insert batches.
+    """
+    settings = get_settings()
+
+    while True:
+        batch = _get_next_chunks_batch(file_chunks, settings.FILE_CHUNKS_INSERT_BATCH_SIZE, settings)
+        if not batch:
+            return
+        yield batch
+
+
+def _produce_file_chunks_batches(project_id: int, file_id: str, chunk_size: int, overlap_size: int,
+                                 batches_queue):
+    """
+    Runs in a file processing process: extracts, chunks and hashes the file and puts its chunks
+    on the queue batch by batch, as ("batch", chunks) messages ended by ("end", None).
+    """
+    try:
+        settings = get_settings()
+        file_chunks = process_file_chunks(project_id, file_id, chunk_size, overlap_size)
+        if file_chunks is None:
+            batches_queue.put(("missing", None))
+            return
+
+        while True:
+            batch = _get_next_chunks_batch(file_chunks, settings.FILE_CHUNKS_INSERT_BATCH_SIZE, settings)
+            if not batch:
+                break
+            batches_queue.put(("batch", batch))
+        batches_queue.put(("end", None))
+    except Exception as e:
+        batches_queue.put(("error", f"{type(e).__name__}: {e}"))
+
+
+async def _iter_process_chunks_batches(batches_queue, file_id: str):
+    """Yields the batches a file processing process puts on its queue."""
+    while True:
+        # the queue blocks, wait for it off the event loop
+        kind, value = await asyncio.to_thread(batches_queue.get)
+        if kind == "batch":
+            yield value
+        elif kind == "missing":
+            raise FileNotFoundError(file_id)
+        elif kind == "error":
+            raise Exception(f"Failed to process file with ID {file_id}: {value}")
+        else:
+            return
+
+
+async def _insert_file_chunks(chunk_model: ChunkModel, file_chunks_batches, project_id: int, asset_id: int, file_id: str) -> int:
+    """
+    Inserts the batches of the file chunks as they come, so only one batch per file is held in memory.
+    """
+    no_records = 0
+    chunk_order = 0
+    async for file_chunks in file_chunks_batches:
+        file_chunks_records = []
+        for chunk_fields in file_chunks:
+            chunk_order += 1
+            file_chunks_records.append({
+                **chunk_fields,
+                "chunk_order": chunk_order,
+                "chunk_project_id": project_id,
+                "chunk_asset_id": asset_id
+            })
+
+        no_records += await chunk_model.bulk_insert_chunks(chunks=file_chunks_records)
+
+    if no_records == 0:
+        logger.error(f"No chunks created for file with ID {file_id}.")
+
+    return no_records
+
+
+async def _process_files_concurrently(project, project_files_ids: dict, chunk_model: ChunkModel,
+                                      chunk_size: int, overlap_size: int, concurrency: int,
+                                      on_file_processed=None):
+    """
+    Extracts, chunks and hashes up to `concurrency` files at a time, each in its own process, while
+    the batches they produce are inserted on the event loop. Extraction and chunking are
+    CPU-bound Python, threads would serialize on the GIL. The processes are billiard ones,
+    which the daemonic children of the prefork Celery pool are allowed to start.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def process_file(asset_id: int, file_id: str):
+        async with semaphore:
+            # bounded, so a process does not chunk far ahead of the inserts
+            batches_queue = billiard.Queue(maxsize=2)
+            file_process = billiard.Process(
+                target=_produce_file_chunks_batches,
+                args=(project.project_id, file_id, chunk_size, overlap_size, batches_queue),
+                daemon=True
+            )
+            file_process.start()
+            try:
+                no_records = await _insert_file_chunks(
+                    chunk_model=chunk_model,
+                    file_chunks_batches=_iter_process_chunks_batches(batches_queue=batches_queue, file_id=file_id),
+                    project_id=project.project_id,
+                    asset_id=asset_id,
+                    file_id=file_id
+                )
+            except FileNotFoundError:
+                logger.error(f"File with ID {file_id} not found or empty.")
+                return 0, 0
+            finally:
+                if file_process.is_alive():
+                    file_process.terminate()
+                await asyncio.to_thread(file_process.join)
+
+            if on_file_processed:
+                await on_file_processed(asset_id)
+            return no_records, 1
+
+    results = await asyncio.gather(*[
+        process_file(asset_id, file_id)
+        for asset_id, file_id in project_files_ids.items()
+    ])
+
+    no_records = sum(r[0] for r in results)
+    no_files = sum(r[1] for r in results)
+
+    return no_records, no_files
+
+
+def _get_file_state(process_controller: ProcessController, asset, chunk_size: int, overlap_size: int) -> dict:
+    """
+    Fingerprint of the file on disk and the chunking parameters, None if the file was removed.
+    """
+    previous_state = (asset.asset_config or {}).get("processing")
+
+    fingerprint = process_controller.get_file_fingerprint(
+        file_id=asset.asset_name,
+        previous_fingerprint=previous_state,
+        uploaded_size=asset.asset_size,
+        uploaded_hash=asset.asset_hash
+    )
+    if fingerprint is None:
+        return None
+
+    return {
+        **fingerprint,
+        "chunk_size": chunk_size,
+        "overlap_size": overlap_size
+    }
+
+
+async def _get_incremental_files(project_assets: dict, files_states: dict, asset_model: AssetModel,
+                                 chunk_model: ChunkModel, vectordb_client, collection_name: str):
+    """
+    Keeps only the new and changed files, and deletes the stale chunks and vectors
+    of the changed and removed ones, and the assets of the removed ones.
+    """
+    compared_keys = ("hash", "chunk_size", "overlap_size")
+
+    changed_files_ids = dict()
+    no_removed_files = 0
+
+    for asset_id, asset in project_assets.items():
+        previous_state = (asset.asset_config or {}).get("processing") or {}
+        current_state = files_states.get(asset_id)
+
+        if current_state is not None and all(previous_state.get(k) == current_state[k] for k in compared_keys):
+            continue
+
+        # vectors reference the chunks, so they have to go first
+        stale_chunks_ids = await chunk_model.get_chunks_ids_by_asset_id(asset_id=asset_id)
+        if len(stale_chunks_ids):
+            _ = await vectordb_client.delete_by_record_ids(collection_name=collection_name, record_ids=stale_chunks_ids)
+            _ = await chunk_model.delete_chunks_by_asset_id(asset_id=asset_id)
+
+        if current_state is None:
+            # otherwise every later run would count the file as removed again
+            _ = await asset_model.delete_asset(asset_id=asset_id)
+            logger.warning(f"File {asset.asset_name} was removed, deleted its asset and "
+                           f"{len(stale_chunks_ids)} stale chunks.")
+            no_removed_files += 1
+            continue
+
+        changed_files_ids[asset_id] = asset.asset_name
+
+    return changed_files_ids, no_removed_files
@@ -2,6 +2,7 @@ from celery_app import celery_app, get_setup_utils
 from helpers.config import get_settings
 import asyncio
 from utils.idempotency_manager import IdempotencyManager
+from models.EmbeddingCacheModel import EmbeddingCacheModel
 
 import logging
 logger = logging.getLogger(__name__)
@@ -19,7 +20,7 @@ def clean_celery_executions_table(self):
 
 async def _clean_celery_executions_table(task_instance):
 
-    db_engine, vectordb_client = None, None
+    db_engine, vectordb_client, generation_client, embedding_client = None, None, None, None
     
     try:
 
@@ -46,5 +47,59 @@ async def _clean_celery_executions_table(task_instance):
             
             if vectordb_client:
                 await vectordb_client.disconnect()
+
+            for llm_client in (generation_client, embedding_client):
+                if llm_client:
+                    await llm_client.close()
+        except Exception as e:
+            logger.error(f"Task failed while cleaning: {str(e)}")
+
+
+@celery_app.task(
+                 bind=True, name="tasks.maintenance.evict_embedding_cache",
+                 autoretry_for=(Exception,),
+                 retry_kwargs={'max_retries': 3, 'countdown': 60}
+                )
+def evict_embedding_cache(self):
+
+    return asyncio.run(
+        _evict_embedding_cache(self)
+    )
+
+async def _evict_embedding_cache(task_instance):
+
+    db_engine, vectordb_client, generation_client, embedding_client = None, None, None, None
+
+    try:
+
+        (db_engine, db_client, llm_provider_factory,
+        vectordb_provider_factory,
+        generation_client, embedding_client,
+        vectordb_client, template_parser) = await get_setup_utils()
+
+        settings = get_settings()
+        embedding_cache = await EmbeddingCacheModel.create_instance(db_client=db_client)
+
+        evicted_count = await embedding_cache.evict_by_size(
+            max_size_bytes=settings.EMBEDDING_CACHE_MAX_SIZE_MB * 1024 * 1024
+        )
+        logger.warning(f"evicted {evicted_count} embedding cache entries")
+
+        return evicted_count
+
+    except Exception as e:
+        logger.error(f"Task failed: {str(e)}")
+        raise
+    finally:
+        try:
+            if db_engine:
+                await db_engine.dispose()
+
+            if vectordb_client:
+                await vectordb_client.disconnect()
+
+            for llm_client in (generation_client, embedding_client):
+                if llm_client:
+                    await llm_client.close()
         except Exception as e:
-            logger.error(f"Task failed while cleaning: {str(e)}")
\ No newline at end of file
+            logger.error(f"Task failed while cleaning: {str(e)}")
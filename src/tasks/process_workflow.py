@@ -22,10 +22,12 @@ logger = logging.getLogger(__name__)
 def push_after_process_task(self, prev_task_result):
     project_id = prev_task_result.get("project_id")
     do_reset = prev_task_result.get("do_reset")
-    task_results = asyncio.run(_index_data_content(project_id=project_id, do_reset=do_reset))
+    incremental = prev_task_result.get("incremental", False)
+    task_results = asyncio.run(_index_data_content(self, project_id=project_id, do_reset=do_reset, incremental=incremental))
     return {
         "project_id": project_id,
         "do_reset": do_reset,
+        "incremental": incremental,
         "task_results": task_results
     }
 
@@ -33,10 +35,10 @@ def push_after_process_task(self, prev_task_result):
 @celery_app.task(bind=True,name="tasks.process_workflow.process_and_push_workflow", 
                  autoretry_for=(Exception,), 
                  retry_kwargs={"max_retries": 3, "countdown": 60})
-def process_and_push_workflow(self, project_id: int, file_id: int, chunk_size: int, overlap_size: int, do_reset: bool):
+def process_and_push_workflow(self, project_id: int, file_id: int, chunk_size: int, overlap_size: int, do_reset: bool, incremental: bool = False):
 
     workflow = chain(
-        process_project_files.s(project_id, file_id, chunk_size, overlap_size, do_reset),
+        process_project_files.s(project_id, file_id, chunk_size, overlap_size, do_reset, incremental),
         push_after_process_task.s()
     )
 
@@ -0,0 +1,46 @@
+import os
+import sys
+
+# the app imports its packages from src, as when it is started from there
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+# the settings .env always sets, so the modules reading them at import time load without one
+for name, value in {
+    "APP_NAME": "mini-rag-tests",
+    "APP_VERSION": "0.1",
+    "OPENAI_API_KEY": "test",
+    "FILE_ALLOWED_TYPES": '["text/plain", "application/pdf"]',
+    "FILE_MAX_SIZE": "10",
+    "FILE_DEFAULT_CHUNK_SIZE": "512000",
+    "POSTGRES_USERNAME": "postgres",
+    "POSTGRES_PASSWORD": "postgres",
+    "POSTGRES_HOST": "localhost",
+    "POSTGRES_PORT": "5432",
+    "POSTGRES_MAIN_DATABASE": "minirag",
+    "GENERATION_BACKEND": "OPENAI",
+    "EMBEDDING_BACKEND": "OPENAI",
+    "OPENAI_API_URL": "",
+    "COHERE_API_KEY": "",
+    "GENERATION_MODEL_ID_LITERAL": '["gpt-4o-mini"]',
+    "GENERATION_MODEL_ID": "gpt-4o-mini",
+    "EMBEDDING_MODEL_ID": "text-embedding-3-small",
+    "EMBEDDING_MODEL_SIZE": "1536",
+    "INPUT_DEFAULT_MAX_CHARACTERS": "1024",
+    "GENERATION_DEFAULT_MAX_TOKENS": "200",
+    "GENERATION_DEFAULT_TEMPERATURE": "0.1",
+    "VECTOR_DB_BACKEND_LITERAL": '["QDRANT", "PGVECTOR"]',
+    "VECTOR_DB_BACKEND": "PGVECTOR",
+    "VECTOR_DB_PATH": "qdrant_db",
+    "VECTOR_DB_DISTANCE_METHOD": "cosine",
+    "CELERY_BROKER_URL": "memory://",
+    "CELERY_RESULT_BACKEND": "cache+memory://",
+    "CELERY_TASK_SERIALIZER": "json",
+    "CELERY_TASK_TIME_LIMIT": "600",
+    "CELERY_TASK_ACKS_LATE": "false",
+    "CELERY_WORKER_CONCURRENCY": "1",
+    "CELERY_FLOWER_PASSWORD": "",
+    "CELERY_TIMEZONE": "UTC",
+}.items():
+    os.environ.setdefault(name, value)
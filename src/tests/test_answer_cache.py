@@ -0,0 +1,75 @@
+import asyncio
+
+import stores.llm.AnswerCache as answer_cache_module
+from stores.llm.AnswerCache import AnswerCache
+
+
+def create_key(answer_cache: AnswerCache, **kwargs):
+    key_args = {
+        "project_id": 1,
+        "index_version": 3,
+        "query": "What is Mini RAG?",
+        "chunks_ids": [10, 11, 12],
+        "model_id": "gpt-4o-mini",
+        "temperature": 0.1,
+    }
+    key_args.update(kwargs)
+    return answer_cache.create_key(**key_args)
+
+
+def test_key_ignores_the_query_layout_and_case():
+    answer_cache = AnswerCache()
+
+    assert create_key(answer_cache) == create_key(answer_cache, query="  what is   mini rag? ")
+
+
+def test_key_changes_with_what_the_answer_depends_on():
+    answer_cache = AnswerCache()
+    key = create_key(answer_cache)
+
+    assert create_key(answer_cache, project_id=2) != key
+    assert create_key(answer_cache, chunks_ids=[12, 11, 10]) != key
+    assert create_key(answer_cache, model_id="command-r") != key
+    assert create_key(answer_cache, temperature=0.7) != key
+
+
+def test_reindexing_invalidates_the_cached_answers():
+    answer_cache = AnswerCache()
+    answer = {"answer": "A RAG app.", "full_prompt": "..."}
+
+    async def run():
+        await answer_cache.set(create_key(answer_cache, index_version=3), answer)
+        return (
+            await answer_cache.get(create_key(answer_cache, index_version=3)),
+            await answer_cache.get(create_key(answer_cache, index_version=4)),
+        )
+
+    assert asyncio.run(run()) == (answer, None)
+
+
+def test_expired_answers_are_not_served(monkeypatch):
+    answer_cache = AnswerCache(ttl_seconds=60)
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache_module.time, "monotonic", lambda: now[0])
+
+    async def run():
+        await answer_cache.set("key", {"answer": "A RAG app."})
+        fresh = await answer_cache.get("key")
+        now[0] += 61
+        return fresh, await answer_cache.get("key")
+
+    assert asyncio.run(run()) == ({"answer": "A RAG app."}, None)
+    assert "key" not in answer_cache.entries
+
+
+def test_least_recently_used_answer_is_evicted():
+    answer_cache = AnswerCache(max_entries=2)
+
+    async def run():
+        await answer_cache.set("a", {"answer": "a"})
+        await answer_cache.set("b", {"answer": "b"})
+        await answer_cache.get("a")
+        await answer_cache.set("c", {"answer": "c"})
+
+    asyncio.run(run())
+    assert list(answer_cache.entries.keys()) == ["a", "c"]
@@ -0,0 +1,71 @@
+import asyncio
+import time
+
+import pytest
+
+from controllers.NLPController import NLPController
+
+
+def get_nlp_controller() -> NLPController:
+    return NLPController.__new__(NLPController)
+
+
+class FakeAnswerStream:
+    """Answer tokens sent `delays` seconds apart, records whether the stream was closed."""
+
+    def __init__(self, delays: list):
+        self.delays = delays
+        self.closed = False
+
+    async def generate(self):
+        try:
+            for i, delay in enumerate(self.delays):
+                await asyncio.sleep(delay)
+                yield f"token-{i}"
+        finally:
+            self.closed = True
+
+
+def collect(answer_stream, timeout_seconds: float):
+    tokens = []
+
+    async def run():
+        bounded_stream = get_nlp_controller().bound_answer_stream(
+            answer_stream=answer_stream,
+            deadline=time.monotonic() + timeout_seconds
+        )
+        async for token in bounded_stream:
+            tokens.append(token)
+
+    asyncio.run(run())
+    return tokens
+
+
+def test_stream_within_the_deadline_is_passed_through():
+    fake_stream = FakeAnswerStream([0, 0, 0])
+
+    assert collect(fake_stream.generate(), timeout_seconds=1) == ["token-0", "token-1", "token-2"]
+    assert fake_stream.closed
+
+
+def test_first_token_is_bounded_by_the_deadline():
+    fake_stream = FakeAnswerStream([5])
+
+    started = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        collect(fake_stream.generate(), timeout_seconds=0.05)
+
+    assert time.monotonic() - started < 0.5
+    assert fake_stream.closed
+
+
+def test_whole_stream_is_bounded_by_the_deadline():
+    # every token comes quickly, the stream as a whole does not
+    fake_stream = FakeAnswerStream([0.03] * 20)
+
+    started = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        collect(fake_stream.generate(), timeout_seconds=0.1)
+
+    assert time.monotonic() - started < 0.5
+    assert fake_stream.closed
@@ -0,0 +1,68 @@
+import asyncio
+import json
+
+import cohere
+import httpx
+
+from stores.llm.LLMEnums import CoHereEnums
+from stores.llm.providers.CohereProvider import CohereProvider
+
+
+def get_provider(handler) -> CohereProvider:
+    provider = CohereProvider(api_key="test")
+    provider.set_generation_model("command-r")
+    # the real SDK client, only its transport is stubbed
+    provider.async_client = cohere.AsyncClient(
+        api_key="test",
+        httpx_client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    return provider
+
+
+def get_chat_history(provider: CohereProvider) -> list:
+    return [provider.construct_prompt(prompt="Answer from the documents.", role=CoHereEnums.SYSTEM.value)]
+
+
+def test_generate_text_sends_a_v1_chat_request():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, json={"text": "the answer", "generation_id": "1"})
+
+    provider = get_provider(handler)
+    chat_history = get_chat_history(provider)
+
+    answer = asyncio.run(provider.generate_text_async(prompt="the question", chat_history=chat_history))
+
+    assert answer == "the answer"
+    assert requests[0]["message"] == "the question"
+    assert requests[0]["chat_history"] == [{"role": "SYSTEM", "message": "Answer from the documents."}]
+    assert "messages" not in requests[0]
+    # the caller's history is not extended with the prompt
+    assert len(chat_history) == 1
+
+
+def test_generate_text_stream_yields_the_generated_text():
+    requests = []
+    events = [
+        {"event_type": "stream-start", "generation_id": "1", "is_finished": False},
+        {"event_type": "text-generation", "text": "the ", "is_finished": False},
+        {"event_type": "text-generation", "text": "answer", "is_finished": False},
+        {"event_type": "stream-end", "finish_reason": "COMPLETE", "is_finished": True,
+         "response": {"text": "the answer", "generation_id": "1"}},
+    ]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, content="\n".join(json.dumps(e) for e in events).encode())
+
+    provider = get_provider(handler)
+
+    async def collect():
+        return [piece async for piece in provider.generate_text_stream(
+            prompt="the question", chat_history=get_chat_history(provider))]
+
+    assert asyncio.run(collect()) == ["the ", "answer"]
+    assert requests[0]["message"] == "the question"
+    assert requests[0]["stream"] is True
@@ -0,0 +1,159 @@
+import asyncio
+from types import SimpleNamespace
+
+from tasks.data_indexing import _iter_chunks_pages, _set_shared_records_asset_ids
+
+COLLECTION_NAME = "collection_test"
+
+
+class FakeChunkModel:
+
+    def __init__(self, chunks: list):
+        self.chunks = chunks
+
+    async def get_chunks_by_project_id_after(self, project_id: int, last_chunk_id: int = 0, page_size: int = 100):
+        return [c for c in self.chunks if c.chunk_id > last_chunk_id][:page_size]
+
+    async def get_first_chunks_ids_by_text_hash(self, project_id: int, text_hashes: list) -> dict:
+        first_chunks_ids = {}
+        for c in self.chunks:
+            if c.chunk_text_hash in text_hashes:
+                first_chunks_ids.setdefault(c.chunk_text_hash, c.chunk_id)
+        return first_chunks_ids
+
+    async def get_asset_ids_by_text_hash(self, project_id: int, text_hashes: list) -> dict:
+        assets_ids = {}
+        for c in self.chunks:
+            if c.chunk_text_hash in text_hashes and c.chunk_asset_id not in assets_ids.get(c.chunk_text_hash, []):
+                assets_ids.setdefault(c.chunk_text_hash, []).append(c.chunk_asset_id)
+        return assets_ids
+
+
+class FakeVectorDBClient:
+
+    def __init__(self, existing_ids: set = None):
+        self.existing_ids = existing_ids or set()
+        self.records_asset_ids = {}
+
+    async def get_existing_record_ids(self, collection_name: str, record_ids: list) -> list:
+        return [record_id for record_id in record_ids if record_id in self.existing_ids]
+
+    async def set_records_asset_ids(self, collection_name: str, records_asset_ids: dict) -> bool:
+        self.records_asset_ids.update(records_asset_ids)
+        return True
+
+
+def make_chunk(chunk_id: int, text_hash: str = None, asset_id: int = 1):
+    return SimpleNamespace(chunk_id=chunk_id, chunk_text_hash=text_hash or f"hash-{chunk_id}", chunk_asset_id=asset_id)
+
+
+def get_pages(chunks: list, existing_ids: set = None, **kwargs):
+    counters = {"read_items_count": 0, "skipped_items_count": 0, "duplicated_items_count": 0}
+
+    async def collect():
+        return [
+            [c.chunk_id for c in page]
+            async for page in _iter_chunks_pages(
+                chunk_model=FakeChunkModel(chunks),
+                vectordb_client=FakeVectorDBClient(existing_ids),
+                project=SimpleNamespace(project_id=1),
+                collection_name=COLLECTION_NAME,
+                counters=counters,
+                pbar=SimpleNamespace(update=lambda n: None),
+                **kwargs
+            )
+        ]
+
+    return asyncio.run(collect()), counters
+
+
+def test_incremental_run_skips_the_indexed_chunks():
+    pages, counters = get_pages(
+        [make_chunk(i) for i in range(1, 6)],
+        existing_ids={1, 2, 4},
+        skip_indexed=True
+    )
+
+    assert pages == [[3, 5]]
+    assert counters["read_items_count"] == 5
+    assert counters["skipped_items_count"] == 3
+
+
+def test_full_run_keeps_the_indexed_chunks():
+    pages, counters = get_pages(
+        [make_chunk(i) for i in range(1, 6)],
+        existing_ids={1, 2, 4},
+        skip_indexed=False
+    )
+
+    assert pages == [[1, 2, 3, 4, 5]]
+    assert counters["skipped_items_count"] == 0
+
+
+def test_skipped_chunks_do_not_leave_partial_pages():
+    pages, _ = get_pages(
+        [make_chunk(i) for i in range(1, 8)],
+        existing_ids={1, 3},
+        page_size=2,
+        skip_indexed=True
+    )
+
+    assert pages == [[2, 4], [5, 6], [7]]
+
+
+def test_duplicated_chunks_are_indexed_once():
+    shared_records = {}
+    pages, counters = get_pages(
+        [make_chunk(1, "a"), make_chunk(2, "b"), make_chunk(3, "a"), make_chunk(4, "c"), make_chunk(5, "b")],
+        page_size=2,
+        dedup_chunks=True,
+        shared_records=shared_records
+    )
+
+    # the first chunk of every text stands for the later ones, even across pages
+    assert pages == [[1, 2], [4]]
+    assert counters["duplicated_items_count"] == 2
+    assert shared_records == {1: "a", 2: "b"}
+
+
+def test_duplicated_chunks_are_kept_without_dedup():
+    pages, counters = get_pages(
+        [make_chunk(1, "a"), make_chunk(2, "a")],
+        dedup_chunks=False
+    )
+
+    assert pages == [[1, 2]]
+    assert counters["duplicated_items_count"] == 0
+
+
+def test_indexed_canonical_chunk_still_drops_its_new_duplicates():
+    shared_records = {}
+    pages, counters = get_pages(
+        [make_chunk(1, "a"), make_chunk(2, "b"), make_chunk(3, "a")],
+        existing_ids={1, 2},
+        skip_indexed=True,
+        dedup_chunks=True,
+        shared_records=shared_records
+    )
+
+    assert pages == []
+    assert counters["skipped_items_count"] == 2
+    assert counters["duplicated_items_count"] == 1
+    assert shared_records == {1: "a"}
+
+
+def test_canonical_records_list_the_assets_of_their_duplicates():
+    chunks = [make_chunk(1, "a", asset_id=1), make_chunk(2, "b", asset_id=1),
+              make_chunk(3, "a", asset_id=2), make_chunk(4, "a", asset_id=3)]
+    vectordb_client = FakeVectorDBClient()
+
+    asyncio.run(_set_shared_records_asset_ids(
+        chunk_model=FakeChunkModel(chunks),
+        vectordb_client=vectordb_client,
+        project=SimpleNamespace(project_id=1),
+        collection_name=COLLECTION_NAME,
+        shared_records={1: "a"},
+        batch_size=1
+    ))
+
+    assert vectordb_client.records_asset_ids == {1: [1, 2, 3]}
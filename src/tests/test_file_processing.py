@@ -0,0 +1,168 @@
+import asyncio
+import hashlib
+import importlib
+from types import SimpleNamespace
+
+import pytest
+
+from controllers.ProcessController import Document, ProcessController
+
+file_processing = importlib.import_module("tasks.file_processing")
+
+CHUNKS_PER_FILE = 5
+
+
+class FakeChunkModel:
+
+    def __init__(self):
+        self.inserted_batches = []
+
+    async def bulk_insert_chunks(self, chunks: list) -> int:
+        self.inserted_batches.append(chunks)
+        return len(chunks)
+
+
+def fake_process_file_chunks(project_id: int, file_id: str, chunk_size: int, overlap_size: int):
+    if file_id == "missing.txt":
+        return None
+    if file_id == "broken.txt":
+        raise ValueError("not a text file")
+    return (Document(page_content=f"{file_id} chunk {i}", metadata={}) for i in range(CHUNKS_PER_FILE))
+
+
+def process_files(monkeypatch, project_files_ids: dict):
+    # the file processes are forked from here and see the patched function
+    monkeypatch.setattr(file_processing, "process_file_chunks", fake_process_file_chunks)
+    monkeypatch.setenv("FILE_CHUNKS_INSERT_BATCH_SIZE", "2")
+    monkeypatch.setenv("RAG_PROMPT_MAX_TOKENS", "0")
+
+    chunk_model = FakeChunkModel()
+    processed_assets = []
+
+    async def on_file_processed(asset_id: int):
+        processed_assets.append(asset_id)
+
+    results = asyncio.run(file_processing._process_files_concurrently(
+        project=SimpleNamespace(project_id=1),
+        project_files_ids=project_files_ids,
+        chunk_model=chunk_model,
+        chunk_size=100,
+        overlap_size=0,
+        concurrency=2,
+        on_file_processed=on_file_processed
+    ))
+    return results, chunk_model, processed_assets
+
+
+def test_files_are_chunked_in_processes_and_inserted_batch_by_batch(monkeypatch):
+    (no_records, no_files), chunk_model, processed_assets = process_files(
+        monkeypatch, {1: "a.txt", 2: "b.txt", 3: "c.txt"}
+    )
+
+    assert (no_records, no_files) == (3 * CHUNKS_PER_FILE, 3)
+    assert sorted(processed_assets) == [1, 2, 3]
+    assert all(len(batch) <= 2 for batch in chunk_model.inserted_batches)
+
+    for asset_id, file_id in {1: "a.txt", 2: "b.txt", 3: "c.txt"}.items():
+        records = [r for batch in chunk_model.inserted_batches for r in batch if r["chunk_asset_id"] == asset_id]
+        assert [r["chunk_text"] for r in records] == [f"{file_id} chunk {i}" for i in range(CHUNKS_PER_FILE)]
+        assert [r["chunk_order"] for r in records] == list(range(1, CHUNKS_PER_FILE + 1))
+
+
+def test_missing_files_are_skipped(monkeypatch):
+    (no_records, no_files), _, processed_assets = process_files(monkeypatch, {1: "a.txt", 2: "missing.txt"})
+
+    assert (no_records, no_files) == (CHUNKS_PER_FILE, 1)
+    assert processed_assets == [1]
+
+
+def test_file_processing_errors_are_raised(monkeypatch):
+    with pytest.raises(Exception, match="broken.txt"):
+        process_files(monkeypatch, {1: "broken.txt"})
+
+
+class FakeIncrementalChunkModel:
+
+    def __init__(self, chunks_ids: dict):
+        self.chunks_ids = chunks_ids
+
+    async def get_chunks_ids_by_asset_id(self, asset_id: int) -> list:
+        return self.chunks_ids.get(asset_id, [])
+
+    async def delete_chunks_by_asset_id(self, asset_id: int) -> int:
+        return len(self.chunks_ids.pop(asset_id, []))
+
+
+class FakeAssetModel:
+
+    def __init__(self):
+        self.deleted_assets_ids = []
+
+    async def delete_asset(self, asset_id: int) -> int:
+        self.deleted_assets_ids.append(asset_id)
+        return 1
+
+
+class FakeVectorDBClient:
+
+    def __init__(self):
+        self.deleted_records_ids = []
+
+    async def delete_by_record_ids(self, collection_name: str, record_ids: list) -> bool:
+        self.deleted_records_ids.extend(record_ids)
+        return True
+
+
+def make_asset(asset_name: str, file_hash: str = None):
+    processing = {"hash": file_hash, "chunk_size": 100, "overlap_size": 0} if file_hash else None
+    return SimpleNamespace(asset_name=asset_name, asset_config={"processing": processing})
+
+
+def test_removed_files_lose_their_asset_and_chunks():
+    asset_model = FakeAssetModel()
+    vectordb_client = FakeVectorDBClient()
+    project_assets = {1: make_asset("kept.txt", "a"), 2: make_asset("changed.txt", "b"),
+                      3: make_asset("removed.txt", "c")}
+
+    changed_files_ids, no_removed_files = asyncio.run(file_processing._get_incremental_files(
+        project_assets=project_assets,
+        files_states={
+            1: {"hash": "a", "chunk_size": 100, "overlap_size": 0},
+            2: {"hash": "b2", "chunk_size": 100, "overlap_size": 0},
+            3: None
+        },
+        asset_model=asset_model,
+        chunk_model=FakeIncrementalChunkModel({1: [10], 2: [20, 21], 3: [30]}),
+        vectordb_client=vectordb_client,
+        collection_name="collection_test"
+    ))
+
+    assert changed_files_ids == {2: "changed.txt"}
+    assert no_removed_files == 1
+    assert asset_model.deleted_assets_ids == [3]
+    assert vectordb_client.deleted_records_ids == [20, 21, 30]
+
+
+def get_process_controller(project_path: str) -> ProcessController:
+    process_controller = ProcessController.__new__(ProcessController)
+    process_controller.project_path = project_path
+    process_controller.app_settings = SimpleNamespace(FILE_DEFAULT_CHUNK_SIZE=1024)
+    return process_controller
+
+
+def test_unchanged_files_reuse_their_known_hash(tmp_path):
+    (tmp_path / "a.txt").write_bytes(b"content")
+    process_controller = get_process_controller(str(tmp_path))
+
+    fingerprint = process_controller.get_file_fingerprint("a.txt")
+    assert fingerprint["hash"] == hashlib.sha256(b"content").hexdigest()
+
+    # same mtime and size as the previous run, or same size as at upload: not rehashed
+    assert process_controller.get_file_fingerprint(
+        "a.txt", previous_fingerprint={**fingerprint, "hash": "previous"})["hash"] == "previous"
+    assert process_controller.get_file_fingerprint(
+        "a.txt", uploaded_size=len(b"content"), uploaded_hash="uploaded")["hash"] == "uploaded"
+
+    assert process_controller.get_file_fingerprint(
+        "a.txt", uploaded_size=1, uploaded_hash="uploaded")["hash"] == fingerprint["hash"]
+    assert process_controller.get_file_fingerprint("missing.txt") is None
@@ -0,0 +1,64 @@
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from stores.llm.LLMProviderFactory import LLMProviderFactory
+from stores.llm.providers import LocalProvider
+from stores.llm.providers.LocalProvider import get_max_threads, load_sentence_transformer
+
+
+class FakeSentenceTransformer:
+
+    loads = 0
+
+    def __init__(self, model_path: str, device: str):
+        FakeSentenceTransformer.loads += 1
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return 8
+
+
+def get_factory(model_id: str) -> LLMProviderFactory:
+    return LLMProviderFactory(SimpleNamespace(
+        EMBEDDING_MODEL_ID=model_id,
+        INPUT_DEFAULT_MAX_CHARACTERS=1000,
+        GENERATION_DEFAULT_TEMPERATURE=0.1,
+        GENERATION_DEFAULT_MAX_TOKENS=200,
+        LOCAL_EMBEDDING_THREADS=4,
+        LOCAL_EMBEDDING_BATCH_SIZE=64,
+        CELERY_WORKER_CONCURRENCY=None
+    ))
+
+
+def test_threads_are_shared_by_the_worker_processes(monkeypatch):
+    monkeypatch.setattr("os.cpu_count", lambda: 8)
+
+    assert get_max_threads(worker_concurrency=2) == 4
+    assert get_max_threads(worker_concurrency=16) == 1
+    # celery starts one process per CPU by default
+    assert get_max_threads(worker_concurrency=None) == 1
+    assert LocalProvider(num_threads=4, worker_concurrency=4).num_threads == 2
+
+
+def test_model_is_loaded_once_per_process(monkeypatch):
+    monkeypatch.setitem(sys.modules, "torch", SimpleNamespace(set_num_threads=lambda n: None))
+    monkeypatch.setitem(sys.modules, "sentence_transformers",
+                        SimpleNamespace(SentenceTransformer=FakeSentenceTransformer))
+    load_sentence_transformer.cache_clear()
+
+    for _ in range(3):
+        provider = LocalProvider(num_threads=1)
+        provider.set_embedding_model("/models/minilm", embedding_size=8)
+
+    assert FakeSentenceTransformer.loads == 1
+    load_sentence_transformer.cache_clear()
+
+
+def test_factory_fails_fast_without_sentence_transformers(monkeypatch):
+    monkeypatch.setattr("importlib.util.find_spec", lambda name: None)
+
+    with pytest.raises(ValueError, match="sentence-transformers"):
+        get_factory("/models/minilm").create(provider="LOCAL")
+
+    assert isinstance(get_factory("hashing").create(provider="LOCAL"), LocalProvider)
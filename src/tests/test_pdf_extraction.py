@@ -0,0 +1,58 @@
+import importlib
+import os
+from types import SimpleNamespace
+
+import billiard
+import fitz
+
+from controllers.ProcessController import ProcessController
+
+process_controller_module = importlib.import_module("controllers.ProcessController")
+
+PAGES_COUNT = 4
+
+
+def create_pdf(file_path: str):
+    with fitz.open() as pdf:
+        for page_no in range(PAGES_COUNT):
+            page = pdf.new_page()
+            page.insert_text((72, 72), f"page {page_no}")
+        pdf.save(file_path)
+
+
+def extract_pdf_pages_with_pid(file_path: str, start_page: int, end_page: int):
+    pages = process_controller_module.extract_pdf_pages_serial(file_path, start_page, end_page)
+    for page in pages:
+        page.metadata["pid"] = os.getpid()
+    return pages
+
+
+def extract_in_worker(project_path: str, file_id: str, results):
+    """Runs in a daemonic process, as the children of the prefork Celery pool do."""
+    # the pool workers are forked from here and see the patched function
+    process_controller_module.extract_pdf_pages_serial = process_controller_module.extract_pdf_pages
+    process_controller_module.extract_pdf_pages = extract_pdf_pages_with_pid
+
+    process_controller = ProcessController.__new__(ProcessController)
+    process_controller.project_path = project_path
+    process_controller.app_settings = SimpleNamespace(FILE_PDF_PAGES_PER_TASK=1, FILE_PDF_EXTRACTION_WORKERS=2)
+
+    pages = list(process_controller.iter_pdf_pages_parallel(file_id=file_id))
+    results.put((
+        os.getpid(),
+        [(page.metadata["page"], page.page_content.strip(), page.metadata["pid"]) for page in pages]
+    ))
+
+
+def test_parallel_extraction_runs_in_a_daemonic_worker(tmp_path):
+    create_pdf(str(tmp_path / "file.pdf"))
+
+    results = billiard.Queue()
+    worker = billiard.Process(target=extract_in_worker, args=(str(tmp_path), "file.pdf", results), daemon=True)
+    worker.start()
+    worker_pid, pages = results.get(timeout=60)
+    worker.join(timeout=60)
+
+    assert [(page_no, text) for page_no, text, _ in pages] == [(i, f"page {i}") for i in range(PAGES_COUNT)]
+    # extracted by the pool, not by the serial fallback
+    assert all(pid != worker_pid for _, _, pid in pages)
@@ -0,0 +1,112 @@
+import asyncio
+
+import httpx
+import pytest
+
+from stores.llm.EmbeddingBatcher import EmbeddingBatcher
+from stores.llm.ProviderScheduler import ProviderScheduler
+
+
+class FakeAPIError(Exception):
+
+    def __init__(self, status_code: int = None, headers: dict = None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeCall:
+    """Raises the given errors in turn, then returns "ok"."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls_count = 0
+
+    async def __call__(self):
+        self.calls_count += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+def get_scheduler(**kwargs) -> ProviderScheduler:
+    return ProviderScheduler(provider="TEST", **kwargs)
+
+
+@pytest.mark.parametrize("error, is_retryable", [
+    (FakeAPIError(429), True),
+    (FakeAPIError(408), True),
+    (FakeAPIError(503), True),
+    (FakeAPIError(400), False),
+    (FakeAPIError(401), False),
+    (httpx.ConnectError("connection refused"), True),
+    (asyncio.TimeoutError(), True),
+    (ValueError("bad input"), False),
+])
+def test_retryable_errors(error, is_retryable):
+    assert get_scheduler().is_retryable_error(error) is is_retryable
+
+
+def test_retry_after_headers():
+    scheduler = get_scheduler()
+
+    assert scheduler.get_retry_after(FakeAPIError(429, {"retry-after-ms": "1500"})) == 1.5
+    assert scheduler.get_retry_after(FakeAPIError(429, {"retry-after": "2"})) == 2.0
+    assert scheduler.get_retry_after(FakeAPIError(429, {"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})) is None
+    assert scheduler.get_retry_after(FakeAPIError(429)) is None
+
+
+def test_backoff_honours_retry_after_up_to_the_max_delay():
+    scheduler = get_scheduler(retry_max_delay=10.0)
+
+    assert scheduler.get_backoff_delay(attempt=0, error=FakeAPIError(429, {"retry-after": "3"})) == 3.0
+    assert scheduler.get_backoff_delay(attempt=0, error=FakeAPIError(429, {"retry-after": "120"})) == 10.0
+
+
+def test_backoff_grows_exponentially_with_jitter():
+    scheduler = get_scheduler(retry_base_delay=1.0, retry_max_delay=60.0)
+
+    for attempt in range(4):
+        delay = scheduler.get_backoff_delay(attempt=attempt, error=FakeAPIError(503))
+        assert 2 ** attempt / 2 <= delay <= 2 ** attempt
+
+    assert scheduler.get_backoff_delay(attempt=10, error=FakeAPIError(503)) <= 60.0
+
+
+def test_rate_limited_call_is_retried_and_pauses_the_provider():
+    scheduler = get_scheduler(max_retries=3)
+    call = FakeCall(FakeAPIError(429, {"retry-after": "0"}))
+
+    assert asyncio.run(scheduler.run(call)) == "ok"
+    assert call.calls_count == 2
+    assert scheduler.stats["retries"] == 1
+    assert scheduler.stats["rate_limited"] == 1
+    assert scheduler.paused_until > 0
+
+
+def test_non_retryable_error_is_raised_at_once():
+    scheduler = get_scheduler(max_retries=3)
+    call = FakeCall(FakeAPIError(400))
+
+    with pytest.raises(FakeAPIError):
+        asyncio.run(scheduler.run(call))
+    assert call.calls_count == 1
+    assert scheduler.stats["failures"] == 1
+
+
+def test_retries_stop_after_max_retries():
+    scheduler = get_scheduler(max_retries=2)
+    call = FakeCall(*[FakeAPIError(503, {"retry-after": "0"}) for _ in range(5)])
+
+    with pytest.raises(FakeAPIError):
+        asyncio.run(scheduler.run(call))
+    assert call.calls_count == 3
+    assert scheduler.stats["retries"] == 2
+
+
+def test_batcher_does_not_retry_on_top_of_the_scheduler():
+    class FakeEmbeddingClient:
+        scheduler = get_scheduler()
+
+    assert EmbeddingBatcher(FakeEmbeddingClient(), max_retries=5).max_retries == 0
+    assert EmbeddingBatcher(object(), max_retries=5).max_retries == 5
@@ -0,0 +1,49 @@
+from models.db_schemes import SearchFilter
+from stores.vectordb.providers import PGVectorProvider, QdrantDB
+
+COLLECTION_NAME = "collection_1536_1"
+
+
+def test_pgvector_asset_filter_matches_any_asset_of_the_record():
+    clauses, values = PGVectorProvider(db_client=None).get_filter_clauses(SearchFilter(asset_ids=[2, 3]))
+
+    assert clauses == ["asset_ids && CAST(:asset_ids AS integer[])"]
+    assert values == {"asset_ids": [2, 3]}
+
+
+def test_pgvector_page_range_is_served_by_the_expression_indexes():
+    pgvector_provider = PGVectorProvider(db_client=None)
+    clauses, values = pgvector_provider.get_filter_clauses(SearchFilter(page_from=2, page_to=5))
+    indexes_sql = pgvector_provider.get_filter_indexes_sql(collection_name=COLLECTION_NAME)
+
+    assert values == {"page_to": 5, "page_from": 2}
+    # the planner only uses an expression index for the very same expression
+    for column, clause in zip(["page_start", "page_end"], clauses):
+        expression = clause.split(" ")[0]
+        assert expression in indexes_sql[f"{COLLECTION_NAME}_{column}_idx"]
+
+
+def test_pgvector_filter_indexes_of_existing_collections_are_concurrent():
+    indexes_sql = PGVectorProvider(db_client=None).get_filter_indexes_sql(
+        collection_name=COLLECTION_NAME, concurrently=True
+    )
+
+    assert len(indexes_sql) == 4
+    assert all(sql.startswith("CREATE INDEX CONCURRENTLY IF NOT EXISTS") for sql in indexes_sql.values())
+
+
+def test_empty_filter_has_no_clauses():
+    assert PGVectorProvider(db_client=None).get_filter_clauses(None) == ([], {})
+    assert QdrantDB(db_client=None).get_query_filter(SearchFilter()) is None
+
+
+def test_qdrant_filter_conditions():
+    query_filter = QdrantDB(db_client=None).get_query_filter(
+        SearchFilter(asset_ids=[2, 3], metadata={"source": "splitter"}, page_from=2, page_to=5)
+    )
+    conditions = {condition.key: condition for condition in query_filter.must}
+
+    assert conditions["asset_ids"].match.any == [2, 3]
+    assert conditions["metadata.source"].match.value == "splitter"
+    assert conditions["metadata.page_start"].range.lte == 5
+    assert conditions["metadata.page_end"].range.gte == 2
@@ -0,0 +1,84 @@
+from controllers.ProcessController import ProcessController
+
+
+def get_process_controller() -> ProcessController:
+    # the splitter does not touch the project directory
+    return ProcessController.__new__(ProcessController)
+
+
+def split(texts, chunk_size, overlap_size=0, pages=None):
+    return list(get_process_controller().process_simpler_splitter(
+        texts=texts,
+        chunk_size=chunk_size,
+        overlap_size=overlap_size,
+        pages=pages
+    ))
+
+
+def test_chunks_carry_the_last_lines_over():
+    chunks = split(["aaaa\nbbbb\ncccc\ndddd"], chunk_size=10, overlap_size=5)
+
+    assert [c.page_content for c in chunks] == ["aaaa\nbbbb", "bbbb\ncccc", "cccc\ndddd"]
+    assert [c.metadata["chunk_index"] for c in chunks] == [0, 1, 2]
+
+
+def test_chunks_without_overlap_do_not_repeat_lines():
+    chunks = split(["aaaa\nbbbb\ncccc\ndddd\neeee"], chunk_size=10, overlap_size=0)
+
+    assert [c.page_content for c in chunks] == ["aaaa\nbbbb", "cccc\ndddd", "eeee"]
+
+
+def test_trailing_overlap_is_not_flushed_as_a_chunk():
+    chunks = split(["aaaa\nbbbb\ncccc\ndddd"], chunk_size=10, overlap_size=5)
+
+    # "dddd" is only the overlap of the last chunk
+    assert chunks[-1].page_content == "cccc\ndddd"
+
+
+def test_overlap_is_clamped_below_the_chunk_size():
+    # an overlap as large as the chunk would carry every line over forever
+    chunks = split(["aaaa\nbbbb\ncccc\ndddd"], chunk_size=10, overlap_size=50)
+
+    assert [c.page_content for c in chunks] == ["aaaa\nbbbb", "bbbb\ncccc", "cccc\ndddd"]
+
+
+def test_blank_and_single_character_lines_are_skipped():
+    chunks = split(["aaaa\n\n \nx\nbbbb"], chunk_size=10)
+
+    assert [c.page_content for c in chunks] == ["aaaa\nbbbb"]
+
+
+def test_overlap_lines_fit_in_the_overlap_size():
+    process_controller = get_process_controller()
+
+    assert process_controller.get_overlap_lines(["aaaa", "bbbb", "cccc"], overlap_size=10) == ["bbbb", "cccc"]
+    assert process_controller.get_overlap_lines(["aaaa", "bbbb"], overlap_size=0) == []
+    assert process_controller.get_overlap_lines([], overlap_size=10) == []
+
+
+def test_overlap_keeps_the_tail_of_a_long_last_line():
+    process_controller = get_process_controller()
+
+    assert process_controller.get_overlap_lines(["aaaa", "0123456789"], overlap_size=4) == ["6789"]
+
+
+def test_chunks_record_the_pages_they_span():
+    chunks = split(["aaaa\nbbbb", "cccc\ndddd"], chunk_size=15, pages=[0, 1])
+
+    assert [c.page_content for c in chunks] == ["aaaa\nbbbb\ncccc", "dddd"]
+    assert [(c.metadata["page_start"], c.metadata["page_end"]) for c in chunks] == [(0, 1), (1, 1)]
+
+
+def test_overlap_keeps_the_page_of_its_lines():
+    chunks = split(["aaaa\nbbbb", "cccc\ndddd\neeee"], chunk_size=10, overlap_size=5, pages=[3, 4])
+
+    # "bbbb" is carried over from page 3 into the chunk ending on page 4
+    assert [c.page_content for c in chunks] == ["aaaa\nbbbb", "bbbb\ncccc", "cccc\ndddd", "dddd\neeee"]
+    assert [(c.metadata["page_start"], c.metadata["page_end"]) for c in chunks] == [(3, 3), (3, 4), (4, 4), (4, 4)]
+
+
+def test_chunks_without_pages_have_no_page_span():
+    chunks = split(["aaaa\nbbbb"], chunk_size=10)
+
+    assert "page_start" not in chunks[0].metadata
+    assert "page_end" not in chunks[0].metadata
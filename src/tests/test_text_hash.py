@@ -0,0 +1,13 @@
+from utils.text_hash import get_text_hash, normalize_text
+
+
+def test_chunk_hash_ignores_the_layout():
+    assert get_text_hash("Mini  RAG\n project") == get_text_hash("Mini RAG project")
+
+
+def test_chunk_hash_keeps_the_case():
+    assert get_text_hash("Apple") != get_text_hash("apple")
+
+
+def test_normalized_query_ignores_layout_and_case():
+    assert normalize_text("  What is\tMini RAG? ") == "what is mini rag?"
@@ -0,0 +1,103 @@
+import importlib
+from types import SimpleNamespace
+
+from controllers.NLPController import NLPController
+import utils.token_counter as token_counter
+from models.db_schemes import RetrievedDocument
+
+nlp_controller_module = importlib.import_module("controllers.NLPController")
+
+
+class FakeTemplateParser:
+
+    def get(self, group: str, key: str, vars: dict = {}):
+        # one token of template around every document
+        return "document" if key == "document_prompt" else ""
+
+
+def get_nlp_controller(monkeypatch) -> NLPController:
+    # one token per word keeps the budgets readable
+    monkeypatch.setattr(nlp_controller_module, "count_tokens", lambda text, **kwargs: len(text.split()))
+
+    nlp_controller = NLPController.__new__(NLPController)
+    nlp_controller.app_settings = SimpleNamespace(TOKENIZER_ENCODING="cl100k_base", TOKENIZER_CACHE_DIR=None)
+    nlp_controller.template_parser = FakeTemplateParser()
+    return nlp_controller
+
+
+def make_document(score: float, token_count: int = None, text: str = "chunk text"):
+    return RetrievedDocument(text=text, score=score, token_count=token_count)
+
+
+def test_documents_are_packed_by_score_within_the_budget(monkeypatch):
+    nlp_controller = get_nlp_controller(monkeypatch)
+    documents = [make_document(0.7, 2), make_document(0.9, 6), make_document(0.8, 3)]
+
+    packed_documents = nlp_controller.pack_retrieved_documents(documents, token_budget=12)
+
+    assert [doc.score for doc in packed_documents] == [0.9, 0.8]
+
+
+def test_a_smaller_document_uses_the_space_left_by_a_skipped_one(monkeypatch):
+    nlp_controller = get_nlp_controller(monkeypatch)
+    documents = [make_document(0.9, 6), make_document(0.8, 5), make_document(0.7, 2)]
+
+    packed_documents = nlp_controller.pack_retrieved_documents(documents, token_budget=10)
+
+    # 0.8 does not fit in the 3 tokens left by 0.9, 0.7 does
+    assert [doc.score for doc in packed_documents] == [0.9, 0.7]
+
+
+def test_documents_without_token_count_are_counted(monkeypatch):
+    nlp_controller = get_nlp_controller(monkeypatch)
+    documents = [make_document(0.9, text="one two three four"), make_document(0.8, text="one")]
+
+    packed_documents = nlp_controller.pack_retrieved_documents(documents, token_budget=4)
+
+    assert [doc.score for doc in packed_documents] == [0.8]
+
+
+def test_nothing_is_packed_without_budget(monkeypatch):
+    nlp_controller = get_nlp_controller(monkeypatch)
+
+    assert nlp_controller.pack_retrieved_documents([make_document(0.9, 1)], token_budget=0) == []
+
+
+def test_token_count_is_estimated_when_the_encoding_can_not_load(monkeypatch):
+    def get_encoding(encoding_name):
+        raise ConnectionError("offline")
+
+    monkeypatch.setattr(token_counter.tiktoken, "get_encoding", get_encoding)
+    token_counter.clear_encodings()
+    try:
+        assert token_counter.count_tokens("x" * 40, encoding_name="offline_encoding") == 10
+        assert token_counter.count_tokens("x" * 41, encoding_name="offline_encoding") == 11
+        assert token_counter.count_tokens("", encoding_name="offline_encoding") == 0
+    finally:
+        token_counter.clear_encodings()
+
+
+def test_failed_encoding_load_is_retried(monkeypatch):
+    loads = []
+
+    def get_encoding(encoding_name):
+        loads.append(encoding_name)
+        if len(loads) == 1:
+            raise ConnectionError("offline")
+        return SimpleNamespace(encode=lambda text, disallowed_special: text.split())
+
+    monkeypatch.setattr(token_counter.tiktoken, "get_encoding", get_encoding)
+    token_counter.clear_encodings()
+    try:
+        assert token_counter.count_tokens("a b c d e", encoding_name="flaky_encoding") == 3
+        # not retried for every text while the delay runs
+        assert token_counter.count_tokens("a b c d e", encoding_name="flaky_encoding") == 3
+        assert len(loads) == 1
+
+        # once the delay passed
+        token_counter._failed_encodings.clear()
+        assert token_counter.count_tokens("a b c d e", encoding_name="flaky_encoding") == 5
+        assert token_counter.count_tokens("a b", encoding_name="flaky_encoding") == 2
+        assert len(loads) == 2
+    finally:
+        token_counter.clear_encodings()
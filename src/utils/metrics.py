@@ -7,6 +7,15 @@ import time
 # Define metrics 
 REQUEST_COUNT = Counter('http_requests_total', 'Total HTTP requests', ['method', 'endpoint', 'status'])
 REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'HTTP Request Ltaency', ['method', 'endpoint'])
+QUERY_EMBEDDING_CACHE_HITS = Counter('query_embedding_cache_hits_total', 'Query embedding cache hits', ['tier'])
+QUERY_EMBEDDING_CACHE_MISSES = Counter('query_embedding_cache_misses_total', 'Query embedding cache misses')
+ANSWER_CACHE_HITS = Counter('rag_answer_cache_hits_total', 'RAG answer cache hits')
+ANSWER_CACHE_MISSES = Counter('rag_answer_cache_misses_total', 'RAG answer cache misses')
+LLM_PROVIDER_CALLS = Counter('llm_provider_calls_total', 'LLM provider calls', ['provider', 'operation', 'status'])
+LLM_PROVIDER_RETRIES = Counter('llm_provider_retries_total', 'LLM provider call retries', ['provider', 'operation', 'reason'])
+LLM_PROVIDER_CALL_ATTEMPTS = Histogram('llm_provider_call_attempts', 'Attempts per LLM provider call', ['provider', 'operation'],
+                                       buckets=(1, 2, 3, 4, 6, 8, 11))
+GENERATION_HEDGED_REQUESTS = Counter('generation_hedged_requests_total', 'Generation requests that were hedged, by winning attempt', ['winner'])
 
 
 class PrometheusMiddleware(BaseHTTPMiddleware):
@@ -0,0 +1,15 @@
+import hashlib
+
+
+def collapse_whitespace(text: str) -> str:
+    return " ".join(text.split())
+
+
+def normalize_text(text: str) -> str:
+    # collapse whitespace and case so queries that only differ in layout share their cache entries
+    return collapse_whitespace(text).lower()
+
+
+def get_text_hash(text: str) -> str:
+    # case is kept, chunks that only differ in case are not the same content
+    return hashlib.sha256(collapse_whitespace(text).encode("utf-8")).hexdigest()
\ No newline at end of file
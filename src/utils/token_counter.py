@@ -0,0 +1,58 @@
+import tiktoken
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# seconds before loading an encoding that failed is tried again
+ENCODING_RETRY_DELAY = 60
+
+# only the loaded encodings are kept, a failed load is retried once the delay passed
+_encodings = dict()
+_failed_encodings = dict()
+
+
+def get_encoding(encoding_name: str, cache_dir: str = None):
+    """
+    Loads the encoding, tiktoken downloads its BPE file on first use unless it is in `cache_dir`.
+    Returns None when it can not be loaded, e.g. offline without the cached file.
+    """
+    key = (encoding_name, cache_dir)
+    if key in _encodings:
+        return _encodings[key]
+
+    if time.monotonic() < _failed_encodings.get(key, 0):
+        return None
+
+    if cache_dir:
+        os.environ.setdefault("TIKTOKEN_CACHE_DIR", cache_dir)
+
+    try:
+        _encodings[key] = tiktoken.get_encoding(encoding_name)
+    except Exception as e:
+        # every chunk counts its tokens, so the download is not retried for each of them
+        _failed_encodings[key] = time.monotonic() + ENCODING_RETRY_DELAY
+        logger.warning(f"Can not load the {encoding_name} encoding ({e}), token counts are estimated.")
+        return None
+
+    _failed_encodings.pop(key, None)
+    return _encodings[key]
+
+
+def clear_encodings():
+    _encodings.clear()
+    _failed_encodings.clear()
+
+
+def count_tokens(text: str, encoding_name: str = "cl100k_base", cache_dir: str = None) -> int:
+    if not text:
+        return 0
+
+    encoding = get_encoding(encoding_name, cache_dir)
+    if encoding is None:
+        # about 4 characters per token
+        return (len(text) + 3) // 4
+
+    # special tokens in the documents are counted as plain text
+    return len(encoding.encode(text, disallowed_special=()))